@@ -0,0 +1,93 @@
+"""Apache Arrow IPC stream responses for the heavy tabular endpoints.
+
+Clients opt in with ``Accept: application/vnd.apache.arrow.stream``.  Frames
+are converted with pyarrow, which wraps numeric numpy columns without
+copying them and turns categoricals into dictionary arrays, and written as
+an IPC stream that browsers decode into typed arrays (static/js/arrow.js).
+pyarrow is optional: without it clients fall back to the other types they
+accept, or get 406 if Arrow was the only one.
+"""
+import io
+
+from fastapi import HTTPException
+
+from app.metrics import timed
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+def quality(accept, media_type):
+    """q-value an Accept header gives a media type (0 if not acceptable)"""
+    major = media_type.split('/')[0]
+    best, specificity = 0.0, -1
+    for part in (accept or '').split(','):
+        kind, *params = [item.strip() for item in part.split(';')]
+        q = 1.0
+        for param in params:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if kind == media_type:
+            match = 2
+        elif kind == major + '/*':
+            match = 1
+        elif kind == '*/*':
+            match = 0
+        else:
+            continue
+        if match > specificity:
+            best, specificity = q, match
+    return best
+
+
+def wants_arrow(accept, fallback='application/json'):
+    """True if the Accept header names the Arrow stream type and prefers it to fallback
+
+    Raises 406 when Arrow is the only acceptable type and pyarrow is missing.
+    """
+    if MEDIA_TYPE not in (accept or ''):
+        return False
+    arrow = quality(accept, MEDIA_TYPE)
+    if arrow == 0:
+        return False
+    other = quality(accept, fallback)
+    if pa is None:
+        if other == 0:
+            raise HTTPException(status_code=406, detail="Arrow IPC responses need the pyarrow package")
+        return False
+    return arrow >= other
+
+
+def schema_of(frame):
+    """Arrow schema of a frame, without the pandas metadata clients have no use for"""
+    return pa.Schema.from_pandas(frame, preserve_index=False).remove_metadata()
+
+
+@timed('serialize')
+def ipc_bytes(frame):
+    """Arrow IPC stream of a frame"""
+    table = pa.Table.from_pandas(frame, preserve_index=False).replace_schema_metadata(None)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def render_stream(chunks, schema):
+    """Byte chunks of an Arrow IPC stream, one record batch per frame chunk"""
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for chunk in chunks:
+        writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
@@ -0,0 +1,193 @@
+"""Precompressed, fingerprinted static assets.
+
+``python -m app.assets`` copies every file of static/data, static/js and
+static/css to static/dist under a name carrying a hash of its content
+(``js/finalbox.js`` -> ``dist/js/finalbox.1f3a9c0b2d4e.js``), next to its gzip
+(and, with the optional ``brotli`` package, brotli) variant, and records them
+in dist/manifest.json.
+
+AssetStaticFiles serves /static: a fingerprinted URL never changes content,
+so it is answered with immutable cache headers; the original URLs (still
+fetched by the chart scripts) are revalidated with their ETag.  Both get the
+precompressed variant the client accepts, sent as a file response, which
+servers implementing the ASGI pathsend extension pass to sendfile().
+Templates link assets with asset_url(), which falls back to the original
+URL for files that were not built.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import sys
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from app.export import accepted_codings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = "app/static"
+ASSET_DIRS = ('data', 'js', 'css')
+DIST = 'dist'
+MANIFEST = 'manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Variants in order of preference, with their file suffix
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def fingerprinted(path, digest):
+    """Name of an asset with its content hash before the extension"""
+    root, ext = os.path.splitext(path)
+    return '%s.%s%s' % (root, digest[:12], ext)
+
+
+def compressed_variants(data):
+    """Compressed forms of an asset that are smaller than it: {encoding: bytes}"""
+    variants = {'gzip': gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+
+def build(static_dir=STATIC_DIR):
+    """Write the fingerprinted and compressed assets and their manifest; returns the manifest"""
+    dist = os.path.join(static_dir, DIST)
+    files = {}
+    for asset_dir in ASSET_DIRS:
+        for root, dirs, names in os.walk(os.path.join(static_dir, asset_dir)):
+            dirs[:] = sorted(name for name in dirs if not name.startswith('.'))
+            for name in sorted(names):
+                if name.startswith('.'):
+                    continue
+                source = os.path.join(root, name)
+                path = os.path.relpath(source, static_dir).replace(os.sep, '/')
+                with open(source, 'rb') as f:
+                    stat_result = os.fstat(f.fileno())
+                    data = f.read()
+                target = fingerprinted(path, hashlib.sha256(data).hexdigest())
+                variants = compressed_variants(data)
+                os.makedirs(os.path.dirname(os.path.join(dist, target)), exist_ok=True)
+                outputs = {target: data} | {target + suffix: variants[encoding]
+                                            for encoding, suffix in ENCODINGS if encoding in variants}
+                for output, body in outputs.items():
+                    output = os.path.join(dist, output)
+                    if not os.path.exists(output):
+                        with open(output + '.tmp', 'wb') as f:
+                            f.write(body)
+                        os.replace(output + '.tmp', output)
+                files[path] = {'path': target, 'size': len(data), 'mtime_ns': stat_result.st_mtime_ns,
+                               'encodings': {encoding: len(body) for encoding, body in variants.items()}}
+
+    manifest = {'files': files}
+    with open(os.path.join(dist, MANIFEST + '.tmp'), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(os.path.join(dist, MANIFEST + '.tmp'), os.path.join(dist, MANIFEST))
+
+    # Drop the outputs of earlier builds
+    current = {entry['path'] + suffix for entry in files.values() for suffix in ('', '.gz', '.br')}
+    for root, _, names in os.walk(dist):
+        for name in names:
+            path = os.path.relpath(os.path.join(root, name), dist).replace(os.sep, '/')
+            if path != MANIFEST and path not in current:
+                os.remove(os.path.join(root, name))
+    return manifest
+
+
+class AssetStaticFiles(StaticFiles):
+    """StaticFiles serving the built assets precompressed, fingerprinted ones immutable"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._manifest_mtime = None
+        self._assets = {}
+        self._fingerprinted = {}
+
+    def manifest(self):
+        """Built assets by original path, reloaded when the manifest changes"""
+        path = os.path.join(self.directory, DIST, MANIFEST)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._manifest_mtime:
+            assets = {}
+            if mtime is not None:
+                try:
+                    with open(path) as f:
+                        assets = json.load(f)['files']
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning("Could not read the asset manifest %s: %s", path, e)
+            self._assets = assets
+            self._fingerprinted = {DIST + '/' + entry['path']: original for original, entry in assets.items()}
+            self._manifest_mtime = mtime
+        return self._assets
+
+    def built(self, path):
+        """Manifest entry of an asset, or None if it was not built or has changed since"""
+        entry = self.manifest().get(path)
+        if entry is None:
+            return None
+        try:
+            stat_result = os.stat(os.path.join(self.directory, path))
+        except OSError:
+            return None
+        if (stat_result.st_size, stat_result.st_mtime_ns) != (entry['size'], entry['mtime_ns']):
+            return None
+        return entry
+
+    def url(self, path):
+        """URL of an asset: its fingerprinted name when built, else its original path"""
+        entry = self.built(path)
+        if entry is None:
+            return '/static/' + path
+        return '/static/%s/%s' % (DIST, entry['path'])
+
+    async def get_response(self, path, scope):
+        self.manifest()
+        path = path.replace(os.sep, '/')
+        original = self._fingerprinted.get(path)
+        if original is not None:
+            # A fingerprinted name always holds the same content
+            entry = self._assets[original]
+        else:
+            original = path
+            entry = self.built(path)
+        if entry is None or scope['method'] not in ('GET', 'HEAD'):
+            return await super().get_response(path, scope)
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_codings(request_headers.get('accept-encoding'))
+        encoding, suffix = next(((encoding, suffix) for encoding, suffix in ENCODINGS
+                                 if encoding in entry['encodings'] and (encoding in accepted or '*' in accepted)),
+                                (None, ''))
+        full_path = os.path.join(self.directory, DIST, entry['path'] + suffix)
+        try:
+            stat_result = os.stat(full_path)
+        except OSError:
+            return await super().get_response(path, scope)
+
+        headers = {'Vary': 'Accept-Encoding',
+                   'Cache-Control': IMMUTABLE if path != original else 'no-cache'}
+        if encoding is not None:
+            headers['Content-Encoding'] = encoding
+        media_type = mimetypes.guess_type(original)[0] or 'application/octet-stream'
+        response = FileResponse(full_path, stat_result=stat_result, media_type=media_type, headers=headers)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == '__main__':
+    manifest = build(sys.argv[1] if len(sys.argv) > 1 else STATIC_DIR)
+    size = sum(entry['size'] for entry in manifest['files'].values())
+    gzipped = sum(entry['encodings'].get('gzip', entry['size']) for entry in manifest['files'].values())
+    print(f"{len(manifest['files'])} assets, {size} bytes, {gzipped} bytes gzipped")
@@ -0,0 +1,94 @@
+"""Bounded LRU cache of rendered JSON responses with ETag revalidation.
+
+Responses are keyed on the route, the normalized query string and the
+version of every dataset they read, so reloading a dataset naturally
+invalidates its entries.  Each entry carries a strong ETag (a hash of the
+body) and requests sending a matching ``If-None-Match`` get a 304.
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+
+from fastapi.responses import Response
+
+from app.metrics import stage
+from app.serialize import dumps
+
+
+def etag_of(body):
+    return '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+
+class ResponseCache:
+    def __init__(self, registry, maxsize=512):
+        self.registry = registry
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+
+    def key(self, request, datasets):
+        params = tuple(sorted(request.query_params.multi_items()))
+        versions = tuple(self.registry.version(name) for name in datasets)
+        return request.url.path, params, versions
+
+    def respond(self, request, datasets, compute, headers=None):
+        """Answer a request from the cache, calling compute() on a miss
+
+        compute() returns the JSON content of the response; exceptions it
+        raises (e.g. HTTPException) propagate and nothing is cached.  headers
+        (e.g. Vary) are added to the response, 304s included.
+        """
+        key = self.key(request, datasets)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            content = compute()
+            with stage('serialize'):
+                body = dumps(content)
+            entry = (body, etag_of(body))
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        body, etag = entry
+        headers = dict(headers or {}, ETag=etag)
+        headers['Cache-Control'] = 'no-cache'
+        if etag_matches(request.headers.get('if-none-match'), etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type='application/json', headers=headers)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'not_modified': self.not_modified,
+            }
@@ -0,0 +1,162 @@
+"""NOAA climate division (climdiv) temperature store.
+
+The statewide climdiv files hold one fixed-width line per state and year::
+
+    0010021895  43.10  37.40 ... 44.90
+    ^^^ state code, ^ division, ^^ element, ^^^^ year, then 12 monthly values
+
+They are parsed once into a single float32 array indexed by
+(state, element, year, month) so that a state/year lookup is a direct index.
+"""
+import numpy as np
+import pandas as pd
+
+from app.metrics import scanned, timed
+from app.sidecar import read_arrays, read_frame
+
+ELEMENTS = ('tmpc', 'tmax', 'tmin')
+MISSING = -99.9
+RESOLUTIONS = ('monthly', 'annual', 'decadal')
+# Response keys of the series endpoint and the element each one reads
+SERIES = (('min', 'tmin'), ('max', 'tmax'), ('mean', 'tmpc'))
+
+
+MONTHS = ['m%02d' % month for month in range(1, 13)]
+
+
+def read_climdiv(path):
+    """Parse a climdiv file into a frame of state, year and 12 monthly values"""
+    with open(path, 'rb') as f:
+        lines = [line for line in f.read().splitlines() if line.strip()]
+    values = np.array(b' '.join(line[10:] for line in lines).split(), dtype=np.float32)
+    frame = pd.DataFrame(values.reshape(len(lines), 12), columns=MONTHS)
+    frame.insert(0, 'state', pd.Categorical([line[:3].decode() for line in lines]))
+    frame.insert(1, 'year', np.array([line[6:10] for line in lines], dtype=np.int16))
+    return frame
+
+
+class ClimdivStore:
+    """Monthly temperatures of every state, element and year"""
+
+    def __init__(self, states, first_year, values, present):
+        self.states = states
+        self.state_index = {code: i for i, code in enumerate(states)}
+        self.first_year = first_year
+        self.values = values
+        self.present = present
+
+    @classmethod
+    def from_files(cls, *paths):
+        """Build the store from one climdiv file per element of ELEMENTS"""
+        frames = [read_frame(path, read_climdiv) for path in paths]
+        states = sorted(set().union(*(frame['state'].cat.categories for frame in frames)))
+        state_index = {code: i for i, code in enumerate(states)}
+        first_year = int(min(frame['year'].min() for frame in frames))
+        last_year = int(max(frame['year'].max() for frame in frames))
+
+        shape = (len(states), len(paths), last_year - first_year + 1)
+        values = np.full(shape + (12,), np.nan, dtype=np.float32)
+        present = np.zeros(shape, dtype=bool)
+        for element, frame in enumerate(frames):
+            # Map each frame's category codes onto the store's state axis
+            lookup = np.array([state_index[code] for code in frame['state'].cat.categories])
+            rows = lookup[frame['state'].cat.codes.to_numpy()]
+            years = frame['year'].to_numpy() - first_year
+            values[rows, element, years] = frame[MONTHS].to_numpy()
+            present[rows, element, years] = True
+        return cls(states, first_year, values, present)
+
+    def to_arrays(self):
+        """(arrays, meta) of the store, as saved by sidecar.read_arrays"""
+        return ({'values': self.values, 'present': self.present},
+                {'states': list(self.states), 'first_year': self.first_year})
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(meta['states'], meta['first_year'], arrays['values'], arrays['present'])
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.present.nbytes
+
+    def __len__(self):
+        return int(self.present.sum())
+
+    def offset(self, state_code, year):
+        """Return the (state, year) offsets of a lookup, or None if absent"""
+        state = self.state_index.get(state_code)
+        if state is None:
+            return None
+        year_offset = year - self.first_year
+        if not 0 <= year_offset < self.values.shape[2]:
+            return None
+        return state, year_offset
+
+    def monthly(self, state_code, year, element='tmpc'):
+        """Return the 12 monthly values of a state and year, or None"""
+        offset = self.offset(state_code, year)
+        element = ELEMENTS.index(element)
+        if offset is None or not self.present[offset[0], element, offset[1]]:
+            return None
+        return self.values[offset[0], element, offset[1]]
+
+    @timed('filter')
+    def rows(self, state_code, years, element='tmpc'):
+        """Return [year, jan, ..., dec] rows for the given years, in year order"""
+        rows = []
+        years = sorted(set(years))
+        scanned(len(years))
+        for year in years:
+            monthly = self.monthly(state_code, year, element)
+            if monthly is not None:
+                rows.append([str(year)] + np.round(monthly.astype(np.float64), 2).tolist())
+        return rows
+
+    @timed('aggregate')
+    def series(self, state_code, years, resolution='monthly'):
+        """Return the min, max and mean series of a state over the given years
+
+        ``monthly`` keeps the 12 values of each year, ``annual`` and ``decadal``
+        average them per year or per decade (labelled by its first year).
+        Missing months are reported as None and left out of the means.
+        Returns None for an unknown state code.
+        """
+        state = self.state_index.get(state_code)
+        if state is None:
+            return None
+        offsets = np.unique(np.asarray(list(years), dtype=int)) - self.first_year
+        offsets = offsets[(offsets >= 0) & (offsets < self.values.shape[2])]
+        offsets = offsets[self.present[state][:, offsets].any(axis=0)]
+        scanned(len(offsets))
+
+        elements = [ELEMENTS.index(element) for _, element in SERIES]
+        values = self.values[state][elements][:, offsets]
+        values = np.where(values == np.float32(MISSING), np.nan, values).astype(np.float64)
+        periods = offsets + self.first_year
+
+        if resolution != 'monthly':
+            if resolution == 'decadal':
+                periods, groups = np.unique(periods // 10 * 10, return_inverse=True)
+            else:
+                groups = np.arange(len(periods))
+            sums = np.zeros((len(elements), len(periods)))
+            counts = np.zeros((len(elements), len(periods)))
+            np.add.at(sums.T, groups, np.nansum(values, axis=2).T)
+            np.add.at(counts.T, groups, (~np.isnan(values)).sum(axis=2).T)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                values = sums / counts
+
+        values = np.round(values, 2)
+        result = {'state_code': state_code, 'resolution': resolution, 'years': periods.tolist()}
+        for i, (key, _) in enumerate(SERIES):
+            result[key] = np.where(np.isnan(values[i]), None, values[i]).tolist()
+        return result
+
+
+def build_climdiv(*paths):
+    return ClimdivStore.from_files(*paths).to_arrays()
+
+
+def load_climdiv(*paths):
+    """Load the store, memory-mapped from its sidecar when the files are unchanged"""
+    return ClimdivStore.from_arrays(*read_arrays(paths, build_climdiv))
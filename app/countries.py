@@ -0,0 +1,173 @@
+"""Canonical country registry keyed by ISO3.
+
+Every country gets a dense integer id.  The countries are the ISO3-coded
+entities of the OWID emissions export plus EXTRA_COUNTRIES; their names in
+the World Bank population table and the hand-maintained ALIASES (WHO,
+geojson and continent-list spellings) all point to the same id through one
+normalized-name index.  Loaders turn their country columns into ids with
+ids(), so joins are integer-key merges, and every name that cannot be
+resolved is recorded per source in UNMATCHED instead of silently dropping
+out of a join.
+"""
+import logging
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from app.sidecar import read_frame
+
+logger = logging.getLogger(__name__)
+
+# Countries and territories without an ISO3 code in the OWID export
+EXTRA_COUNTRIES = {
+    'ASM': 'American Samoa',
+    'CYM': 'Cayman Islands',
+    'GIB': 'Gibraltar',
+    'GUM': 'Guam',
+    'IMN': 'Isle of Man',
+    'MAF': 'Saint Martin (French part)',
+    'MNP': 'Northern Mariana Islands',
+    'PRI': 'Puerto Rico',
+    'VIR': 'United States Virgin Islands',
+    'XKX': 'Kosovo',
+}
+
+# Spellings used by sources without codes -> ISO3
+ALIASES = {
+    # WHO
+    'Bolivia (Plurinational State of)': 'BOL',
+    'Brunei Darussalam': 'BRN',
+    'Cabo Verde': 'CPV',
+    'Côte d’Ivoire': 'CIV',
+    "Democratic People's Republic of Korea": 'PRK',
+    'Democratic Republic of the Congo': 'COD',
+    'Iran (Islamic Republic of)': 'IRN',
+    "Lao People's Democratic Republic": 'LAO',
+    'Micronesia (Federated States of)': 'FSM',
+    'Netherlands (Kingdom of the)': 'NLD',
+    'occupied Palestinian territory, including east Jerusalem': 'PSE',
+    'Republic of Korea': 'KOR',
+    'Republic of Moldova': 'MDA',
+    'Russian Federation': 'RUS',
+    'Syrian Arab Republic': 'SYR',
+    'Tanzania, United Republic of': 'TZA',
+    'Timor-Leste': 'TLS',
+    'Türkiye': 'TUR',
+    'United Kingdom of Great Britain and Northern Ireland': 'GBR',
+    'United Republic of Tanzania': 'TZA',
+    'United States of America': 'USA',
+    'Venezuela (Bolivarian Republic of)': 'VEN',
+    'Viet Nam': 'VNM',
+    # data_processing/coro.py
+    'DR Congo': 'COD',
+    'Czech Republic': 'CZE',
+    # geojson
+    'Guinea Bissau': 'GNB',
+    'Ivory Coast': 'CIV',
+    'Macedonia': 'MKD',
+    'Republic of Serbia': 'SRB',
+    'Republic of the Congo': 'COG',
+    'Swaziland': 'SWZ',
+    'The Bahamas': 'BHS',
+    'USA': 'USA',
+    # Countries by continents.csv
+    'Burkina': 'BFA',
+    'Burma (Myanmar)': 'MMR',
+    'Micronesia': 'FSM',
+    'Vatican City': 'VAT',
+}
+
+# Sources -> names that could not be resolved, filled by CountryRegistry.ids()
+UNMATCHED = {}
+
+ISO3 = re.compile(r'^[A-Z]{3}$')
+
+
+def normalize(name):
+    """Case, accent, apostrophe and whitespace insensitive form of a name"""
+    name = unicodedata.normalize('NFKD', str(name)).replace('’', "'").replace('‘', "'")
+    name = name.encode('ascii', 'ignore').decode().lower().replace('&', 'and')
+    return ' '.join(name.split())
+
+
+class CountryRegistry:
+    """ISO3 codes and names of every country, with an alias index to their ids"""
+
+    def __init__(self):
+        self.codes = []
+        self.names = []
+        self.id_of_code = {}
+        self.index = {}
+
+    @classmethod
+    def from_frames(cls, owid, population):
+        """Build the registry from the OWID emissions export and the World Bank table"""
+        registry = cls()
+        coded = owid[['Code', 'Entity']].dropna().drop_duplicates()
+        for code, name in zip(coded['Code'], coded['Entity']):
+            if ISO3.match(code):
+                registry.add(code, name)
+        for code, name in EXTRA_COUNTRIES.items():
+            registry.add(code, name)
+        # World Bank names of known countries; its aggregates have no id
+        for code, name in zip(population['Country Code'], population['Country Name']):
+            if code in registry.id_of_code:
+                registry.alias(name, code)
+        for name, code in ALIASES.items():
+            registry.alias(name, code)
+        return registry
+
+    def __len__(self):
+        return len(self.codes)
+
+    def add(self, code, name):
+        """Register a country (once) and its canonical name; returns its id"""
+        if code not in self.id_of_code:
+            self.id_of_code[code] = len(self.codes)
+            self.codes.append(code)
+            self.names.append(name)
+        self.alias(name, code)
+        return self.id_of_code[code]
+
+    def alias(self, name, code):
+        key = normalize(name)
+        country = self.id_of_code[code]
+        if self.index.setdefault(key, country) != country:
+            logger.debug("Alias %r of %s already names %s", name, code, self.codes[self.index[key]])
+
+    def lookup(self, name):
+        """Id of a country name or alias, or -1"""
+        return self.index.get(normalize(name), -1)
+
+    def ids(self, source, codes=None, names=None):
+        """int32 country ids of a column of ISO3 codes and/or names (-1 if unknown)
+
+        Codes are resolved first and names fill in where the code is missing
+        or unknown.  Names that still do not resolve are recorded under
+        UNMATCHED[source] and logged.
+        """
+        values = codes if codes is not None else names
+        result = np.full(len(values), -1, dtype=np.int32)
+        if codes is not None:
+            keys, uniques = pd.factorize(pd.Series(codes, copy=False), use_na_sentinel=True)
+            lookup = np.array([self.id_of_code.get(code, -1) for code in uniques] + [-1], dtype=np.int32)
+            result = lookup[keys]
+        if names is not None:
+            missing = result < 0
+            keys, uniques = pd.factorize(pd.Series(names, copy=False)[missing], use_na_sentinel=True)
+            lookup = np.array([self.lookup(name) for name in uniques] + [-1], dtype=np.int32)
+            result[missing] = lookup[keys]
+            unmatched = sorted(str(name) for name, country in zip(uniques, lookup) if country < 0)
+        else:
+            unmatched = sorted(str(code) for code in pd.unique(pd.Series(codes, copy=False)[result < 0].dropna()))
+        UNMATCHED[source] = unmatched
+        if unmatched:
+            logger.warning("%d %s countries not in the country registry: %s", len(unmatched), source,
+                           ", ".join(unmatched[:10]) + (", ..." if len(unmatched) > 10 else ""))
+        return result
+
+
+def load_countries(owid_path, population_path):
+    return CountryRegistry.from_frames(read_frame(owid_path), read_frame(population_path))
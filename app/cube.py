@@ -0,0 +1,134 @@
+"""Materialized aggregate cube over the WHO LE and HLE rows.
+
+Every row is keyed on five dimensions (region, country, year, sex,
+indicator), each dictionary-encoded into integer codes.  At build time the
+values are aggregated (sum, count, min, max) for every one of the 32 subsets
+of the dimensions, so a roll-up query picks the smallest cuboid holding its
+group-by and filter dimensions, filters its cells and combines them; the
+raw rows are never rescanned.  Top/bottom-k rankings are taken from the
+same cells.
+"""
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from app.life import age_of
+from app.metrics import scanned, stage, timed
+from app.serialize import shaped
+
+# API dimension -> frame column
+DIMENSIONS = {
+    'region': 'ParentLocation',
+    'country': 'Location',
+    'year': 'Period',
+    'sex': 'Dim1',
+    'indicator': 'Indicator',
+}
+STATS = ('mean', 'min', 'max', 'count')
+PARTIALS = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+
+def roll_up(cells, dims):
+    """Combine the partial aggregates of cells into groups of dims"""
+    if not dims:
+        return pd.DataFrame({name: [getattr(cells[name], how)()] for name, how in PARTIALS.items()})
+    return cells.groupby(list(dims), sort=True).agg(PARTIALS).reset_index()
+
+
+class AggregateCube:
+    """Sum, count, min and max of FactValueNumeric for every subset of DIMENSIONS"""
+
+    def __init__(self, *frames):
+        frame = pd.concat([
+            pd.DataFrame({column: source[column].to_numpy(dtype=object) for column in DIMENSIONS.values()}
+                         # float32 values widened through their shortest repr, as in column_values()
+                         | {'value': source['FactValueNumeric'].astype(str).astype(np.float64).to_numpy()})
+            for source in frames
+        ], ignore_index=True)
+        self.labels = {}
+        self.lookup = {}
+        codes = {}
+        for dim, column in DIMENSIONS.items():
+            codes[dim], labels = pd.factorize(frame[column], sort=True)
+            self.labels[dim] = np.array(labels.tolist() + [None], dtype=object)
+            self.lookup[dim] = {str(label).lower(): code for code, label in enumerate(labels.tolist())}
+        self.labels['year'] = np.array([int(year) for year in self.labels['year'][:-1]] + [None], dtype=object)
+        self.lookup['year'] = {str(year): code for code, year in enumerate(self.labels['year'][:-1])}
+
+        # Metric (source frame) and age of every indicator, for the metric/age filters
+        self.metric_of = {}
+        for source, name in zip(frames, ('le', 'hle')):
+            for indicator in pd.unique(source['Indicator'].astype(str)):
+                self.metric_of[self.lookup['indicator'][indicator.lower()]] = name
+        indicators = pd.Series(self.labels['indicator'][:-1].astype(str))
+        self.age_of = dict(enumerate(age_of(indicators)))
+
+        values = frame['value']
+        base = pd.DataFrame(codes).assign(sum=values.fillna(0), count=values.notna().astype(np.int64),
+                                          min=values, max=values)
+        base = roll_up(base, list(DIMENSIONS))
+        self.rows = len(frame)
+        self.cuboids = {}
+        for size in range(len(DIMENSIONS) + 1):
+            for dims in combinations(DIMENSIONS, size):
+                self.cuboids[dims] = base if size == len(DIMENSIONS) else roll_up(base, dims)
+
+    @property
+    def nbytes(self):
+        return int(sum(cuboid.memory_usage(deep=True).sum() for cuboid in self.cuboids.values()))
+
+    def codes(self, dim, values):
+        """Codes of the given (case-insensitive) labels of a dimension; unknown ones are skipped"""
+        lookup = self.lookup[dim]
+        return [lookup[str(value).strip().lower()] for value in values if str(value).strip().lower() in lookup]
+
+    def indicators(self, metrics=None, ages=None):
+        """Indicator codes of the given metrics ('le', 'hle') and ages ('birth', '60')"""
+        return [code for code in range(len(self.labels['indicator']) - 1)
+                if (metrics is None or self.metric_of.get(code) in metrics)
+                and (ages is None or self.age_of.get(code) in ages)]
+
+    @timed('aggregate')
+    def query(self, by=(), filters=None, stats=STATS, rank=None, k=5, of='country', shape='records'):
+        """Roll-up of the cells matching filters (dim -> codes), grouped by the `by` dimensions
+
+        With rank='top' or 'bottom', returns the k members of `of` with the
+        highest or lowest mean in every group, with their rank.
+        """
+        filters = filters or {}
+        group = list(by) + ([of] if rank and of not in by else [])
+        used = set(group) | set(filters)
+        with stage('filter'):
+            cells = self.cuboids[tuple(dim for dim in DIMENSIONS if dim in used)]
+            scanned(len(cells))
+            mask = np.ones(len(cells), dtype=bool)
+            for dim, codes in filters.items():
+                mask &= np.isin(cells[dim].to_numpy(), codes)
+            cells = cells[mask]
+        if not len(cells):
+            return shaped(group + list(stats) + (['rank'] if rank else []),
+                          [[] for _ in group + list(stats) + (['rank'] if rank else [])], shape)
+
+        result = roll_up(cells, group)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result['mean'] = np.where(result['count'] > 0, result['sum'] / result['count'], np.nan)
+        if rank:
+            result = result[result['count'] > 0].sort_values(
+                list(by) + ['mean'], ascending=[True] * len(by) + [rank == 'bottom'], kind='stable')
+            result['rank'] = result.groupby(list(by), sort=False).cumcount() + 1 if by else \
+                np.arange(1, len(result) + 1)
+            result = result[result['rank'] <= k]
+
+        keys = group + list(stats) + (['rank'] if rank else [])
+        columns = []
+        for key in keys:
+            if key in DIMENSIONS:
+                columns.append(self.labels[key][result[key].to_numpy()].tolist())
+            else:
+                values = result[key].to_numpy()
+                if key in ('count', 'rank'):
+                    columns.append(values.astype(int).tolist())
+                else:
+                    columns.append(np.where(np.isnan(values), None, values).tolist())
+        return shaped(keys, columns, shape)
@@ -0,0 +1,217 @@
+"""In-memory registry of the datasets served by the API.
+
+Each dataset is parsed once (at startup) and shared read-only by every
+endpoint.  A dataset is reloaded transparently when one of its source files
+changes on disk.
+"""
+import logging
+import os
+import threading
+import time
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from app.climdiv import ELEMENTS, load_climdiv
+from app.countries import load_countries
+from app.emissions import load_alluvial, load_emissions
+from app.geometry import SOURCES as GEOMETRY_SOURCES, load_geometry
+from app.metrics import timed
+from app.population import load_population
+from app.sidecar import read_frame
+
+DATA_DIR = os.environ.get('VIZ_DATA_DIR', "app/static/data")
+# OWID per-capita export with the original entity names, as used by the
+# continent lists (the copy in DATA_DIR is renamed for the choropleth)
+EMISSIONS_PER_CAPITA = "data_processing/output/co-emissions-per-capita.csv"
+
+logger = logging.getLogger(__name__)
+
+
+def data_path(name):
+    return os.path.join(DATA_DIR, name)
+
+
+# Files the country registry is built from (ISO3 codes and their names)
+COUNTRY_SOURCES = (data_path('co2-fossil-plus-land-use.csv'), data_path('population.csv'))
+
+# Vendored world geometry (python -m app.geometry fetch)
+GEO_DIR = os.environ.get('VIZ_GEO_DIR', data_path('geo'))
+
+
+# Compact in-memory schema of the WHO exports: every other string column is
+# dictionary-encoded and every other float column float32.  The values have two
+# decimals, so float32 keeps their shortest decimal form (see life.column_values).
+WHO_DTYPES = {
+    'Period': 'int16',
+    'FactValueNumeric': 'float32',
+    'FactValueNumericLow': 'float32',
+    'FactValueNumericHigh': 'float32',
+}
+
+
+def read_who(path):
+    """Parse a WHO LE/HLE export into the compact schema"""
+    df = pd.read_csv(path, dtype=WHO_DTYPES)
+    for column in df.columns:
+        if df[column].dtype == object:
+            df[column] = df[column].astype('category')
+        elif df[column].dtype == np.float64:
+            df[column] = df[column].astype(np.float32)
+    return df
+
+
+def load_who(path):
+    """Load a WHO LE/HLE export in the compact schema
+
+    Only the display form of the strings is held; the lower-cased lookup
+    forms are derived from the same dictionaries (life.lookup_form).
+    """
+    return read_frame(path, read_who)
+
+
+def frame_nbytes(data):
+    """Memory footprint of a loaded dataset in bytes"""
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        return int(data.memory_usage(deep=True).sum())
+    return int(getattr(data, 'nbytes', 0))
+
+
+class Dataset:
+    def __init__(self, name, loader, paths):
+        self.name = name
+        self.loader = loader
+        self.paths = paths
+        self.data = None
+        self.mtimes = None
+        self.version = 0
+        self.loaded_at = None
+        self.derived = {}
+
+    def current_mtimes(self):
+        return tuple(os.stat(path).st_mtime_ns for path in self.paths)
+
+    def load(self, mtimes=None):
+        mtimes = mtimes or self.current_mtimes()
+        started = time.perf_counter()
+        self.data = self.loader(*self.paths)
+        self.derived = {}
+        self.mtimes = mtimes
+        self.version += 1
+        self.loaded_at = time.time()
+        logger.info("Loaded dataset %s v%d in %.1f ms (%d bytes)", self.name, self.version,
+                    (time.perf_counter() - started) * 1000, frame_nbytes(self.data))
+
+
+class DatasetRegistry:
+    """Parsed datasets keyed by name, reloaded when their files change"""
+
+    def __init__(self):
+        self._datasets = {}
+        self._combined = {}
+        self._lock = threading.RLock()
+
+    def register(self, name, loader, *paths):
+        self._datasets[name] = Dataset(name, loader, paths)
+
+    def load_all(self):
+        """Load every registered dataset, skipping the ones missing on disk"""
+        for name in self._datasets:
+            try:
+                self.get(name)
+            except FileNotFoundError as e:
+                logger.warning("Dataset %s not loaded: %s", name, e)
+
+    @timed('load')
+    def get(self, name):
+        """Return the shared, read-only data of a dataset"""
+        dataset = self._datasets[name]
+        mtimes = dataset.current_mtimes()
+        if mtimes != dataset.mtimes:
+            with self._lock:
+                if mtimes != dataset.mtimes:
+                    dataset.load(mtimes)
+        return dataset.data
+
+    def invalidate(self, *names):
+        """Reload the given datasets (default: all) on their next access"""
+        with self._lock:
+            for name in names or list(self._datasets):
+                self._datasets[name].mtimes = None
+
+    @timed('load')
+    def derived(self, name, builder):
+        """Return builder(data) of a dataset, built once per loaded version"""
+        self.get(name)
+        dataset = self._datasets[name]
+        with self._lock:
+            if builder not in dataset.derived:
+                dataset.derived[builder] = builder(dataset.data)
+            return dataset.derived[builder]
+
+    @timed('load')
+    def combined(self, names, builder):
+        """Return builder(*datas) of several datasets, rebuilt when any of them reloads"""
+        key = (builder, tuple(names))
+        with self._lock:
+            datas = [self.get(name) for name in names]
+            versions = tuple(self._datasets[name].version for name in names)
+            entry = self._combined.get(key)
+            if entry is None or entry[0] != versions:
+                entry = (versions, builder(*datas))
+                self._combined[key] = entry
+            return entry[1]
+
+    def version(self, name):
+        self.get(name)
+        return self._datasets[name].version
+
+    def footprint(self):
+        """Report rows, bytes and version of every loaded dataset"""
+        report = {}
+        for name, dataset in self._datasets.items():
+            if dataset.data is None:
+                continue
+            report[name] = {
+                'paths': list(dataset.paths),
+                'version': dataset.version,
+                'loaded_at': dataset.loaded_at,
+                'rows': len(dataset.data),
+                'bytes': frame_nbytes(dataset.data),
+            }
+        return report
+
+
+registry = DatasetRegistry()
+registry.register('le', load_who, data_path('le.csv'))
+registry.register('hle', load_who, data_path('hle.csv'))
+registry.register('population', load_population, data_path('population.csv'))
+registry.register('countries', load_countries, *COUNTRY_SOURCES)
+registry.register('climdiv', load_climdiv,
+                  *(data_path(f'climdiv-{element}st-v1.0.0-20241205') for element in ELEMENTS))
+registry.register('emissions', load_emissions, EMISSIONS_PER_CAPITA,
+                  data_path('countries_with_continents.csv'), data_path('Countries by continents.csv'),
+                  *COUNTRY_SOURCES)
+registry.register('alluvial', load_alluvial, data_path('Alluvial.csv'))
+for geometry, (geometry_file, _) in GEOMETRY_SOURCES.items():
+    registry.register('geometry-' + geometry, partial(load_geometry, geometry), os.path.join(GEO_DIR, geometry_file))
+
+
+def schema_report(names=('le', 'hle')):
+    """Bytes of the WHO datasets parsed with pandas defaults vs. the compact schema"""
+    report = {}
+    for name in names:
+        path = registry._datasets[name].paths[0]
+        if not os.path.exists(path):
+            continue
+        before = frame_nbytes(pd.read_csv(path))
+        after = frame_nbytes(read_who(path))
+        report[name] = {'path': path, 'before': before, 'after': after}
+    return report
+
+
+if __name__ == '__main__':
+    print(f"{'dataset':<10}{'default bytes':>16}{'compact bytes':>16}{'ratio':>8}")
+    for name, sizes in schema_report().items():
+        print(f"{name:<10}{sizes['before']:>16}{sizes['after']:>16}{sizes['before'] / sizes['after']:>7.1f}x")
@@ -0,0 +1,247 @@
+"""Year-indexed CO₂ emissions tables behind the /emissions endpoints.
+
+The OWID exports are kept sorted by Year so the rows of a year or a range of
+years are one contiguous slice found by binary search.  The derived views
+(ranking of one year, average over a range, per-continent summary, alluvial
+rows) are computed on demand from that slice and memoized per loaded version,
+replacing the year-baked files the data_processing pipeline used to ship.
+"""
+from functools import cached_property, lru_cache
+
+import numpy as np
+import pandas as pd
+
+from app.countries import load_countries
+from app.life import column_values
+from app.metrics import scanned, stage, timed
+from app.ranking import RankingIndex, select
+from app.serialize import shaped
+from app.sidecar import read_frame
+
+PER_CAPITA = "Annual CO₂ emissions (per capita)"
+TOP_COUNTRIES = 5
+# Ranking measures of the alluvial table
+ALLUVIAL_MEASURES = {
+    'total': "Annual CO₂ emissions including land-use change",
+    'land_use': "Annual CO₂ emissions from land-use change",
+    'fossil': "Annual CO₂ emissions",
+}
+# Emission type nodes of the alluvial flows and the column flowing into each
+FLOW_TYPES = {
+    'Fossil': ALLUVIAL_MEASURES['fossil'],
+    'Land': ALLUVIAL_MEASURES['land_use'],
+}
+
+
+def records(frame, shape='records'):
+    """JSON records of a frame (or its columnar form), with missing values as None"""
+    keys = list(frame.columns)
+    return shaped(keys, [column_values(frame[key]) for key in keys], shape)
+
+
+def by_year(frame):
+    """Rows of a frame stably sorted by Year, with a fresh index"""
+    return frame.sort_values('Year', kind='stable').reset_index(drop=True)
+
+
+def read_by_year(path):
+    """Parse a CSV sorted by Year, so its sidecar can be used as is"""
+    return by_year(pd.read_csv(path))
+
+
+def read_alluvial(path):
+    """Parse the alluvial table: countries only (aggregates have no code, and
+    World is not a country), sorted by Year"""
+    frame = pd.read_csv(path).dropna(subset=['Code'])
+    return by_year(frame[frame['Entity'] != 'World'].drop(columns=['Country']))
+
+
+class YearTable:
+    """Rows of a frame sorted by Year, sliced by binary search"""
+
+    def __init__(self, frame):
+        # Frames read sorted from their sidecar are kept as is (memory-mapped)
+        self.frame = frame if frame['Year'].is_monotonic_increasing else by_year(frame)
+        self.years = self.frame['Year'].to_numpy()
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def nbytes(self):
+        return int(self.frame.memory_usage(deep=True).sum())
+
+    @property
+    def first_year(self):
+        return int(self.years[0]) if len(self.years) else None
+
+    @property
+    def last_year(self):
+        return int(self.years[-1]) if len(self.years) else None
+
+    def bounds(self, start, end):
+        """(first, last + 1) row positions of the years start..end (inclusive)"""
+        return (np.searchsorted(self.years, start, side='left'),
+                np.searchsorted(self.years, end, side='right'))
+
+    def span(self, start, end):
+        """Rows of the years start..end (inclusive), in source order"""
+        with stage('filter'):
+            lo, hi = self.bounds(start, end)
+            scanned(hi - lo)
+            return self.frame.iloc[lo:hi]
+
+    def continent(self, rows):
+        """Continent of each of the given rows"""
+        return rows['Continent']
+
+
+class EmissionsStore(YearTable):
+    """Per-capita emissions of every entity, with the continent of each country"""
+
+    def __init__(self, per_capita, continents, countries, country_registry, maxsize=256):
+        super().__init__(per_capita)
+        # Entities and the continent lists are matched on country ids
+        self.country = country_registry.ids('emissions per capita', codes=self.frame['Code'],
+                                            names=self.frame['Entity'])
+        continent_ids = country_registry.ids('countries_with_continents', names=continents['Country'])
+        continent_of = dict(zip(continent_ids[continent_ids >= 0].tolist(),
+                                continents['Continent'][continent_ids >= 0]))
+        self.row_continent = np.array([continent_of.get(country) for country in self.country.tolist()],
+                                      dtype=object)
+        # Only the countries of the continent lists take part in the summaries
+        valid = country_registry.ids('Countries by continents', names=countries['Country'])
+        self.summarized = np.isin(self.country, valid[valid >= 0]) & (self.row_continent != None)  # noqa: E711
+        self.one_year = lru_cache(maxsize=maxsize)(self._one_year)
+        self.average = lru_cache(maxsize=maxsize)(self._average)
+        self.continent_summary = lru_cache(maxsize=maxsize)(self._continent_summary)
+
+    @cached_property
+    def ranking(self):
+        """Countries (not aggregates) ranked by per-capita emissions, per continent"""
+        countries = self.country >= 0
+        return RankingIndex('Entity', self.frame['Entity'][countries], self.years[countries],
+                            {'per_capita': self.frame[PER_CAPITA].to_numpy()[countries]},
+                            {'continent': self.row_continent[countries]})
+
+    def continent(self, rows):
+        """Continent of each of the given rows (None outside the continent lists)"""
+        return pd.Series(self.row_continent[rows.index.to_numpy()], index=rows.index)
+
+    @timed('aggregate')
+    def _one_year(self, year, shape='records'):
+        """Per-capita emissions of the countries (not the OWID aggregates) in one year, highest first"""
+        rows = self.span(year, year)
+        rows = rows[self.country[rows.index.to_numpy()] >= 0]
+        return records(rows.sort_values(PER_CAPITA, ascending=False, kind='stable'), shape)
+
+    @timed('aggregate')
+    def _average(self, start, end, shape='records'):
+        """Average per-capita emissions of every country (not the OWID aggregates) over start..end"""
+        rows = self.span(start, end)
+        rows = rows[self.country[rows.index.to_numpy()] >= 0]
+        average = rows.groupby('Entity')[PER_CAPITA].mean().reset_index()
+        return records(average.rename(columns={PER_CAPITA: f"Average CO₂ emissions ({start}-{end})"}), shape)
+
+    @timed('aggregate')
+    def _continent_summary(self, year):
+        """Per-continent total with its top countries and the rest as 'Other'"""
+        lo, hi = self.bounds(year, year)
+        scanned(hi - lo)
+        summarized = self.summarized[lo:hi]
+        rows = self.frame.iloc[lo:hi][summarized].assign(Continent=self.row_continent[lo:hi][summarized])
+        summary = []
+        for continent, group in rows.groupby('Continent'):
+            total = float(group[PER_CAPITA].sum())
+            top = group.iloc[select(group[PER_CAPITA].to_numpy(), TOP_COUNTRIES)]
+            row = {'Continent': continent, 'annual_co2': total}
+            for i in range(TOP_COUNTRIES):
+                if i < len(top):
+                    row[f'country_{i + 1}'] = {top['Entity'].iat[i]: float(top[PER_CAPITA].iat[i])}
+                else:
+                    row[f'country_{i + 1}'] = None
+            row['other'] = {'Other': total - float(top[PER_CAPITA].sum())}
+            summary.append(row)
+        return summary
+
+
+class AlluvialTable(YearTable):
+    """Emissions of the countries of the alluvial chart, by year (as read by read_alluvial)"""
+
+    def __init__(self, frame, maxsize=256):
+        super().__init__(frame)
+        self.entity_codes, entities = pd.factorize(self.frame['Entity'].to_numpy(dtype=object))
+        self.entities = np.asarray(entities, dtype=object)
+        # Continent of every entity (its first row's), as codes for the flows
+        first = np.unique(self.entity_codes, return_index=True)[1]
+        self.continent_codes, continents = pd.factorize(self.frame['Continent'].to_numpy(dtype=object)[first])
+        self.continents = np.asarray(continents, dtype=object)
+        self.one_year = lru_cache(maxsize=maxsize)(self._one_year)
+        self.flows = lru_cache(maxsize=maxsize)(self._flows)
+
+    @cached_property
+    def ranking(self):
+        """Countries ranked by total, land-use and fossil emissions, per continent"""
+        return RankingIndex('Entity', self.frame['Entity'], self.years, {
+            measure: self.frame[column].to_numpy() for measure, column in ALLUVIAL_MEASURES.items()
+        }, {'continent': self.frame['Continent']})
+
+    @timed('aggregate')
+    def _one_year(self, year, shape='records'):
+        return records(self.span(year, year), shape)
+
+    @timed('aggregate')
+    def _flows(self, start, end, top=None, shape='records'):
+        """Continent -> country -> emission type links of the emissions over start..end
+
+        A country's emissions of each type are summed over the range;
+        negative net land-use emissions (sinks) carry no flow.  With top,
+        the countries of a continent beyond its top largest emitters are
+        folded into one "Other (<continent>)" node.
+        """
+        with stage('filter'):
+            lo, hi = self.bounds(start, end)
+            scanned(hi - lo)
+            codes = self.entity_codes[lo:hi]
+        totals = {}
+        for node, column in FLOW_TYPES.items():
+            values = self.frame[column].to_numpy(dtype=np.float64)[lo:hi]
+            sums = np.bincount(codes, weights=np.nan_to_num(values), minlength=len(self.entities))
+            totals[node] = np.maximum(sums, 0)
+        flow = sum(totals.values())
+
+        sources, targets, values = [], [], []
+        for continent, name in enumerate(self.continents):
+            members = np.flatnonzero((self.continent_codes == continent) & (flow > 0))
+            if not len(members):
+                continue
+            kept = members[select(flow[members], top)] if top else members[np.argsort(-flow[members], kind='stable')]
+            nodes = [(self.entities[entity], [entity]) for entity in kept.tolist()]
+            folded = np.setdiff1d(members, kept)
+            if len(folded):
+                nodes.append(('Other (%s)' % name, folded))
+            for node, entities in nodes:
+                sources.append(name)
+                targets.append(node)
+                values.append(float(flow[entities].sum()))
+            for node, entities in nodes:
+                for kind, sums in totals.items():
+                    value = float(sums[entities].sum())
+                    if value > 0:
+                        sources.append(node)
+                        targets.append(kind)
+                        values.append(value)
+        return shaped(['source', 'target', 'value'], [sources, targets, values], shape)
+
+
+def load_emissions(per_capita_path, continents_path, countries_path, *country_paths):
+    return EmissionsStore(
+        read_frame(per_capita_path, read_by_year),
+        read_frame(continents_path),
+        read_frame(countries_path, pd.read_csv, encoding='utf-8-sig'),
+        load_countries(*country_paths),
+    )
+
+
+def load_alluvial(path):
+    return AlluvialTable(read_frame(path, read_alluvial))
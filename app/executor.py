@@ -0,0 +1,121 @@
+"""Bounded thread executor running the data path off the event loop.
+
+Endpoints hand their filtering and serialization to run(), so a slow query
+only occupies one of `workers` threads and static or template routes keep
+being served.  At most `queue` calls wait for a thread; beyond that a
+request is rejected with 503, and a call that has not finished within
+`timeout` seconds (queueing included) answers 504.  The call itself cannot
+be interrupted and runs to completion in its thread.
+
+Configured with VIZ_EXECUTOR_WORKERS, VIZ_EXECUTOR_QUEUE and
+VIZ_EXECUTOR_TIMEOUT; counters and queue depth are reported by stats().
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+
+class BoundedExecutor:
+    def __init__(self, workers=4, queue=64, timeout=30.0):
+        self.workers = workers
+        self.max_queue = queue
+        self.timeout = timeout
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='data')
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.running = 0
+        self.peak_queue = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_seconds = 0.0
+        self.run_seconds = 0.0
+
+    @property
+    def queued(self):
+        return self.pending - self.running
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in a worker thread and return its result
+
+        Raises HTTPException 503 when the queue is full and 504 on timeout;
+        exceptions raised by fn propagate unchanged.
+        """
+        with self._lock:
+            if self.queued >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Server busy", headers={'Retry-After': '1'})
+            self.pending += 1
+            self.submitted += 1
+            self.peak_queue = max(self.peak_queue, self.queued)
+        submitted_at = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                self.wait_seconds += started - submitted_at
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.run_seconds += time.perf_counter() - started
+
+        def done(future):
+            with self._lock:
+                self.pending -= 1
+                if future.cancelled():
+                    return
+                if future.exception() is None:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+        # The call runs in the context of the request (see metrics.current)
+        future = self._pool.submit(contextvars.copy_context().run, call)
+        future.add_done_callback(done)
+        try:
+            # A call still waiting for a thread is cancelled on timeout
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self.timed_out += 1
+            raise HTTPException(status_code=504, detail="Request timed out")
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'timeout': self.timeout,
+                'running': self.running,
+                'queued': self.queued,
+                'peak_queued': self.peak_queue,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'mean_wait_ms': self.wait_seconds / finished * 1000 if finished else 0.0,
+                'mean_run_ms': self.run_seconds / finished * 1000 if finished else 0.0,
+            }
+
+
+def from_environ():
+    return BoundedExecutor(
+        workers=int(os.environ.get('VIZ_EXECUTOR_WORKERS', min(4, os.cpu_count() or 1))),
+        queue=int(os.environ.get('VIZ_EXECUTOR_QUEUE', 64)),
+        timeout=float(os.environ.get('VIZ_EXECUTOR_TIMEOUT', 30)),
+    )
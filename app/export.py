@@ -0,0 +1,118 @@
+"""Streaming exports of the year-indexed emission tables.
+
+Rows are filtered, projected and rendered one chunk at a time straight from
+the shared in-memory table, so an export holds at most CHUNK_ROWS rows at
+once whatever its size.  Output is CSV, NDJSON or an Arrow IPC stream (one
+record batch per chunk, with the optional ``pyarrow`` package), compressed on
+the fly with gzip, or brotli when the optional ``brotli`` package is installed.
+"""
+import csv
+import io
+import json
+import zlib
+
+import numpy as np
+
+from app import arrow
+from app.emissions import records
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CHUNK_ROWS = 5000
+MEDIA_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'arrow': arrow.MEDIA_TYPE,
+}
+
+
+def select_chunks(table, columns=None, entities=None, continents=None, start=None, end=None,
+                  chunk_rows=CHUNK_ROWS):
+    """Yield the matching rows of a year table as frames of at most chunk_rows rows
+
+    entities and continents are sets of lower-cased names; the year range is
+    inclusive and defaults to the whole table.
+    """
+    if table.first_year is None:
+        return
+    rows = table.span(table.first_year if start is None else start,
+                      table.last_year if end is None else end)
+    for offset in range(0, len(rows), chunk_rows):
+        chunk = rows.iloc[offset:offset + chunk_rows]
+        mask = np.ones(len(chunk), dtype=bool)
+        if entities:
+            mask &= chunk['Entity'].str.lower().isin(entities).to_numpy()
+        if continents:
+            mask &= table.continent(chunk).str.lower().isin(continents).to_numpy()
+        chunk = chunk[mask]
+        if len(chunk):
+            yield chunk if columns is None else chunk[columns]
+
+
+def render_csv(chunks, columns):
+    header = io.StringIO()
+    csv.writer(header, lineterminator='\n').writerow(columns)
+    yield header.getvalue().encode()
+    for chunk in chunks:
+        yield chunk.to_csv(header=False, index=False, lineterminator='\n').encode()
+
+
+def render_ndjson(chunks, columns):
+    for chunk in chunks:
+        yield ''.join(json.dumps(record, ensure_ascii=False, allow_nan=False) + '\n'
+                      for record in records(chunk)).encode()
+
+
+RENDERERS = {'csv': render_csv, 'ndjson': render_ndjson}
+
+
+def accepted_codings(header):
+    """Content codings an Accept-Encoding header accepts (q > 0)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def accepted_encoding(header):
+    """Best supported Content-Encoding of an Accept-Encoding header, or None"""
+    accepted = accepted_codings(header)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(stream, encoding):
+    """Compress a stream of byte chunks incrementally"""
+    if encoding is None:
+        yield from stream
+        return
+    if encoding == 'br':
+        compressor = brotli.Compressor()
+        compress_chunk, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        compress_chunk, finish = compressor.compress, compressor.flush
+    for chunk in stream:
+        data = compress_chunk(chunk)
+        if data:
+            yield data
+    yield finish()
+
+
+def export(table, fmt, columns, encoding, **predicates):
+    """Byte chunks of an export of a year table"""
+    chunks = select_chunks(table, columns, **predicates)
+    if fmt == 'arrow':
+        stream = arrow.render_stream(chunks, arrow.schema_of(table.frame[columns]))
+    else:
+        stream = RENDERERS[fmt](chunks, columns)
+    return compress(stream, encoding)
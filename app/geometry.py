@@ -0,0 +1,385 @@
+"""Locally served world geometry, pre-simplified into zoom tiers.
+
+The map pages draw country outlines from GeoJSON files kept under GEO_DIR;
+they are not part of the repository.  ``python -m app.geometry fetch``
+downloads them from SOURCES as a build/deploy step (on an air-gapped host,
+copy the files in) and ``python -m app.geometry check`` fails unless every
+one is present and loads.  The pages never fall back to remote copies.  A
+GeometryStore turns a file into a TopoJSON topology once, when it is
+loaded: a border shared by two countries becomes a single arc, so
+simplifying the arcs (Douglas-Peucker, keeping fixed the junctions where
+borders meet) never opens gaps between neighbours.  Every tier of TIERS is
+simplified and quantized at load time; its serialized body (plain and
+gzipped, with its ETag) is built on first request and kept.  The endpoint
+picks the tier of the zoom level the map is drawn at.  The centroid of
+every feature, for placing symbols, is precomputed from the full geometry.
+"""
+import gzip
+import json
+import logging
+import math
+import os
+import sys
+import urllib.request
+from functools import lru_cache
+
+import numpy as np
+
+from app.cache import etag_of
+from app.metrics import timed
+from app.serialize import shaped
+
+logger = logging.getLogger(__name__)
+
+# name -> (file under GEO_DIR, remote source)
+SOURCES = {
+    'world': ('world.geojson',
+              'https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/world.geojson'),
+    'countries': ('countries.geo.json',
+                  'https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json'),
+}
+FORMATS = ('topojson', 'geojson')
+# tier -> (Douglas-Peucker tolerance in degrees, quantization, highest zoom it is served for).
+# Zoom is the scale of the map relative to a whole-world view, about 0.25 degree per pixel.
+TIERS = {
+    'low': (0.1, 10000, 2),
+    'medium': (0.02, 100000, 8),
+    'high': (0.0, 1000000, math.inf),
+}
+# Grid the topology is built on (the high tier)
+BASE_QUANTIZATION = 1000000
+
+
+def tier_of(zoom):
+    """Coarsest tier detailed enough for a zoom level"""
+    return next(tier for tier, (_, _, max_zoom) in TIERS.items() if zoom <= max_zoom)
+
+
+def polygons_of(geometry):
+    """Rings of every polygon of a GeoJSON geometry (None for other geometry types)"""
+    if geometry is None:
+        return None
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return geometry['coordinates']
+    return None
+
+
+def ring_centroid(ring):
+    """(signed area, centroid x, centroid y) of a ring of [lon, lat] positions"""
+    points = np.asarray(ring, dtype=np.float64)[:, :2]
+    x, y = points[:, 0], points[:, 1]
+    x1, y1 = np.roll(x, -1), np.roll(y, -1)
+    cross = x * y1 - x1 * y
+    area = cross.sum() / 2
+    if area == 0:
+        return 0.0, x.mean(), y.mean()
+    return area, ((x + x1) * cross).sum() / (6 * area), ((y + y1) * cross).sum() / (6 * area)
+
+
+def centroid(polygons):
+    """Area-weighted centroid [lon, lat] of polygons (holes subtracted)"""
+    total, sum_x, sum_y = 0.0, 0.0, 0.0
+    fallback = None
+    for polygon in polygons:
+        for i, ring in enumerate(polygon):
+            if len(ring) < 3:
+                continue
+            area, x, y = ring_centroid(ring)
+            if fallback is None:
+                fallback = [float(x), float(y)]
+            area = abs(area) if i == 0 else -abs(area)
+            total += area
+            sum_x += area * x
+            sum_y += area * y
+    if total <= 0:
+        return fallback
+    return [float(sum_x / total), float(sum_y / total)]
+
+
+def douglas_peucker(points, tolerance):
+    """Indices of the points of a line kept by Douglas-Peucker (the ends always are)"""
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[[0, n - 1]] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        inner = points[first + 1:last]
+        start, end = points[first], points[last]
+        dx, dy = end - start
+        length = math.hypot(dx, dy)
+        if length == 0:
+            distances = np.hypot(inner[:, 0] - start[0], inner[:, 1] - start[1])
+        else:
+            distances = np.abs(dx * (inner[:, 1] - start[1]) - dy * (inner[:, 0] - start[0])) / length
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            stack += [(first, middle), (middle, last)]
+    return np.flatnonzero(keep)
+
+
+def simplify_arc(points, tolerance):
+    """Indices of the points of an arc kept at tolerance; closed arcs (whole rings) keep a triangle"""
+    n = len(points)
+    if tolerance <= 0 or n < 3:
+        return np.arange(n)
+    if not (points[0] == points[-1]).all():
+        return douglas_peucker(points, tolerance)
+    # Split a ring at its farthest point from the start and keep the farthest point of each half
+    middle = int(np.argmax(np.hypot(*(points - points[0]).T)))
+    if middle == 0:
+        return np.array([0, n - 1])
+    kept = []
+    for offset, half in ((0, points[:middle + 1]), (middle, points[middle:])):
+        indices = douglas_peucker(half, tolerance)
+        if len(indices) == 2 and len(half) > 2:
+            start, end = half[0], half[-1]
+            dx, dy = end - start
+            inner = half[1:-1]
+            distances = np.abs(dx * (inner[:, 1] - start[1]) - dy * (inner[:, 0] - start[0]))
+            if not distances.any():
+                distances = np.hypot(*(inner - start).T)
+            indices = np.array([0, 1 + int(np.argmax(distances)), len(half) - 1])
+        kept.append(indices[:-1] + offset)
+    return np.concatenate(kept + [[n - 1]])
+
+
+class GeometryStore:
+    """Tiers of the TopoJSON topology and the centroids of a GeoJSON feature collection"""
+
+    def __init__(self, name, collection):
+        self.name = name
+        features = collection['features']
+        self.features = [{key: feature[key] for key in ('id', 'properties') if key in feature}
+                         for feature in features]
+        polygons = [polygons_of(feature.get('geometry')) for feature in features]
+        skipped = sum(1 for feature, rings in zip(features, polygons)
+                      if rings is None and feature.get('geometry') is not None)
+        if skipped:
+            logger.warning("Geometry %s: %d features are neither polygons nor multipolygons", name, skipped)
+
+        positions = np.array([position[:2] for rings in polygons if rings
+                              for polygon in rings for ring in polygon for position in ring],
+                             dtype=np.float64).reshape(-1, 2)
+        self.bbox = positions.min(axis=0).tolist() + positions.max(axis=0).tolist() if len(positions) \
+            else [0.0, 0.0, 0.0, 0.0]
+        self.centroids = [centroid(rings) if rings else None for rings in polygons]
+        self.arcs, self.geometries = self.topology(polygons)
+        self.tiers = {tier: self.simplified(tolerance, quantization)
+                      for tier, (tolerance, quantization, _) in TIERS.items()}
+        self.encoded = lru_cache(maxsize=len(TIERS) * len(FORMATS))(self._encoded)
+
+    def __len__(self):
+        return len(self.features)
+
+    @property
+    def nbytes(self):
+        return int(sum(arc.nbytes for arcs in self.tiers.values() for arc in arcs))
+
+    def quantize(self, positions, quantization):
+        x0, y0, x1, y1 = self.bbox
+        scale = np.array([(x1 - x0) or 1, (y1 - y0) or 1]) / (quantization - 1)
+        return np.rint((np.asarray(positions, dtype=np.float64)[:, :2] - [x0, y0]) / scale).astype(np.int64)
+
+    @timed('aggregate')
+    def topology(self, polygons):
+        """Arcs (on the base grid) and the arc references of every feature's rings
+
+        Rings are cut at the junctions, the points where a line meets
+        another with different neighbours; identical pieces of two rings,
+        in either direction, become one arc (referenced as ~index when
+        reversed), as in the TopoJSON format.
+        """
+        rings = []
+        for rings_of in polygons:
+            for polygon in rings_of or ():
+                for ring in polygon:
+                    points = [tuple(point) for point in self.quantize(ring, BASE_QUANTIZATION).tolist()]
+                    points = [point for i, point in enumerate(points) if not i or point != points[i - 1]]
+                    if points[0] != points[-1]:
+                        points.append(points[0])
+                    rings.append(points)
+
+        # A point visited with two different pairs of neighbours is a junction
+        neighbours, junctions = {}, set()
+        for ring in rings:
+            n = len(ring) - 1
+            for i in range(n):
+                previous, following = ring[i - 1], ring[(i + 1) % n]
+                pair = (previous, following) if previous < following else (following, previous)
+                if neighbours.setdefault(ring[i], pair) != pair:
+                    junctions.add(ring[i])
+
+        arcs, index = [], {}
+
+        def reference(points):
+            key = tuple(points)
+            if key in index:
+                return index[key]
+            reverse = key[::-1]
+            if reverse in index:
+                return ~index[reverse]
+            index[key] = len(arcs)
+            arcs.append(np.array(points, dtype=np.int64))
+            return index[key]
+
+        cut = []
+        for ring in rings:
+            body = ring[:-1]
+            starts = [i for i, point in enumerate(body) if point in junctions]
+            if not starts:
+                # A closed ring: start at its smallest point, so equal rings compare equal
+                first = body.index(min(body))
+                body = body[first:] + body[:first]
+                cut.append([reference(body + body[:1])])
+                continue
+            body = body[starts[0]:] + body[:starts[0]]
+            starts = [i - starts[0] for i in starts] + [len(body)]
+            body = body + body[:1]
+            cut.append([reference(body[a:b + 1]) for a, b in zip(starts, starts[1:])])
+        references = iter(cut)
+
+        geometries = []
+        for rings_of in polygons:
+            if not rings_of:
+                geometries.append(None)
+                continue
+            geometries.append([[next(references) for _ in polygon] for polygon in rings_of])
+        return arcs, geometries
+
+    @timed('aggregate')
+    def simplified(self, tolerance, quantization):
+        """Arcs simplified by tolerance (degrees) and moved to a grid of quantization steps"""
+        step = np.array(self.transform(BASE_QUANTIZATION)['scale'])
+        ratio = (quantization - 1) / (BASE_QUANTIZATION - 1)
+        arcs = []
+        for arc in self.arcs:
+            points = np.rint(arc[simplify_arc(arc * step, tolerance)] * ratio).astype(np.int64)
+            repeated = np.concatenate([[False], (np.diff(points, axis=0) == 0).all(axis=1)])
+            points = points[~repeated]
+            arcs.append(points if len(points) > 1 else np.repeat(points, 2, axis=0))
+        return arcs
+
+    def transform(self, quantization):
+        x0, y0, x1, y1 = self.bbox
+        return {'scale': [((x1 - x0) or 1) / (quantization - 1), ((y1 - y0) or 1) / (quantization - 1)],
+                'translate': [x0, y0]}
+
+    def geojson_rings(self, tier, refs):
+        """Positions [lon, lat] of a ring given by its arc references"""
+        arcs = self.tiers[tier]
+        transform = self.transform(TIERS[tier][1])
+        points = [arcs[ref] if ref >= 0 else arcs[~ref][::-1] for ref in refs]
+        points = np.concatenate([points[0]] + [arc[1:] for arc in points[1:]])
+        positions = points * transform['scale'] + transform['translate']
+        return np.round(positions, 6).tolist()
+
+    def document(self, tier, format='topojson'):
+        """TopoJSON topology (object named after the store) or GeoJSON collection of a tier"""
+        if format == 'geojson':
+            features = []
+            for feature, rings_of in zip(self.features, self.geometries):
+                geometry = None
+                if rings_of:
+                    coordinates = [[self.geojson_rings(tier, refs) for refs in polygon]
+                                   for polygon in rings_of]
+                    geometry = {'type': 'Polygon', 'coordinates': coordinates[0]} if len(coordinates) == 1 \
+                        else {'type': 'MultiPolygon', 'coordinates': coordinates}
+                features.append({'type': 'Feature'} | feature | {'geometry': geometry})
+            return {'type': 'FeatureCollection', 'features': features}
+
+        geometries = []
+        for feature, rings_of in zip(self.features, self.geometries):
+            if not rings_of:
+                geometries.append(feature | {'type': None})
+            elif len(rings_of) == 1:
+                geometries.append({'type': 'Polygon'} | feature | {'arcs': [list(refs) for refs in rings_of[0]]})
+            else:
+                geometries.append({'type': 'MultiPolygon'} | feature |
+                                  {'arcs': [[list(refs) for refs in polygon] for polygon in rings_of]})
+        arcs = [np.concatenate([arc[:1], np.diff(arc, axis=0)]).tolist() for arc in self.tiers[tier]]
+        return {'type': 'Topology', 'bbox': self.bbox, 'transform': self.transform(TIERS[tier][1]),
+                'objects': {self.name: {'type': 'GeometryCollection', 'geometries': geometries}},
+                'arcs': arcs}
+
+    @timed('serialize')
+    def _encoded(self, tier, format='topojson'):
+        """(body, gzipped body, ETag) of a tier"""
+        body = json.dumps(self.document(tier, format), separators=(',', ':')).encode()
+        return body, gzip.compress(body, 9, mtime=0), etag_of(body)
+
+    def centroid_records(self, shape='records'):
+        """id, name, lon and lat of the centroid of every feature with a geometry"""
+        rows = [(feature.get('id'), feature.get('properties', {}).get('name'), point)
+                for feature, point in zip(self.features, self.centroids) if point is not None]
+        return shaped(['id', 'name', 'lon', 'lat'], [
+            [row[0] for row in rows],
+            [row[1] for row in rows],
+            [round(row[2][0], 6) for row in rows],
+            [round(row[2][1], 6) for row in rows],
+        ], shape)
+
+
+def load_geometry(name, path):
+    """Load the GeoJSON file of the geometry called name"""
+    with open(path) as f:
+        return GeometryStore(name, json.load(f))
+
+
+def fetch(geo_dir, names=None, timeout=60):
+    """Download the geometry SOURCES (default: all) into geo_dir; raises OSError on failure"""
+    os.makedirs(geo_dir, exist_ok=True)
+    for name in names or SOURCES:
+        file, url = SOURCES[name]
+        target = os.path.join(geo_dir, file)
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                body = response.read()
+            json.loads(body)
+        except (OSError, ValueError) as e:
+            raise OSError(f"Cannot download {name} geometry from {url} ({e}); on a host without "
+                          f"network access copy {file} into {geo_dir} instead") from e
+        with open(target + '.tmp', 'wb') as f:
+            f.write(body)
+        os.replace(target + '.tmp', target)
+        print(f"{url} -> {target} ({len(body)} bytes)")
+
+
+def missing(geo_dir, names=None):
+    """Problems of the geometry files of geo_dir (default: all SOURCES), empty when all load"""
+    problems = []
+    for name in names or SOURCES:
+        path = os.path.join(geo_dir, SOURCES[name][0])
+        try:
+            load_geometry(name, path)
+        except FileNotFoundError:
+            problems.append(f"{name}: {path} missing, run python -m app.geometry fetch")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            problems.append(f"{name}: {path} unreadable ({e})")
+    return problems
+
+
+if __name__ == '__main__':
+    from app.datasets import GEO_DIR
+
+    command, names = sys.argv[1:2], sys.argv[2:] or None
+    if command == ['fetch']:
+        try:
+            fetch(GEO_DIR, names)
+        except OSError as e:
+            sys.exit(f"error: {e}")
+    elif command == ['check']:
+        problems = missing(GEO_DIR, names)
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        sys.exit(1 if problems else 0)
+    else:
+        sys.exit("usage: python -m app.geometry fetch|check [name ...]")
@@ -0,0 +1,284 @@
+"""Query engines for the WHO life-expectancy frames served by /life and /life/joined.
+
+Every filterable column gets an inverted index (value -> sorted row
+positions) built once per dataset version, so a query is a handful of
+posting-list intersections instead of full-frame string comparisons.  The
+grouped response is then emitted straight from pre-materialized columns.
+"""
+from functools import cached_property
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+
+from app.metrics import scanned, timed
+from app.ranking import RankingIndex
+from app.serialize import shaped
+
+# Lower-cased lookup column -> display column whose dictionary it is derived from
+LOOKUP_FORMS = {
+    'Sex': 'Dim1',
+    'location': 'Location',
+    'parent_location': 'ParentLocation',
+}
+
+# Filter name -> column holding its lookup form
+INDEXED_COLUMNS = {
+    'year': 'year',
+    'sex': 'Sex',
+    'indicator': 'Indicator',
+    'location': 'location',
+    'parent_location': 'parent_location',
+}
+
+# Keys of a /life record -> frame column they are read from
+RECORD_COLUMNS = {
+    'Location': 'location',
+    'ParentLocation': 'parent_location',
+    'Sex': 'Sex',
+    'FactValueNumeric': 'FactValueNumeric',
+    'FactValueNumericLow': 'FactValueNumericLow',
+    'FactValueNumericHigh': 'FactValueNumericHigh',
+    'Indicator': 'Indicator',
+}
+
+
+# Keys of a /life/joined record -> column of the joined frame
+JOINED_COLUMNS = {
+    'Location': 'Location',
+    'Code': 'Code',
+    'ParentLocation': 'ParentLocation',
+    'Period': 'Period',
+    'Sex': 'Dim1',
+    'LifeExpectancy': 'LifeExpectancy',
+    'HealthyLifeExpectancy': 'HealthyLifeExpectancy',
+    'Population': 'Population',
+}
+
+# Age of an indicator, matched on its name
+AGES = (('birth', 'at birth'), ('60', 'age 60'))
+
+
+def column_values(series):
+    """Python values of a column, with missing values as None
+
+    float32 values are widened to the float of their shortest decimal form
+    (52.85, not 52.849998474121094), so they serialize as they were parsed.
+    """
+    if series.dtype == np.float32:
+        series = pd.Series(series.to_numpy().astype(str).astype(np.float64), index=series.index)
+    values = series.to_numpy(dtype=object, copy=True)
+    values[series.isna().to_numpy()] = None
+    return values.tolist()
+
+
+def lookup_form(series):
+    """Lower-cased categorical of a string column, sharing its codes when possible"""
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return series.str.lower().astype('category')
+    categories = series.cat.categories.str.lower()
+    if not categories.is_unique:
+        return series.str.lower().astype('category')
+    return pd.Series(pd.Categorical.from_codes(series.cat.codes, categories=categories), index=series.index)
+
+
+def posting_index(frame, column):
+    """Inverted index of a column: value -> sorted int32 row positions"""
+    return {key: positions.astype(np.int32)
+            for key, positions in frame.groupby(column, observed=True, sort=False).indices.items()}
+
+
+def postings(index, values):
+    """Sorted row positions matching any of the values of an inverted index"""
+    matches = [index[value] for value in values if value in index]
+    if not matches:
+        return np.empty(0, dtype=np.int32)
+    if len(matches) == 1:
+        return matches[0]
+    return np.unique(np.concatenate(matches))
+
+
+def intersect(lists):
+    """Intersection of sorted posting lists, smallest first"""
+    lists = sorted(lists, key=len)
+    positions = lists[0]
+    for other in lists[1:]:
+        if not len(positions):
+            break
+        positions = np.intersect1d(positions, other, assume_unique=True)
+    return positions
+
+
+class LifeQueryEngine:
+    """Inverted indexes and record columns of one LE/HLE frame"""
+
+    def __init__(self, frame):
+        years, self.period_codes = np.unique(frame['Period'].to_numpy(), return_inverse=True)
+        self.period_labels = [str(year) for year in years.tolist()]
+        lookup = frame.assign(
+            year=pd.Categorical.from_codes(self.period_codes, categories=self.period_labels),
+            **{name: lookup_form(frame[column]) for name, column in LOOKUP_FORMS.items()})
+        self.index = {name: posting_index(lookup, column) for name, column in INDEXED_COLUMNS.items()}
+        self.columns = {key: column_values(lookup[column]) for key, column in RECORD_COLUMNS.items()}
+        # An empty groupby().apply() used to serialize as one empty mapping
+        # per frame column (and the Sex lookup column); clients still receive that payload
+        self.empty = {column: {} for column in list(frame.columns) + ['Sex']}
+
+    def postings(self, name, values):
+        """Sorted row positions matching any of the values of a filter"""
+        return postings(self.index[name], values)
+
+    @timed('filter')
+    def select(self, years, sex, indicator=None, location=None, parent_location=None, shared=None):
+        """Row positions matching every given filter, in frame order
+
+        shared is an optional dict memoizing the rows matching the filters
+        other than location, so the queries of a batch that differ only by
+        country intersect those posting lists once.
+        """
+        filters = {'year': tuple(years), 'sex': (sex,)}
+        if indicator is not None:
+            filters['indicator'] = (indicator,)
+        if parent_location is not None:
+            filters['parent_location'] = (parent_location,)
+
+        key = tuple(filters.items())
+        positions = shared.get(key) if shared is not None else None
+        if positions is None:
+            lists = [self.postings(name, values) for name, values in filters.items()]
+            scanned(sum(len(positions) for positions in lists))
+            positions = intersect(lists)
+            if shared is not None:
+                shared[key] = positions
+        if location is not None:
+            matches = self.postings('location', [location])
+            scanned(len(matches))
+            positions = intersect([positions, matches])
+        return positions
+
+    @timed('aggregate')
+    def grouped(self, positions, shape='records'):
+        """Records of the selected rows grouped by Period: {period: [record, ...]}
+
+        With shape='columnar' each period holds {'columns': [...], 'data': [...]}.
+        """
+        if not len(positions):
+            return dict(self.empty) if shape == 'records' else {}
+        # Stable sort keeps frame order inside each period
+        positions = positions[np.argsort(self.period_codes[positions], kind='stable')]
+        codes = self.period_codes[positions]
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], bounds))
+        ends = np.concatenate((bounds, [len(positions)]))
+
+        keys = list(self.columns)
+        result = {}
+        for start, end in zip(starts, ends):
+            rows = positions[start:end].tolist()
+            pick = itemgetter(*rows)
+            values = [pick(column) for column in self.columns.values()]
+            if len(rows) == 1:
+                values = [(value,) for value in values]
+            result[self.period_labels[codes[start]]] = shaped(keys, values, shape)
+        return result
+
+
+def age_of(indicators):
+    """'birth' or '60' for each indicator name (None if neither)"""
+    ages = np.full(len(indicators), None, dtype=object)
+    for age, marker in AGES:
+        ages[indicators.str.contains(marker, regex=False).to_numpy()] = age
+    return ages
+
+
+class LifeJoin:
+    """LE, HLE and population joined on (country, Period, Sex) for each age
+
+    Every LE row is kept; its HLE value and population are None when the
+    other source has no match.  All three sources are matched on country
+    ids of the country registry (ISO3 code, falling back to the name), so
+    the joins are integer-key merges that do not depend on WHO and World
+    Bank spelling the same name; rows that cannot be resolved are reported
+    by the registry and only kept on the LE side.
+    """
+
+    def __init__(self, le, hle, population, countries):
+        keys = ['country', 'Period', 'Dim1', 'age']
+
+        def values(frame, name, source):
+            return pd.DataFrame({
+                'country': countries.ids(source, codes=frame['SpatialDimValueCode'], names=frame['Location']),
+                'Code': frame['SpatialDimValueCode'].to_numpy(dtype=object),
+                'Location': frame['Location'].to_numpy(dtype=object),
+                'ParentLocation': frame['ParentLocation'].to_numpy(dtype=object),
+                'Period': frame['Period'].astype(int).to_numpy(),
+                'Dim1': frame['Dim1'].to_numpy(dtype=object),
+                'age': age_of(frame['Indicator'].astype(str)),
+                name: frame['FactValueNumeric'].to_numpy(),
+            })
+
+        # -1 (unknown country) rows never match: they are dropped from the right-hand sides
+        hle = values(hle, 'HealthyLifeExpectancy', 'hle')
+        hle = hle[hle['country'] >= 0]
+        joined = values(le, 'LifeExpectancy', 'le').merge(
+            hle[keys + ['HealthyLifeExpectancy']], on=keys, how='left')
+        # Only the population of the row's own year is attached (point lookups in the store)
+        joined['Population'] = population.at(population.rows_of(countries)[joined['country'].to_numpy()],
+                                             joined['Period'].to_numpy())
+        joined = joined.sort_values(['Location', 'Period', 'Dim1'], kind='stable').reset_index(drop=True)
+
+        lookup = pd.DataFrame({
+            'location': joined['Location'].str.lower(),
+            'period': joined['Period'].astype(str),
+            'sex': joined['Dim1'].str.lower(),
+            'age': joined['age'],
+        })
+        self.index = {name: posting_index(lookup, name) for name in lookup.columns}
+        self.columns = {key: column_values(joined[column]) for key, column in JOINED_COLUMNS.items()}
+        self.rows = len(joined)
+        self.age = joined['age'].to_numpy()
+        # Typed columns of the records (strings dictionary-encoded), for binary (Arrow) responses
+        self.frame = pd.DataFrame({key: joined[column] for key, column in JOINED_COLUMNS.items()})
+        self.frame = self.frame.astype({key: 'category' for key in self.frame.columns
+                                        if self.frame[key].dtype == object} | {'Period': np.int16})
+
+    @timed('filter')
+    def select(self, years=None, countries=None, sex='both sexes', age='birth'):
+        """Row positions of the given years and countries (default: all), sorted"""
+        filters = {'sex': [sex], 'age': [age]}
+        if years is not None:
+            filters['period'] = years
+        if countries is not None:
+            filters['location'] = countries
+        lists = [postings(self.index[name], values) for name, values in filters.items()]
+        scanned(sum(len(positions) for positions in lists))
+        return intersect(lists)
+
+    @cached_property
+    def ranking(self):
+        """Countries ranked by LE, HLE or population, per region, sex and age"""
+        return RankingIndex('Location', self.frame['Location'], self.frame['Period'], {
+            'le': self.frame['LifeExpectancy'].to_numpy(),
+            'hle': self.frame['HealthyLifeExpectancy'].to_numpy(),
+            'population': self.frame['Population'].to_numpy(),
+        }, {'region': self.frame['ParentLocation'], 'sex': self.frame['Sex'], 'age': self.age})
+
+    @timed('aggregate')
+    def records(self, positions, shape='records'):
+        """Joined records of the selected rows (or their columnar form)"""
+        keys = list(self.columns)
+        if not len(positions):
+            return shaped(keys, [[] for _ in keys], shape)
+        rows = positions.tolist()
+        pick = itemgetter(*rows)
+        values = [pick(column) for column in self.columns.values()]
+        if len(rows) == 1:
+            values = [(value,) for value in values]
+        return shaped(keys, values, shape)
+
+    @timed('aggregate')
+    def rows_frame(self, positions):
+        """Typed frame of the selected rows (dictionaries cut to the values they use)"""
+        frame = self.frame.take(positions).reset_index(drop=True)
+        return frame.apply(lambda column: column.cat.remove_unused_categories()
+                           if isinstance(column.dtype, pd.CategoricalDtype) else column)
@@ -1,55 +1,83 @@
+import json
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
 from fastapi import FastAPI, Request, HTTPException, Query
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
-from typing import List
-import pandas as pd
-import numpy as np
+from pydantic import BaseModel
+
+from app.climdiv import RESOLUTIONS
+from app.countries import UNMATCHED
+from app.cube import DIMENSIONS, STATS, AggregateCube
+from app import arrow
+from app.assets import AssetStaticFiles
+from app.cache import ResponseCache, etag_matches
+from app.datasets import registry
+from app.executor import from_environ
+from app.export import MEDIA_TYPES, accepted_codings, accepted_encoding, export
+from app.geometry import FORMATS as GEOMETRY_FORMATS, SOURCES as GEOMETRY_SOURCES, TIERS, tier_of
+from app.life import LifeJoin, LifeQueryEngine, lookup_form
+from app import metrics as request_metrics
+from app.metrics import MetricsMiddleware
+from app.ranking import ORDERS
+from app.serialize import SHAPES, dumps, shaped
+
+logger = logging.getLogger(__name__)
+
+# Endpoints share the registry frames; copy-on-write keeps them read-only
+pd.set_option('mode.copy_on_write', True)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    registry.load_all()
+    registry.combined(['le', 'hle'], AggregateCube)
+    yield
+    executor.shutdown()
 
-import json
-from typing import List, Optional
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+metrics = request_metrics.from_environ()
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+static_files = AssetStaticFiles(directory="app/static")
+app.mount("/static", static_files, name="static")
 
 templates = Jinja2Templates(directory="app/templates")
+templates.env.globals['asset_url'] = static_files.url
+
+response_cache = ResponseCache(registry, maxsize=512)
+executor = from_environ()
+
+
+async def respond(request, datasets, compute, headers=None):
+    """Answer a request from the response cache, computing it on the data executor"""
+    return await executor.run(response_cache.respond, request, datasets, compute, headers)
+
+# Vary of the endpoints whose representation depends on the Accept headers (Arrow or JSON/CSV)
+NEGOTIATED = 'Accept, Accept-Encoding'
+
+
+def response_shape(shape, shapes=SHAPES):
+    """Validate the shape parameter of a tabular endpoint"""
+    shape = shape.lower()
+    if shape not in shapes:
+        raise HTTPException(status_code=400, detail="Invalid shape parameter")
+    return shape
+
+
+# Columns of a /temperature row
+TEMPERATURE_COLUMNS = ['year'] + ['m%02d' % month for month in range(1, 13)]
+
 
 def init_data():
-    """Initialize data at startup"""
-    le_file = "app/static/data/le.csv"
-    hle_file = "app/static/data/hle.csv"
-    df_le = pd.read_csv(
-        le_file,
-        dtype={
-            'Period': str,
-            'Location': str, 
-            'Dim1': str,
-            'ParentLocation': str,
-            'FactValueNumeric': float
-        }
-    )
-    # Clean up column names and values for easier filtering
-    df_le['Sex'] = df_le['Dim1'].str.lower()
-    df_le['Location'] = df_le['Location'].str.lower()
-    df_le['ParentLocation'] = df_le['ParentLocation'].str.lower()
-
-    df_hle = pd.read_csv(
-        hle_file,
-        dtype={
-            'Period': str,
-            'Location': str, 
-            'Dim1': str,
-            'ParentLocation': str,
-            'FactValueNumeric': float
-        }
-    )
-    # Clean up column names and values for easier filtering
-    df_hle['Sex'] = df_hle['Dim1'].str.lower()
-    df_hle['Location'] = df_hle['Location'].str.lower()
-    df_hle['ParentLocation'] = df_hle['ParentLocation'].str.lower()
-
-    return df_le, df_hle
+    """Return the shared LE and HLE frames loaded by the dataset registry"""
+    return registry.get('le'), registry.get('hle')
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -152,28 +180,217 @@ async def finalbox(request: Request):
     return templates.TemplateResponse("finalbox.html", {"request": request})
 
 @app.get("/temperature")
-async def get_temperature(state_code: str, years: List[str] = Query(..., min_items=1, max_items=10)):
+async def get_temperature(
+    request: Request,
+    state_code: str,
+    years: List[str] = Query(..., min_items=1, max_items=10),
+    shape: Optional[str] = Query(None, description="ROWS or COLUMNAR (default: rows as a JSON string)")
+):
     years = years[0].split(',')
-    mean_df = pd.read_csv(
-        "app/static/data/climdiv-tmpcst-v1.0.0-20241205",
-        delim_whitespace=True,
-        header=None,
-        index_col=False,
-        dtype={0: str},
-    )
-    filtered_df = mean_df[
-        (mean_df.iloc[:, 0].str[:3] == state_code)
-        & (
-            mean_df.iloc[:, 0].str[-4:].isin(years)
-        )
-    ]
-    filtered_df = filtered_df.reset_index(drop=True)
-    filtered_df.iloc[:, 0] = filtered_df.iloc[:, 0].str[-4:]
+    if shape is not None:
+        shape = response_shape(shape, ('rows', 'columnar'))
+
+    def compute():
+        store = registry.get('climdiv')
+        rows = store.rows(state_code, [int(year) for year in years if len(year) == 4 and year.isdigit()])
+        if shape == 'rows':
+            return rows
+        if shape == 'columnar':
+            return shaped(TEMPERATURE_COLUMNS, zip(*rows) if rows else [[] for _ in TEMPERATURE_COLUMNS], shape)
+        # Legacy clients parse the rows from a JSON-encoded string
+        return json.dumps(rows, separators=(',', ':'))
+
+    return await respond(request, ['climdiv'], compute)
+
+
+@app.get("/temperature/series")
+async def get_temperature_series(
+    request: Request,
+    state_code: str,
+    start: Optional[int] = Query(None, description="First year of the range"),
+    end: Optional[int] = Query(None, description="Last year of the range"),
+    years: Optional[str] = Query(None, description="Comma separated years, instead of a range"),
+    resolution: str = Query("monthly", description="MONTHLY, ANNUAL or DECADAL")
+):
+    """Get the min, max and mean temperature series of a state"""
+    resolution = resolution.lower()
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="Invalid resolution parameter")
+
+    def compute():
+        store = registry.get('climdiv')
+        first = store.first_year
+        last = first + store.values.shape[2] - 1
+        if years:
+            year_list = [int(year) for year in years.split(',') if year.strip().isdigit()]
+            year_list = [year for year in year_list if first <= year <= last]
+        else:
+            year_list = range(max(start, first) if start is not None else first,
+                              min(end, last) + 1 if end is not None else last + 1)
+
+        series = store.series(state_code, year_list, resolution)
+        if series is None or not series['years']:
+            raise HTTPException(status_code=404, detail="No data found")
+        return series
+
+    return await respond(request, ['climdiv'], compute)
+
+
+def emissions_year(table, year):
+    """Validate a year against the span of an emissions table"""
+    if table.first_year is None or not table.first_year <= year <= table.last_year:
+        raise HTTPException(status_code=404, detail="No data found")
+    return year
+
+
+@app.get("/emissions/one-year")
+async def get_emissions_one_year(
+    request: Request,
+    year: int = Query(1996, description="Year e.g. 1996"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    """Get the per-capita emissions of every entity in a year, highest first"""
+    shape = response_shape(shape)
+
+    def compute():
+        store = registry.get('emissions')
+        return store.one_year(emissions_year(store, year), shape)
+
+    return await respond(request, ['emissions'], compute)
+
+
+@app.get("/emissions/average")
+async def get_emissions_average(
+    request: Request,
+    start: int = Query(2001, description="First year of the range"),
+    end: int = Query(2010, description="Last year of the range"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    """Get the average per-capita emissions of every country over a range of years"""
+    if start > end:
+        raise HTTPException(status_code=400, detail="Invalid year range")
+    shape = response_shape(shape)
+
+    def compute():
+        store = registry.get('emissions')
+        if not len(store.span(start, end)):
+            raise HTTPException(status_code=404, detail="No data found")
+        return store.average(start, end, shape)
+
+    return await respond(request, ['emissions'], compute)
+
+
+@app.get("/emissions/continent-summary")
+async def get_emissions_continent_summary(request: Request, year: int = Query(1996, description="Year e.g. 1996")):
+    """Get the per-continent per-capita emissions with their top 5 countries"""
+    def compute():
+        store = registry.get('emissions')
+        return store.continent_summary(emissions_year(store, year))
+
+    return await respond(request, ['emissions'], compute)
+
+
+@app.get("/emissions/alluvial")
+async def get_emissions_alluvial(
+    request: Request,
+    year: int = Query(1996, description="Year e.g. 1996"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    """Get the emissions of every country of the alluvial chart in a year"""
+    shape = response_shape(shape)
+
+    def compute():
+        table = registry.get('alluvial')
+        return table.one_year(emissions_year(table, year), shape)
 
-    json_data = filtered_df.to_json(orient="values")
-    return JSONResponse(content=json_data)
+    return await respond(request, ['alluvial'], compute)
 
 
+@app.get("/emissions/flows")
+async def get_emissions_flows(
+    request: Request,
+    year: Optional[int] = Query(None, description="Year e.g. 1996 (default: 1996 unless start/end are given)"),
+    start: Optional[int] = Query(None, description="First year of the range"),
+    end: Optional[int] = Query(None, description="Last year of the range"),
+    top: Optional[int] = Query(None, ge=1, description="Countries kept per continent, the rest folded into Other"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    """Get the continent -> country -> emission type flows of the alluvial chart over a year or range"""
+    if year is not None and (start is not None or end is not None):
+        raise HTTPException(status_code=400, detail="Give either year or start/end")
+    shape = response_shape(shape)
+
+    def compute():
+        table = registry.get('alluvial')
+        if year is not None or (start is None and end is None):
+            first = last = emissions_year(table, 1996 if year is None else year)
+        else:
+            first = table.first_year if start is None else start
+            last = table.last_year if end is None else end
+            if first > last:
+                raise HTTPException(status_code=400, detail="Invalid year range")
+            if not len(table.span(first, last)):
+                raise HTTPException(status_code=404, detail="No data found")
+        return table.flows(first, last, top, shape)
+
+    return await respond(request, ['alluvial'], compute)
+
+
+# Year-indexed tables that can be exported
+EXPORT_DATASETS = ('alluvial', 'emissions')
+
+
+def name_set(values):
+    """Lower-cased set of a comma separated list, or None"""
+    if not values:
+        return None
+    return {value.strip().lower() for value in values.split(',') if value.strip()} or None
+
+
+@app.get("/export/{dataset}")
+async def export_dataset(
+    request: Request,
+    dataset: str,
+    format: Optional[str] = Query(None, description="CSV, NDJSON or ARROW (default: from Accept, else CSV)"),
+    columns: Optional[str] = Query(None, description="Comma separated columns (default: all)"),
+    entity: Optional[str] = Query(None, description="Comma separated entity names"),
+    continent: Optional[str] = Query(None, description="Comma separated continent names"),
+    start: Optional[int] = Query(None, description="First year of the range"),
+    end: Optional[int] = Query(None, description="Last year of the range")
+):
+    """Stream the filtered rows of an emissions table as CSV, NDJSON or an Arrow IPC stream"""
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+    if format is None:
+        fmt = 'arrow' if arrow.wants_arrow(request.headers.get('accept'), 'text/csv') else 'csv'
+    else:
+        fmt = format.lower()
+    if fmt not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="Invalid format parameter")
+    if fmt == 'arrow' and arrow.pa is None:
+        raise HTTPException(status_code=406, detail="Arrow IPC responses need the pyarrow package")
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="Invalid year range")
+
+    table = await executor.run(registry.get, dataset)
+    all_columns = list(table.frame.columns)
+    selected = [column.strip() for column in columns.split(',')] if columns else all_columns
+    unknown = [column for column in selected if column not in all_columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail="Unknown columns: %s" % ", ".join(unknown))
+
+    encoding = accepted_encoding(request.headers.get('accept-encoding'))
+    headers = {'Vary': NEGOTIATED}
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    stream = export(table, fmt, selected, encoding, entities=name_set(entity),
+                    continents=name_set(continent), start=start, end=end)
+    return StreamingResponse(stream, media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+# Most queries a /life/batch request may hold
+BATCH_LIMIT = 100
+
 # Add age mapping constants
 AGE_INDICATORS = {
     'birth': 'Life expectancy at birth (years)',
@@ -181,99 +398,437 @@ AGE_INDICATORS = {
     'both': None  # For both ages
 }
 
+def life_payload(years, metric, sex, age, country=None, continent=None, shape='records', shared=None):
+    """Content of a /life response; shared memoizes row selections across the queries of a batch"""
+    year_list = years.split(',')
+
+    # Validate age parameter
+    if age.lower() not in AGE_INDICATORS:
+        raise HTTPException(status_code=400, detail="Invalid age parameter")
+
+    response = {'le': None, 'hle': None}
+
+    if metric.lower() == "both":
+        df_keys = ["le", "hle"]
+    else:
+        df_keys = ["le"] if metric.lower() == "le" else ["hle"]
+
+    sex_key = "both sexes" if sex.lower() == 'both' else sex.lower()
+    for df_key in df_keys:
+        engine = registry.derived(df_key, LifeQueryEngine)
+        positions = engine.select(
+            years=year_list,
+            sex=sex_key,
+            indicator=AGE_INDICATORS[age.lower()] if age.lower() != 'both' else None,
+            location=country.lower() if country else None,
+            parent_location=continent.lower() if continent else None,
+            shared=None if shared is None else shared.setdefault(df_key, {}),
+        )
+
+        # Group by year for response format
+        response[df_key] = engine.grouped(positions, shape)
+    return response
+
+
 @app.get("/life")
 async def get_life_data(
+    request: Request,
     years: str = Query(..., description="Comma separated years e.g. 2020,2021"),
     metric: str = Query(..., description="HLE or LE or BOTH"),
     sex: str = Query(..., description="MALE, FEMALE or BOTH"),
     age: str = Query(..., description="BIRTH, 60, BOTH"),
     country: Optional[str] = Query(None, description="Country name"),
-    continent: Optional[str] = Query(None, description="Continent/Region name")
+    continent: Optional[str] = Query(None, description="Continent/Region name"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    shape = response_shape(shape)
+    if age.lower() not in AGE_INDICATORS:
+        raise HTTPException(status_code=400, detail="Invalid age parameter")
+
+    def compute():
+        return life_payload(years, metric, sex, age, country, continent, shape)
+
+    def respond_life():
+        try:
+            return response_cache.respond(request, ['le', 'hle'], compute)
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.exception("Error answering %s", request.url)
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return await executor.run(respond_life)
+
+
+class LifeQuery(BaseModel):
+    """One query of a /life/batch request, with the parameters of /life"""
+    years: str
+    metric: str
+    sex: str
+    age: str
+    country: Optional[str] = None
+    continent: Optional[str] = None
+
+
+class LifeBatch(BaseModel):
+    queries: Dict[str, LifeQuery]
+    shape: str = "records"
+
+
+@app.post("/life/batch")
+async def post_life_batch(batch: LifeBatch):
+    """Answer several /life queries at once: {key: query} -> {key: /life response}
+
+    The queries share their row selections: the posting lists of the
+    filters they have in common are intersected once for the whole batch.
+    """
+    shape = response_shape(batch.shape)
+    if not batch.queries:
+        raise HTTPException(status_code=400, detail="No queries")
+    if len(batch.queries) > BATCH_LIMIT:
+        raise HTTPException(status_code=400, detail="At most %d queries per batch" % BATCH_LIMIT)
+
+    def compute():
+        shared = {}
+        results = {}
+        for key, query in batch.queries.items():
+            try:
+                results[key] = life_payload(query.years, query.metric, query.sex, query.age,
+                                            query.country, query.continent, shape, shared)
+            except HTTPException as e:
+                raise HTTPException(status_code=e.status_code, detail="%s (query %s)" % (e.detail, key))
+        with request_metrics.stage('serialize'):
+            return Response(content=dumps(results), media_type='application/json')
+
+    return await executor.run(compute)
+
+
+@app.get("/life/joined")
+async def get_life_joined(
+    request: Request,
+    years: Optional[str] = Query(None, description="Comma separated years (default: all)"),
+    country: Optional[str] = Query(None, description="Comma separated country names (default: all)"),
+    sex: str = Query("both", description="MALE, FEMALE or BOTH"),
+    age: str = Query("birth", description="BIRTH or 60"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
 ):
+    """Get LE, HLE and population joined per country, year and sex"""
+    if age.lower() not in ('birth', '60'):
+        raise HTTPException(status_code=400, detail="Invalid age parameter")
+    shape = response_shape(shape)
+
+    def selected():
+        join = registry.combined(['le', 'hle', 'population', 'countries'], LifeJoin)
+        positions = join.select(
+            years=[year.strip() for year in years.split(',')] if years else None,
+            countries=[name.strip().lower() for name in country.split(',')] if country else None,
+            sex="both sexes" if sex.lower() == 'both' else sex.lower(),
+            age=age.lower(),
+        )
+        return join, positions
+
+    def compute():
+        join, positions = selected()
+        return join.records(positions, shape)
+
+    def compute_arrow():
+        join, positions = selected()
+        return arrow.ipc_bytes(join.rows_frame(positions))
+
+    if arrow.wants_arrow(request.headers.get('accept')):
+        body = await executor.run(compute_arrow)
+        return Response(content=body, media_type=arrow.MEDIA_TYPE, headers={'Vary': NEGOTIATED})
+    return await respond(request, ['le', 'hle', 'population', 'countries'], compute, {'Vary': NEGOTIATED})
+
+def dimension_list(values, name):
+    """Dimensions of a comma separated list, or 400 if one is unknown"""
+    dims = [value.strip().lower() for value in values.split(',') if value.strip()] if values else []
+    if any(dim not in DIMENSIONS for dim in dims) or len(set(dims)) != len(dims):
+        raise HTTPException(status_code=400, detail="Invalid %s parameter" % name)
+    return dims
+
+
+@app.get("/life/aggregate")
+async def get_life_aggregate(
+    request: Request,
+    by: Optional[str] = Query(None, description="Comma separated dimensions: REGION, COUNTRY, YEAR, SEX, INDICATOR"),
+    metric: str = Query("both", description="HLE or LE or BOTH"),
+    age: str = Query("birth", description="BIRTH, 60, BOTH (group by INDICATOR to keep them apart)"),
+    sex: Optional[str] = Query(None, description="Comma separated MALE, FEMALE, BOTH (default: all)"),
+    region: Optional[str] = Query(None, description="Comma separated region names"),
+    country: Optional[str] = Query(None, description="Comma separated country names"),
+    years: Optional[str] = Query(None, description="Comma separated years"),
+    start: Optional[int] = Query(None, description="First year of the range"),
+    end: Optional[int] = Query(None, description="Last year of the range"),
+    stats: str = Query("mean,min,max,count", description="Comma separated MEAN, MIN, MAX, COUNT"),
+    rank: Optional[str] = Query(None, description="TOP or BOTTOM: the k members of `of` by mean per group"),
+    k: int = Query(5, ge=1, le=1000, description="Members per group when ranking"),
+    of: str = Query("country", description="Dimension ranked by rank"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    """Get mean, min, max and count of LE/HLE values grouped by any of the cube dimensions"""
+    group = dimension_list(by, 'by')
+    stat_list = [stat.strip().lower() for stat in stats.split(',') if stat.strip()]
+    if not stat_list or any(stat not in STATS for stat in stat_list):
+        raise HTTPException(status_code=400, detail="Invalid stats parameter")
+    if metric.lower() not in ('le', 'hle', 'both'):
+        raise HTTPException(status_code=400, detail="Invalid metric parameter")
+    if age.lower() not in AGE_INDICATORS:
+        raise HTTPException(status_code=400, detail="Invalid age parameter")
+    if rank is not None and rank.lower() not in ('top', 'bottom'):
+        raise HTTPException(status_code=400, detail="Invalid rank parameter")
+    if of.lower() not in DIMENSIONS:
+        raise HTTPException(status_code=400, detail="Invalid of parameter")
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="Invalid year range")
+    shape = response_shape(shape)
+
+    def compute():
+        cube = registry.combined(['le', 'hle'], AggregateCube)
+        filters = {'indicator': cube.indicators(
+            metrics=None if metric.lower() == 'both' else [metric.lower()],
+            ages=None if age.lower() == 'both' else [age.lower()],
+        )}
+        if sex:
+            filters['sex'] = cube.codes('sex', ['both sexes' if value.strip().lower() == 'both' else value
+                                                for value in sex.split(',')])
+        if region:
+            filters['region'] = cube.codes('region', region.split(','))
+        if country:
+            filters['country'] = cube.codes('country', country.split(','))
+        if years or start is not None or end is not None:
+            year_codes = cube.codes('year', years.split(',')) if years else list(cube.lookup['year'].values())
+            filters['year'] = [code for code in year_codes
+                               if (start is None or cube.labels['year'][code] >= start)
+                               and (end is None or cube.labels['year'][code] <= end)]
+        return cube.query(group, filters, stat_list, rank=rank.lower() if rank else None,
+                          k=k, of=of.lower(), shape=shape)
+
+    return await respond(request, ['le', 'hle'], compute)
+
+
+# Datasets that can be ranked: the datasets they are built from and their ranking index
+RANKINGS = {
+    'life': (['le', 'hle', 'population', 'countries'],
+             lambda: registry.combined(['le', 'hle', 'population', 'countries'], LifeJoin).ranking),
+    'emissions': (['emissions'], lambda: registry.get('emissions').ranking),
+    'alluvial': (['alluvial'], lambda: registry.get('alluvial').ranking),
+}
+
+
+@app.get("/rankings/{dataset}")
+async def get_rankings(
+    request: Request,
+    dataset: str,
+    measure: str = Query(..., description="LE, HLE or POPULATION (life), PER_CAPITA (emissions), "
+                                          "TOTAL, LAND_USE or FOSSIL (alluvial)"),
+    k: int = Query(5, ge=1, le=1000, description="Entities per group"),
+    order: str = Query("top", description="TOP (highest first) or BOTTOM (lowest first)"),
+    by: Optional[str] = Query(None, description="Comma separated dimensions to rank within, e.g. YEAR"),
+    start: Optional[int] = Query(None, description="First year of the range"),
+    end: Optional[int] = Query(None, description="Last year of the range"),
+    region: Optional[str] = Query(None, description="Comma separated regions (life)"),
+    sex: Optional[str] = Query(None, description="Comma separated MALE, FEMALE, BOTH (life)"),
+    age: Optional[str] = Query(None, description="Comma separated BIRTH, 60 (life; default BIRTH unless by AGE)"),
+    continent: Optional[str] = Query(None, description="Comma separated continents (emissions, alluvial)"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    """Get the top or bottom k entities of a dataset by a measure, per year or any other grouping"""
+    if dataset not in RANKINGS:
+        raise HTTPException(status_code=404, detail="Unknown dataset")
+    if order.lower() not in ORDERS:
+        raise HTTPException(status_code=400, detail="Invalid order parameter")
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="Invalid year range")
+    shape = response_shape(shape)
+    sources, ranking_index = RANKINGS[dataset]
+
+    def compute():
+        ranking = ranking_index()
+        if measure.lower() not in ranking.measures:
+            raise HTTPException(status_code=400, detail="Invalid measure parameter")
+        group = [dimension.strip().lower() for dimension in by.split(',') if dimension.strip()] if by else []
+        if any(dimension not in ranking.dimensions for dimension in group) or len(set(group)) != len(group):
+            raise HTTPException(status_code=400, detail="Invalid by parameter")
+        # LE at birth and at 60 are not comparable: rank one age unless asked to rank within ages
+        ages = 'birth' if age is None and 'age' in ranking.lookup and 'age' not in group else age
+        filters = []
+        for dimension, values in (('region', region), ('sex', sex), ('age', ages), ('continent', continent)):
+            if values is None:
+                continue
+            if dimension not in ranking.lookup:
+                raise HTTPException(status_code=400, detail="Invalid %s parameter" % dimension)
+            values = ['both sexes' if value.strip().lower() == 'both' and dimension == 'sex' else value.strip()
+                      for value in values.split(',') if value.strip()]
+            if not values or any(value.lower() not in ranking.lookup[dimension] for value in values):
+                raise HTTPException(status_code=400, detail="Invalid %s parameter" % dimension)
+            filters.append((dimension, ranking.filter_codes(dimension, values)))
+        return ranking.top(measure.lower(), k, order.lower(), start, end, tuple(group), tuple(filters), shape)
+
+    return await respond(request, sources, compute)
+
+
+@app.get("/population")
+async def get_population(
+    request: Request,
+    country: Optional[str] = Query(None, description="Comma separated country names or World Bank codes (default: all)"),
+    years: Optional[str] = Query(None, description="Comma separated years"),
+    start: Optional[int] = Query(None, description="First year of the range"),
+    end: Optional[int] = Query(None, description="Last year of the range"),
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    """Get the population of countries (and World Bank aggregates) by year"""
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="Invalid year range")
     try:
-        year_list = years.split(',')
-        df_le, df_hle = init_data()
-        
-        # Validate age parameter
-        age = age.lower()
-        if age not in AGE_INDICATORS:
-            raise HTTPException(status_code=400, detail="Invalid age parameter")
-        
-        response = {'le': None, 'hle': None}
-        
-        if metric.lower() == "both":
-            df_dict = {"le": df_le, "hle": df_hle}
+        year_list = sorted({int(year) for year in years.split(',') if year.strip()}) if years else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid years parameter")
+    shape = response_shape(shape)
+
+    def compute():
+        store = registry.get('population')
+        if country:
+            rows = [store.row_of(registry.get('countries'), name) for name in country.split(',') if name.strip()]
+            rows = sorted({row for row in rows if row >= 0})
+            if not rows:
+                raise HTTPException(status_code=404, detail="Unknown country")
         else:
-            df_dict = {"le": df_le} if metric.lower() == "le" else {"hle": df_hle}
-        
-        if sex.lower() == 'both':
-            sex = "Both sexes"
-        for df_key in df_dict:
-            df = df_dict[df_key]
-            mask = (
-                df['Period'].isin(year_list) &
-                (df['Sex'].str.lower() == sex.lower())
-            )
-            
-            # Apply age filter
-            if age != 'both':
-                mask &= (df['Indicator'] == AGE_INDICATORS[age])
-                
-            if country:
-                mask &= (df['Location'] == country.lower())
-            if continent:
-                mask &= (df['ParentLocation'].str.lower() == continent.lower())
-                
-            df = df[mask]
-            
-            # Group by year for response format
-            result = df.groupby('Period').apply(
-                lambda x: x[['Location', 'ParentLocation', 'Sex', 'FactValueNumeric',
-                               'FactValueNumericLow', 'FactValueNumericHigh', 'Indicator']]
-                          .replace(np.nan, None)
-                          .to_dict('records')
-            ).to_dict()
-                     
-            response[df_key] = result
-        return JSONResponse(content=response)
-        
-    except Exception as e:
-        print(f"Error occurred: {str(e)}")  # Debug print
-        import traceback
-        print(traceback.format_exc())  # Print full traceback
-        raise HTTPException(status_code=500, detail=str(e))
+            rows = list(range(len(store.codes)))
+        if year_list is None:
+            positions = store.span(rows, start, end)
+        else:
+            selected = [year for year in year_list
+                        if store.first_year <= year <= store.last_year
+                        and (start is None or year >= start) and (end is None or year <= end)]
+            positions = store.locate(np.repeat(rows, len(selected)), np.tile(selected, len(rows)))
+            positions = positions[positions >= 0]
+        return store.records(positions, shape)
+
+    return await respond(request, ['population', 'countries'], compute)
+
+
+async def geometry_store(name):
+    """Loaded geometry of a name of GEOMETRY_SOURCES"""
+    if name not in GEOMETRY_SOURCES:
+        raise HTTPException(status_code=404, detail="Unknown geometry")
+    try:
+        return await executor.run(registry.get, 'geometry-' + name)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Geometry not fetched: run python -m app.geometry fetch")
+
+
+@app.get("/geometry/{name}")
+async def get_geometry(
+    request: Request,
+    name: str,
+    zoom: float = Query(1, gt=0, description="Scale of the map relative to a whole-world view"),
+    tier: Optional[str] = Query(None, description="LOW, MEDIUM or HIGH (default: from zoom)"),
+    format: str = Query("topojson", description="TOPOJSON or GEOJSON")
+):
+    """Get country outlines simplified for a zoom level, as TopoJSON (or GeoJSON)"""
+    tier = tier.lower() if tier else tier_of(zoom)
+    if tier not in TIERS:
+        raise HTTPException(status_code=400, detail="Invalid tier parameter")
+    if format.lower() not in GEOMETRY_FORMATS:
+        raise HTTPException(status_code=400, detail="Invalid format parameter")
+    store = await geometry_store(name)
+    body, gzipped, etag = await executor.run(store.encoded, tier, format.lower())
+
+    headers = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+    accepted = accepted_codings(request.headers.get('accept-encoding'))
+    if 'gzip' in accepted or '*' in accepted:
+        headers['Content-Encoding'] = 'gzip'
+        body = gzipped
+    return Response(content=body, media_type='application/json', headers=headers)
+
+
+@app.get("/geometry/{name}/centroids")
+async def get_geometry_centroids(
+    request: Request,
+    name: str,
+    shape: str = Query("records", description="RECORDS or COLUMNAR")
+):
+    """Get the centroid (lon, lat) of every feature of a geometry"""
+    shape = response_shape(shape)
+    store = await geometry_store(name)
+    return await respond(request, ['geometry-' + name], lambda: store.centroid_records(shape))
+
 
 @app.get("/countries")
-async def get_countries():
+async def get_countries(request: Request):
     """Get list of all available countries"""
-    df_le = pd.read_csv('app/static/data/le.csv')
-    le_countries = df_le['Location'].unique().tolist()
-    # Combine unique countries from both datasets    
-    return JSONResponse(content={"countries": le_countries} )
+    def compute():
+        df_le = registry.get('le')
+        le_countries = df_le['Location'].unique().tolist()
+        # Combine unique countries from both datasets    
+        return {"countries": le_countries}
+
+    return await respond(request, ['le'], compute)
 
 
 @app.get("/continents")
-async def get_continents():
+async def get_continents(request: Request):
     """Get list of all available continents/regions"""
-    df_le, df_hle = init_data()
-    
-    # Combine unique continents from both datasets
-    continents = sorted(set(df_le['ParentLocation'].unique()) | set(df_hle['ParentLocation'].unique()))
-    
-    return JSONResponse(content={"continents": continents})
+    def compute():
+        df_le, df_hle = init_data()
+        
+        # Combine unique continents from both datasets
+        continents = sorted(set(lookup_form(df_le['ParentLocation']).unique())
+                            | set(lookup_form(df_hle['ParentLocation']).unique()))
+        return {"continents": continents}
+
+    return await respond(request, ['le', 'hle'], compute)
 
 @app.get("/years")
-async def get_years():
+async def get_years(request: Request):
     """Get list of all available years"""
-    df_le = pd.read_csv('app/static/data/le.csv')
-    le_years = df_le['Period'].unique().tolist()
-    # Combine unique countries from both datasets    
-    return JSONResponse(content={"years": le_years} )
+    def compute():
+        df_le = registry.get('le')
+        le_years = [int(year) for year in df_le['Period'].unique()]
+        return {"years": le_years}
+
+    return await respond(request, ['le'], compute)
 
 @app.get("/regions")
-async def get_regions():
+async def get_regions(request: Request):
     """Get list of all available regions"""
-    df_le = pd.read_csv('app/static/data/le.csv')
-    le_regions = df_le['ParentLocation'].unique().tolist()
-    # Combine unique countries from both datasets    
-    return JSONResponse(content={"regions": le_regions} )
+    def compute():
+        df_le = registry.get('le')
+        le_regions = df_le['ParentLocation'].unique().tolist()
+        return {"regions": le_regions}
+
+    return await respond(request, ['le'], compute)
+
+
+@app.get("/datasets")
+async def get_datasets():
+    """Get the version and memory footprint of every loaded dataset"""
+    return JSONResponse(content=registry.footprint())
+
+
+@app.get("/countries/unmatched")
+async def get_unmatched_countries():
+    """Get the country names of every source that the country registry could not resolve"""
+    registry.get('countries')
+    return JSONResponse(content=UNMATCHED)
+
+
+@app.get("/executor/stats")
+async def get_executor_stats():
+    """Get the queue depth, timeouts and rejections of the data executor"""
+    return JSONResponse(content=executor.stats())
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Get request counts, latencies, stage times, rows scanned and bytes in the Prometheus text format"""
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
+
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    """Get hit, miss and eviction counters of the response cache"""
+    return JSONResponse(content=response_cache.stats())
@@ -0,0 +1,279 @@
+"""Request metrics and an opt-in sampling profiler.
+
+MetricsMiddleware times every request and counts the bytes it emits per
+route.  Inside a request, the data path reports where its time goes with
+stage() (load, filter, aggregate, serialize) and how many rows it examined
+with scanned(); both find the request through a context variable, which the
+data executor carries into its worker threads, and are no-ops outside a
+request.  Stage times are exclusive: a load nested in a filter only counts
+as load.  Metrics.render() exposes the counters in the Prometheus text
+format.
+
+With VIZ_PROFILE_SLOW_MS set, a sampler thread records the stacks of the
+threads working on a request every VIZ_PROFILE_INTERVAL_MS (default 5) and
+requests slower than the threshold dump them under VIZ_PROFILE_DIR (default
+profiles/) as collapsed stacks ("frame;frame;frame count" lines), the input
+format of flamegraph.pl and speedscope.
+"""
+import functools
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('load', 'filter', 'aggregate', 'serialize')
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Stage times, rows scanned and profile samples of one request"""
+
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.rows = 0
+        self.samples = Counter()
+        self.threads = Counter()
+        self._nested = []
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed code as a stage of the current request"""
+    request = current.get()
+    if request is None:
+        yield
+        return
+    thread = threading.get_ident()
+    request.threads[thread] += 1
+    request._nested.append(0.0)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        request.stages[name] += elapsed - request._nested.pop()
+        if request._nested:
+            request._nested[-1] += elapsed
+        request.threads[thread] -= 1
+        if not request.threads[thread]:
+            del request.threads[thread]
+
+
+def timed(name):
+    """Decorator running a function as a stage of the current request"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def scanned(rows):
+    """Count rows examined by the current request"""
+    request = current.get()
+    if request is not None:
+        request.rows += int(rows)
+
+
+def collapse(frame):
+    """Collapsed stack of a frame, outermost call first"""
+    calls = []
+    while frame is not None:
+        code = frame.f_code
+        calls.append('%s (%s:%d)' % (code.co_name, os.path.basename(code.co_filename), frame.f_lineno))
+        frame = frame.f_back
+    return ';'.join(reversed(calls))
+
+
+class Sampler:
+    """Thread sampling the stacks of the threads working on active requests"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.active = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, request):
+        with self._lock:
+            self.active.add(request)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+                self._thread.start()
+
+    def discard(self, request):
+        with self._lock:
+            self.active.discard(request)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                requests = list(self.active)
+            if not requests:
+                continue
+            frames = sys._current_frames()
+            for request in requests:
+                for thread in list(request.threads):
+                    frame = frames.get(thread)
+                    if frame is not None:
+                        request.samples[collapse(frame)] += 1
+
+
+class Metrics:
+    """Per-route request counters, latency histograms, stage times and bytes"""
+
+    def __init__(self, profile_threshold=None, profile_dir='profiles', profile_interval=0.005):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.durations = defaultdict(lambda: [0] * (len(BUCKETS) + 1))
+        self.duration_sums = defaultdict(float)
+        self.stages = defaultdict(float)
+        self.rows = Counter()
+        self.bytes = Counter()
+        self.in_progress = 0
+        self.profile_threshold = profile_threshold
+        self.profile_dir = profile_dir
+        self.profiles = 0
+        self.sampler = Sampler(profile_interval) if profile_threshold is not None else None
+
+    def begin(self, request):
+        with self._lock:
+            self.in_progress += 1
+        if self.sampler is not None:
+            self.sampler.add(request)
+
+    def end(self, request, method, route, status, seconds, size):
+        if self.sampler is not None:
+            self.sampler.discard(request)
+        with self._lock:
+            self.in_progress -= 1
+            self.requests[method, route, status] += 1
+            bucket = next((i for i, bound in enumerate(BUCKETS) if seconds <= bound), len(BUCKETS))
+            self.durations[route][bucket] += 1
+            self.duration_sums[route] += seconds
+            for name, elapsed in request.stages.items():
+                self.stages[route, name] += elapsed
+            self.rows[route] += request.rows
+            self.bytes[route] += size
+        if (self.profile_threshold is not None and seconds * 1000 >= self.profile_threshold
+                and request.samples):
+            self.dump_profile(request, method, route, seconds)
+
+    def dump_profile(self, request, method, route, seconds):
+        """Write the stack samples of a slow request as collapsed stacks"""
+        name = '%s-%s-%s-%dms.folded' % (time.strftime('%Y%m%dT%H%M%S'), method,
+                                         re.sub(r'[^A-Za-z0-9]+', '_', route).strip('_') or 'root',
+                                         seconds * 1000)
+        try:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            with open(os.path.join(self.profile_dir, name), 'w') as f:
+                for stack, count in request.samples.most_common():
+                    f.write('%s %d\n' % (stack, count))
+        except OSError as e:
+            logger.warning("Could not write the profile of %s %s: %s", method, route, e)
+            return
+        with self._lock:
+            self.profiles += 1
+        logger.info("Slow request %s %s (%.0f ms) profiled to %s", method, route, seconds * 1000, name)
+
+    def render(self):
+        """Counters in the Prometheus text exposition format"""
+        def labels(**values):
+            return '{%s}' % ','.join('%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+                                     for key, value in values.items())
+
+        with self._lock:
+            lines = ['# HELP viz_requests_total Requests answered, by route and status',
+                     '# TYPE viz_requests_total counter']
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append('viz_requests_total%s %d' % (labels(method=method, route=route, status=status), count))
+            lines += ['# HELP viz_request_duration_seconds Request latency, by route',
+                      '# TYPE viz_request_duration_seconds histogram']
+            for route, counts in sorted(self.durations.items()):
+                total = 0
+                for bound, count in zip(BUCKETS + ('+Inf',), counts):
+                    total += count
+                    lines.append('viz_request_duration_seconds_bucket%s %d' % (labels(route=route, le=bound), total))
+                lines.append('viz_request_duration_seconds_sum%s %.6f' % (labels(route=route),
+                                                                          self.duration_sums[route]))
+                lines.append('viz_request_duration_seconds_count%s %d' % (labels(route=route), total))
+            lines += ['# HELP viz_request_stage_seconds_total Time spent in each stage of the data path',
+                      '# TYPE viz_request_stage_seconds_total counter']
+            for (route, name), elapsed in sorted(self.stages.items()):
+                lines.append('viz_request_stage_seconds_total%s %.6f' % (labels(route=route, stage=name), elapsed))
+            lines += ['# HELP viz_rows_scanned_total Rows examined by the data path',
+                      '# TYPE viz_rows_scanned_total counter']
+            for route, rows in sorted(self.rows.items()):
+                lines.append('viz_rows_scanned_total%s %d' % (labels(route=route), rows))
+            lines += ['# HELP viz_response_bytes_total Response body bytes emitted',
+                      '# TYPE viz_response_bytes_total counter']
+            for route, size in sorted(self.bytes.items()):
+                lines.append('viz_response_bytes_total%s %d' % (labels(route=route), size))
+            lines += ['# HELP viz_requests_in_progress Requests being answered',
+                      '# TYPE viz_requests_in_progress gauge',
+                      'viz_requests_in_progress %d' % self.in_progress,
+                      '# HELP viz_profiles_total Slow requests profiled',
+                      '# TYPE viz_profiles_total counter',
+                      'viz_profiles_total %d' % self.profiles]
+        return '\n'.join(lines) + '\n'
+
+
+def route_of(scope):
+    """Route template of a routed request (mount path for static files)"""
+    route = scope.get('route')
+    if route is not None:
+        return route.path
+    return scope.get('root_path') or 'unmatched'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording the metrics of every HTTP request"""
+
+    def __init__(self, app, metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        request = RequestMetrics()
+        token = current.set(request)
+        response = {'status': 500, 'bytes': 0}
+
+        async def send_counted(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['bytes'] += len(message.get('body', b''))
+            await send(message)
+
+        self.metrics.begin(request)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            current.reset(token)
+            self.metrics.end(request, scope['method'], route_of(scope), response['status'],
+                             time.perf_counter() - started, response['bytes'])
+
+
+def from_environ():
+    threshold = os.environ.get('VIZ_PROFILE_SLOW_MS')
+    return Metrics(
+        profile_threshold=float(threshold) if threshold else None,
+        profile_dir=os.environ.get('VIZ_PROFILE_DIR', 'profiles'),
+        profile_interval=float(os.environ.get('VIZ_PROFILE_INTERVAL_MS', 5)) / 1000,
+    )
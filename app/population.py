@@ -0,0 +1,134 @@
+"""Year-indexed population store behind /population and the life joins.
+
+The World Bank table has one row per country (or aggregate) and one column
+per year.  It is reshaped once into long arrays of (entity, year, value),
+missing years left out, sorted by entity and year; an int64 key
+``entity * KEY_STRIDE + year`` indexes them, so point lookups of many
+(entity, year) pairs are one vectorized searchsorted and the years of an
+entity are one contiguous slice.
+"""
+import numpy as np
+import pandas as pd
+
+from app.life import column_values
+from app.metrics import scanned, timed
+from app.serialize import shaped
+from app.sidecar import read_arrays, read_frame
+
+KEY_STRIDE = 10000
+
+
+class PopulationStore:
+    """Population of every World Bank entity (country or aggregate) and year"""
+
+    def __init__(self, codes, names, entity, years, values):
+        self.codes = list(codes)
+        self.names = list(names)
+        self.row_of_code = {code: row for row, code in enumerate(self.codes)}
+        self.entity = entity
+        self.years = years
+        self.values = values
+        self.keys = entity.astype(np.int64) * KEY_STRIDE + years
+        self.starts = np.searchsorted(entity, np.arange(len(self.codes) + 1))
+        # Years outside first_year..last_year would reach into the keys of the next entity
+        self.first_year = int(years.min()) if len(years) else 0
+        self.last_year = int(years.max()) if len(years) else -1
+
+    @classmethod
+    def from_frame(cls, frame):
+        """Reshape the wide World Bank table (one column per year)"""
+        year_columns = [column for column in frame.columns if str(column).isdigit()]
+        wide = frame[year_columns].to_numpy(dtype=np.float64)
+        entity, column = np.nonzero(~np.isnan(wide))
+        years = np.array([int(year) for year in year_columns], dtype=np.int16)
+        return cls(frame['Country Code'].tolist(), frame['Country Name'].tolist(),
+                   entity.astype(np.int32), years[column], wide[entity, column])
+
+    def to_arrays(self):
+        """(arrays, meta) of the store, as saved by sidecar.read_arrays"""
+        return ({'entity': self.entity, 'years': self.years, 'values': self.values},
+                {'codes': self.codes, 'names': self.names})
+
+    @classmethod
+    def from_arrays(cls, arrays, meta):
+        return cls(meta['codes'], meta['names'], arrays['entity'], arrays['years'], arrays['values'])
+
+    @property
+    def nbytes(self):
+        return self.entity.nbytes + self.years.nbytes + self.values.nbytes + self.keys.nbytes
+
+    def __len__(self):
+        return len(self.values)
+
+    def rows_of(self, countries):
+        """Store row of every country id of a country registry (-1 if it has none)"""
+        rows = np.full(len(countries.codes) + 1, -1, dtype=np.int32)
+        for code, row in self.row_of_code.items():
+            country = countries.id_of_code.get(code)
+            if country is not None:
+                rows[country] = row
+        return rows
+
+    def row_of(self, countries, name):
+        """Store row of a World Bank code or of a country name known to the registry, or -1"""
+        row = self.row_of_code.get(name.strip().upper())
+        if row is None:
+            country = countries.lookup(name)
+            row = self.row_of_code.get(countries.codes[country]) if country >= 0 else None
+        return -1 if row is None else row
+
+    @timed('filter')
+    def locate(self, rows, years):
+        """Position of each (row, year) pair, -1 where unknown (row -1 or missing year)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        years = np.asarray(years, dtype=np.int64)
+        known = (rows >= 0) & (years >= self.first_year) & (years <= self.last_year)
+        keys = rows * KEY_STRIDE + np.clip(years, self.first_year, max(self.last_year, self.first_year))
+        scanned(len(keys))
+        if not len(self.keys):
+            return np.full(len(keys), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        return np.where(known & (self.keys[positions] == keys), positions, -1)
+
+    def at(self, rows, years):
+        """Population of each (row, year) pair, NaN where unknown"""
+        positions = self.locate(rows, years)
+        return np.where(positions >= 0, self.values[positions], np.nan)
+
+    @timed('filter')
+    def span(self, rows, start=None, end=None):
+        """Positions of the years start..end (inclusive) of the given rows, by row and year"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if start is not None:
+            start = min(max(start, self.first_year), self.last_year + 1)
+        if end is not None:
+            end = max(min(end, self.last_year), self.first_year - 1)
+        lo = self.starts[rows] if start is None else np.searchsorted(self.keys, rows * KEY_STRIDE + start)
+        hi = self.starts[rows + 1] if end is None else np.searchsorted(self.keys, rows * KEY_STRIDE + end,
+                                                                       side='right')
+        scanned(int((hi - lo).sum()))
+        if not len(rows):
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.arange(a, b) for a, b in zip(lo.tolist(), hi.tolist())])
+
+    @timed('aggregate')
+    def records(self, positions, shape='records'):
+        """Records (Country Name, Code, Year, Population) of the given positions"""
+        entity = self.entity[positions]
+        codes = np.asarray(self.codes, dtype=object)
+        names = np.asarray(self.names, dtype=object)
+        return shaped(['Country Name', 'Code', 'Year', 'Population'], [
+            names[entity].tolist(),
+            codes[entity].tolist(),
+            self.years[positions].astype(int).tolist(),
+            column_values(pd.Series(self.values[positions])),
+        ], shape)
+
+
+def build_population(path):
+    return PopulationStore.from_frame(read_frame(path)).to_arrays()
+
+
+def load_population(path):
+    """Load the store, memory-mapped from its sidecar when the file is unchanged"""
+    return PopulationStore.from_arrays(*read_arrays((path,), build_population))
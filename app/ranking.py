@@ -0,0 +1,128 @@
+"""Top/bottom-k rankings of the entities of a year-indexed table.
+
+A RankingIndex keeps the rows of a table sorted by year, so the rows of a
+year range are one slice and the rows of each year one contiguous partition
+of it.  The k best values of a partition are picked with np.partition
+(linear in the partition) and only those k are sorted, instead of sorting
+every row of the range.  Rankings are memoized per query.
+"""
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from app.metrics import scanned, stage, timed
+from app.serialize import shaped
+
+ORDERS = ('top', 'bottom')
+
+
+def select(values, k, order='top'):
+    """Positions of the k largest ('top') or smallest ('bottom') values, best first
+
+    NaN never ranks; equal values keep their positional order, as with
+    nlargest/nsmallest(keep='first').
+    """
+    positions = np.flatnonzero(~np.isnan(values))
+    keys = values[positions].astype(np.float64)
+    if order == 'top':
+        keys = -keys
+    if len(positions) > k:
+        kth = np.partition(keys, k - 1)[k - 1]
+        better = np.flatnonzero(keys < kth)
+        chosen = np.concatenate([better, np.flatnonzero(keys == kth)[:k - len(better)]])
+        positions, keys = positions[chosen], keys[chosen]
+    return positions[np.lexsort((positions, keys))]
+
+
+def plain(values):
+    """JSON values of a float array (float32 through their shortest repr), NaN as None"""
+    if values.dtype == np.float32:
+        values = values.astype(str).astype(np.float64)
+    return np.where(np.isnan(values), None, values).tolist()
+
+
+class RankingIndex:
+    """Entities of a table ranked by any of its measures
+
+    entity, years and the values of every measure and dimension are arrays
+    of the same rows.  Dimensions (e.g. region, sex) can group or filter a
+    ranking; their values are matched case-insensitively.
+    """
+
+    def __init__(self, entity_name, entity, years, measures, dimensions=None, maxsize=256):
+        order = np.argsort(np.asarray(years), kind='stable')
+        self.entity_name = entity_name
+        self.years = np.asarray(years)[order].astype(np.int64)
+        self.entity_codes, entities = pd.factorize(np.asarray(entity, dtype=object)[order])
+        self.entities = np.asarray(entities, dtype=object)
+        self.measures = {name: np.asarray(values)[order] for name, values in measures.items()}
+        self.codes = {}
+        self.labels = {}
+        self.lookup = {}
+        for name, values in (dimensions or {}).items():
+            self.codes[name], labels = pd.factorize(np.asarray(values, dtype=object)[order], sort=True)
+            self.labels[name] = np.array(list(labels) + [None], dtype=object)
+            self.lookup[name] = {str(label).lower(): code for code, label in enumerate(labels)}
+        self.top = lru_cache(maxsize=maxsize)(self._top)
+
+    def __len__(self):
+        return len(self.years)
+
+    @property
+    def dimensions(self):
+        return ('year',) + tuple(self.codes)
+
+    def filter_codes(self, dimension, values):
+        """Codes of the given labels of a dimension (unknown labels are skipped)"""
+        lookup = self.lookup[dimension]
+        return tuple(sorted(lookup[value.lower()] for value in values if value.lower() in lookup))
+
+    @timed('aggregate')
+    def _top(self, measure, k=5, order='top', start=None, end=None, by=(), filters=(), shape='records'):
+        """The k best entities by measure in every group of the `by` dimensions
+
+        filters are (dimension, codes) pairs.  An entity with several rows in
+        a group (several years of the range, or values of a dimension that is
+        neither grouped nor filtered) is ranked on their mean.
+        """
+        with stage('filter'):
+            lo = 0 if start is None else np.searchsorted(self.years, start, side='left')
+            hi = len(self.years) if end is None else np.searchsorted(self.years, end, side='right')
+            scanned(hi - lo)
+            rows = np.arange(lo, hi)
+            for dimension, codes in filters:
+                rows = rows[np.isin(self.codes[dimension][lo:hi][rows - lo], codes)]
+
+        keys = {dimension: self.years[rows] if dimension == 'year' else self.codes[dimension][rows]
+                for dimension in by}
+        units = pd.DataFrame(keys | {'entity': self.entity_codes[rows],
+                                     'value': self.measures[measure][rows].astype(np.float64)})
+        if units.duplicated(list(by) + ['entity']).any():
+            units = units.groupby(list(by) + ['entity'], sort=False)['value'].mean().reset_index()
+
+        # Rows are year-ordered, so the year groups are already contiguous and the sort is a no-op
+        if by:
+            group = units.groupby(list(by), sort=True).ngroup().to_numpy()
+            positions = np.argsort(group, kind='stable')
+            bounds = np.flatnonzero(np.diff(group[positions])) + 1
+        else:
+            positions, bounds = np.arange(len(units)), []
+        values = units['value'].to_numpy()
+        picked, ranks = [], []
+        for partition in np.split(positions, bounds):
+            best = partition[select(values[partition], k, order)]
+            picked.append(best)
+            ranks.append(np.arange(1, len(best) + 1))
+        picked = np.concatenate(picked) if picked else np.empty(0, dtype=np.int64)
+        ranks = np.concatenate(ranks) if ranks else np.empty(0, dtype=np.int64)
+
+        names = list(by) + [self.entity_name, measure, 'rank']
+        columns = []
+        for dimension in by:
+            codes = units[dimension].to_numpy()[picked]
+            columns.append(codes.tolist() if dimension == 'year' else self.labels[dimension][codes].tolist())
+        columns.append(self.entities[units['entity'].to_numpy()[picked]].tolist())
+        columns.append(plain(values[picked].astype(self.measures[measure].dtype)))
+        columns.append(ranks.tolist())
+        return shaped(names, columns, shape)
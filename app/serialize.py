@@ -0,0 +1,32 @@
+"""JSON serialization of the API responses.
+
+dumps() encodes response content with orjson when it is installed (NaN and
+numpy values handled natively) and falls back to the standard library with
+the settings of Starlette's JSONResponse.  shaped() builds the content of a
+tabular response from its column value lists, either as the usual records
+or, when a client opts in with ``shape=columnar``, as one array per column
+(``{"columns": [...], "data": [[...], ...]}``) without per-row objects.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SHAPES = ('records', 'columnar')
+
+
+def dumps(content):
+    """UTF-8 JSON bytes of the content of a response"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def shaped(keys, columns, shape='records'):
+    """Records of the value lists of the given columns, or their columnar form"""
+    if shape == 'columnar':
+        return {'columns': list(keys), 'data': [list(column) for column in columns]}
+    return [dict(zip(keys, row)) for row in zip(*columns)]
@@ -0,0 +1,227 @@
+"""Columnar binary sidecars for the text data files.
+
+A parsed frame is stored under SIDECAR_DIR as one ``.npy`` file per column
+plus a ``meta.json`` recording the SHA-256 of the source file and the parser
+that produced it.  String columns
+are dictionary-encoded (integer codes + a category list in the metadata).
+
+read_frame() opens the sidecar memory-mapped when the source hash and parser
+match, and otherwise parses the text file and (re)writes the sidecar.
+read_arrays() does the same for stores built from several files (a dict of
+arrays plus JSON metadata).
+
+Memory-mapped sidecars are read-only and backed by the page cache, so every
+worker process attaching to them shares one copy of the data.  Publish them
+once, before the workers start, with::
+
+    python -m app.sidecar
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+SIDECAR_DIR = os.environ.get('VIZ_SIDECAR_DIR', '.columnar')
+FORMAT_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def sidecar_dir(path):
+    path = os.path.abspath(path)
+    relative = os.path.relpath(path)
+    if relative.startswith(os.pardir):
+        relative = path.lstrip(os.sep)
+    return os.path.join(SIDECAR_DIR, relative)
+
+
+def parser_key(parser, kwargs):
+    return '%s.%s(%r)' % (parser.__module__, parser.__qualname__, sorted(kwargs.items()))
+
+
+def key_dir(key):
+    """Sub-directory of one parser's sidecar, so parsers of a file do not overwrite each other"""
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def encode_column(series):
+    """Return (column metadata, array to save), or None if unsupported"""
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = dtype.categories
+        if categories.dtype != object or not all(isinstance(c, str) for c in categories):
+            return None
+        return ({'kind': 'category', 'categories': categories.tolist(), 'ordered': bool(dtype.ordered)},
+                series.cat.codes.to_numpy())
+    if dtype == object:
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        if not all(isinstance(u, str) for u in uniques):
+            return None
+        return {'kind': 'object', 'categories': list(uniques)}, codes.astype(np.int32)
+    if isinstance(dtype, np.dtype) and dtype.kind in 'biuf':
+        return {'kind': 'numeric'}, series.to_numpy()
+    return None
+
+
+def decode_column(meta, values):
+    if meta['kind'] == 'category':
+        return pd.Categorical.from_codes(values, categories=meta['categories'], ordered=meta['ordered'])
+    if meta['kind'] == 'object':
+        categories = np.array(meta['categories'] + [np.nan], dtype=object)
+        return categories[values]
+    return values
+
+
+def write_sidecar(frame, target, meta):
+    """Write the columns of a frame under target; False if not encodable"""
+    if not isinstance(frame.index, pd.RangeIndex) or frame.index.start != 0 or frame.index.step != 1:
+        return False
+    encoded = [encode_column(frame.iloc[:, i]) for i in range(frame.shape[1])]
+    if any(column is None for column in encoded):
+        return False
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(target))
+    columns = []
+    for i, (name, (column_meta, values)) in enumerate(zip(frame.columns, encoded)):
+        column_meta.update(name=name, file='c%d.npy' % i)
+        np.save(os.path.join(tmp, column_meta['file']), values)
+        columns.append(column_meta)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(dict(meta, rows=len(frame), columns=columns), f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+    return True
+
+
+def open_sidecar(target, sha256, key):
+    """Open a sidecar memory-mapped, or return None if missing or stale"""
+    try:
+        with open(os.path.join(target, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (meta.get('format') != FORMAT_VERSION or meta.get('source_sha256') != sha256
+            or meta.get('parser') != key):
+        return None
+    columns = {
+        column['name']: decode_column(column, np.load(os.path.join(target, column['file']), mmap_mode='r'))
+        for column in meta['columns']
+    }
+    return pd.DataFrame(columns, copy=False)
+
+
+def read_frame(path, parser=pd.read_csv, **kwargs):
+    """Return parser(path, **kwargs), read from its columnar sidecar when fresh"""
+    sha256 = file_sha256(path)
+    key = parser_key(parser, kwargs)
+    target = os.path.join(sidecar_dir(path), key_dir(key))
+    frame = open_sidecar(target, sha256, key)
+    if frame is not None:
+        return frame
+
+    frame = parser(path, **kwargs)
+    try:
+        if not write_sidecar(frame, target, {'format': FORMAT_VERSION, 'source': path,
+                                             'source_sha256': sha256, 'parser': key}):
+            logger.info("No columnar sidecar for %s: unsupported column types", path)
+    except OSError as e:
+        logger.warning("Could not write columnar sidecar for %s: %s", path, e)
+    return frame
+
+
+def write_arrays(arrays, target, meta):
+    """Write a dict of arrays (one .npy each) and their metadata under target"""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=os.path.dirname(target))
+    files = {}
+    for i, (name, values) in enumerate(arrays.items()):
+        files[name] = 'a%d.npy' % i
+        np.save(os.path.join(tmp, files[name]), values)
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(dict(meta, arrays=files), f)
+    shutil.rmtree(target, ignore_errors=True)
+    os.replace(tmp, target)
+
+
+def read_arrays(paths, build):
+    """Return build(*paths) -> (arrays, meta), read from its sidecar when fresh
+
+    arrays is a dict of numpy arrays, opened memory-mapped (read-only) from
+    the sidecar; meta is any JSON-serializable metadata of the store.
+    """
+    sha256 = [file_sha256(path) for path in paths]
+    key = parser_key(build, {})
+    target = os.path.join(SIDECAR_DIR, 'stores', key_dir(json.dumps([key] + [os.path.abspath(p) for p in paths])))
+    try:
+        with open(os.path.join(target, 'meta.json')) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        meta = {}
+    if (meta.get('format') == FORMAT_VERSION and meta.get('source_sha256') == sha256
+            and meta.get('parser') == key):
+        files = meta.pop('arrays')
+        arrays = {name: np.load(os.path.join(target, file), mmap_mode='r') for name, file in files.items()}
+        return arrays, meta['meta']
+
+    arrays, store_meta = build(*paths)
+    try:
+        write_arrays(arrays, target, {'format': FORMAT_VERSION, 'sources': list(paths),
+                                      'source_sha256': sha256, 'parser': key, 'meta': store_meta})
+    except OSError as e:
+        logger.warning("Could not write array sidecar for %s: %s", ', '.join(paths), e)
+    return arrays, store_meta
+
+
+def read_json_records(path):
+    return pd.read_json(path, orient='records')
+
+
+def build(data_dir):
+    """Write the sidecar of every tabular file in data_dir"""
+    from app.climdiv import read_climdiv
+    from app.datasets import registry
+
+    # Registered datasets go through their own loaders (and parser options)
+    registry.load_all()
+    for name in sorted(os.listdir(data_dir)):
+        path = os.path.join(data_dir, name)
+        if name.endswith('.csv'):
+            read_frame(path)
+        elif name.startswith('climdiv-'):
+            read_frame(path, read_climdiv)
+        elif name.endswith('.json'):
+            try:
+                read_frame(path, read_json_records)
+            except ValueError:
+                print(f"skipped {path}: not a list of records")
+                continue
+        else:
+            continue
+        print(f"{path} -> {sidecar_dir(path)}")
+
+
+def publish(data_dir):
+    """Write every sidecar the API reads, before its worker processes start"""
+    build(data_dir)
+    logger.info("Published the columnar sidecars of %s under %s", data_dir, SIDECAR_DIR)
+
+
+if __name__ == '__main__':
+    from app.datasets import DATA_DIR
+
+    publish(sys.argv[1] if len(sys.argv) > 1 else DATA_DIR)
@@ -5,48 +5,14 @@ const svg = d3.select("#alluvial-chart")
   .attr("width", width)
   .attr("height", height);
 
-// Load the dataset
-const dataPath = "/static/data/Alluvial_1996.csv";
-d3.csv(dataPath).then(data => {
-  const sankeyData = [];
-
-  // Filter data for the year 1996
-  const filteredData = data.filter(d => +d.Year === 1996);
-
-  // Prepare data with validation and aggregation
-  const aggregatedData = d3.rollup(filteredData, v => {
-    return {
-      totalEmissions: d3.sum(v, d => +d["Annual CO₂ emissions"] || 0),
-      fossilEmissions: d3.sum(v, d => +d["Annual CO₂ emissions from fossil fuels"] || 0),
-      landEmissions: d3.sum(v, d => +d["Annual CO₂ emissions from land-use change"] || 0)
-    };
-  }, d => d.Continent, d => d.Entity);
-
-  aggregatedData.forEach((countries, continent) => {
-    countries.forEach((values, country) => {
-      if (values.totalEmissions > 0) {
-        sankeyData.push({ source: continent, target: country, value: values.totalEmissions });
-      }
-      if (values.fossilEmissions > 0) {
-        sankeyData.push({ source: country, target: "Fossil", value: values.fossilEmissions });
-      }
-      if (values.landEmissions > 0) {
-        sankeyData.push({ source: country, target: "Land", value: values.landEmissions });
-      }
-    });
-  });
-
+// Continent -> country -> emission type flows of a year, e.g. ?year=2005,
+// with the countries beyond the 10 largest of each continent folded into "Other"
+const year = new URLSearchParams(window.location.search).get("year") || 1996;
+d3.json(`/emissions/flows?year=${year}&top=10`).then(flows => {
   // Create nodes and links
-  const nodes = Array.from(new Set(sankeyData.flatMap(d => [d.source, d.target])), name => ({ name }));
-  const links = sankeyData
-    .map(d => {
-      const sourceIndex = nodes.findIndex(n => n.name === d.source);
-      const targetIndex = nodes.findIndex(n => n.name === d.target);
-      return sourceIndex !== -1 && targetIndex !== -1
-        ? { source: sourceIndex, target: targetIndex, value: d.value }
-        : null;
-    })
-    .filter(link => link !== null);
+  const nodes = Array.from(new Set(flows.flatMap(d => [d.source, d.target])), name => ({ name }));
+  const index = new Map(nodes.map((node, i) => [node.name, i]));
+  const links = flows.map(d => ({ source: index.get(d.source), target: index.get(d.target), value: d.value }));
 
   // Create Sankey layout
   const sankey = d3.sankey()
@@ -0,0 +1,241 @@
+// Fetch a table from a data endpoint as columns, preferring an Apache Arrow IPC stream.
+//
+// The stream is decoded here, without the Apache Arrow library, for the types the
+// server writes (pyarrow from pandas): signed and unsigned integers, floats,
+// booleans, strings, and dictionary-encoded strings (categoricals). Numeric columns
+// come back as typed arrays (Float32Array, Int16Array, ...; 64-bit integers as
+// Float64Array; missing values as NaN), other columns as arrays (missing values as
+// null). Servers without Arrow support answer the JSON columnar shape, which is
+// returned in the same { length, columns } form.
+const ARROW_STREAM = "application/vnd.apache.arrow.stream";
+
+// Arrow's flatbuffer enums (Schema.fbs, Message.fbs)
+const ARROW_TYPE = { Int: 2, FloatingPoint: 3, Utf8: 5, Bool: 6, LargeUtf8: 20 };
+const ARROW_HEADER = { Schema: 1, DictionaryBatch: 2, RecordBatch: 3 };
+
+// Read-only view of one flatbuffer table
+class FlatTable {
+    constructor(view, position) {
+        this.view = view;
+        this.position = position;
+        this.vtable = position - view.getInt32(position, true);
+    }
+
+    static root(view, position) {
+        return new FlatTable(view, position + view.getUint32(position, true));
+    }
+
+    // Position of field i, or 0 when the field is absent
+    field(i) {
+        const offset = 4 + 2 * i;
+        if (offset >= this.view.getUint16(this.vtable, true)) return 0;
+        const at = this.view.getUint16(this.vtable + offset, true);
+        return at ? this.position + at : 0;
+    }
+
+    scalar(i, read, fallback = 0) {
+        const at = this.field(i);
+        return at ? read(this.view, at) : fallback;
+    }
+
+    int8(i) { return this.scalar(i, (v, at) => v.getInt8(at)); }
+    int16(i) { return this.scalar(i, (v, at) => v.getInt16(at, true)); }
+    int32(i) { return this.scalar(i, (v, at) => v.getInt32(at, true)); }
+    int64(i) { return this.scalar(i, (v, at) => Number(v.getBigInt64(at, true))); }
+
+    table(i) {
+        const at = this.field(i);
+        return at ? new FlatTable(this.view, at + this.view.getUint32(at, true)) : null;
+    }
+
+    string(i) {
+        const at = this.field(i);
+        if (!at) return null;
+        const start = at + this.view.getUint32(at, true);
+        const bytes = new Uint8Array(this.view.buffer, this.view.byteOffset + start + 4,
+            this.view.getUint32(start, true));
+        return new TextDecoder().decode(bytes);
+    }
+
+    // [position of the first element, length] of a vector field
+    vector(i) {
+        const at = this.field(i);
+        if (!at) return [0, 0];
+        const start = at + this.view.getUint32(at, true);
+        return [start + 4, this.view.getUint32(start, true)];
+    }
+
+    tables(i) {
+        const [start, length] = this.vector(i);
+        return Array.from({ length }, (_, k) =>
+            new FlatTable(this.view, start + 4 * k + this.view.getUint32(start + 4 * k, true)));
+    }
+
+    // Structs of two int64 (FieldNode, Buffer)
+    pairs(i) {
+        const [start, length] = this.vector(i);
+        return Array.from({ length }, (_, k) => [
+            Number(this.view.getBigInt64(start + 16 * k, true)),
+            Number(this.view.getBigInt64(start + 16 * k + 8, true))
+        ]);
+    }
+}
+
+// { name, type, bitWidth, signed, precision, dictionary } of a schema field
+function arrowField(field) {
+    const type = field.table(3);
+    const info = { name: field.string(0), type: field.scalar(2, (v, at) => v.getUint8(at)) };
+    const encoding = field.table(4);
+    if (type && info.type === ARROW_TYPE.Int) {
+        info.bitWidth = type.int32(0);
+        info.signed = type.scalar(1, (v, at) => v.getUint8(at) !== 0, false);
+    } else if (type && info.type === ARROW_TYPE.FloatingPoint) {
+        info.precision = type.int16(0);
+    }
+    if (encoding) {
+        const index = encoding.table(1);
+        info.dictionary = {
+            id: encoding.int64(0),
+            bitWidth: index ? index.int32(0) : 32,
+            signed: index ? index.scalar(1, (v, at) => v.getUint8(at) !== 0, false) : true
+        };
+    }
+    return info;
+}
+
+function arrowValid(validity, i) {
+    return !validity || (validity[i >> 3] >> (i & 7)) & 1;
+}
+
+// Values of one column of a record batch: nodes and buffers are consumed from the front
+function arrowValues(field, nodes, buffers, body) {
+    const [length, nullCount] = nodes.shift();
+    const bytes = ([offset, size]) => new Uint8Array(body.buffer, body.byteOffset + offset, size);
+    const typed = (Type, buffer, count = length) => {
+        const view = bytes(buffer);
+        // Copy when the buffer is not aligned for the element type
+        const source = view.byteOffset % Type.BYTES_PER_ELEMENT ? view.slice() : view;
+        return new Type(source.buffer, source.byteOffset, count);
+    };
+    const validityBuffer = buffers.shift();
+    const validity = nullCount && validityBuffer[1] ? bytes(validityBuffer) : null;
+    const kind = field.dictionary ? { type: ARROW_TYPE.Int, ...field.dictionary } : field;
+
+    if (kind.type === ARROW_TYPE.Int) {
+        const Type = {
+            8: kind.signed ? Int8Array : Uint8Array,
+            16: kind.signed ? Int16Array : Uint16Array,
+            32: kind.signed ? Int32Array : Uint32Array,
+            64: kind.signed ? BigInt64Array : BigUint64Array
+        }[kind.bitWidth];
+        const values = typed(Type, buffers.shift());
+        if (field.dictionary) return { values, validity };
+        if (kind.bitWidth === 64 || validity) {
+            return Float64Array.from(values, (value, i) => arrowValid(validity, i) ? Number(value) : NaN);
+        }
+        return values;
+    }
+    if (kind.type === ARROW_TYPE.FloatingPoint) {
+        const values = typed(kind.precision === 1 ? Float32Array : Float64Array, buffers.shift());
+        return validity ? Float64Array.from(values, (value, i) => arrowValid(validity, i) ? value : NaN) : values;
+    }
+    if (kind.type === ARROW_TYPE.Bool) {
+        const bits = bytes(buffers.shift());
+        return Array.from({ length }, (_, i) => arrowValid(validity, i) ? arrowValid(bits, i) === 1 : null);
+    }
+    if (kind.type === ARROW_TYPE.Utf8 || kind.type === ARROW_TYPE.LargeUtf8) {
+        const offsetBuffer = buffers.shift();
+        const data = bytes(buffers.shift());
+        const offsets = kind.type === ARROW_TYPE.Utf8
+            ? typed(Int32Array, offsetBuffer, length + 1)
+            : Array.from(typed(BigInt64Array, offsetBuffer, length + 1), Number);
+        const decoder = new TextDecoder();
+        return Array.from({ length }, (_, i) =>
+            arrowValid(validity, i) ? decoder.decode(data.subarray(offsets[i], offsets[i + 1])) : null);
+    }
+    throw new Error(`Arrow type ${field.type} of column ${field.name} is not supported`);
+}
+
+// { length, columns } of an Arrow IPC stream
+function decodeArrowStream(buffer) {
+    const view = new DataView(buffer);
+    const dictionaries = new Map();
+    const chunks = [];
+    let fields = [];
+    let position = 0;
+    while (position + 4 <= view.byteLength) {
+        let size = view.getInt32(position, true);
+        position += 4;
+        if (size === -1) {  // continuation marker of the current format
+            size = view.getInt32(position, true);
+            position += 4;
+        }
+        if (size === 0) break;  // end of stream
+        const message = FlatTable.root(view, position);
+        position += size;
+        const bodyLength = message.int64(3);
+        const body = new Uint8Array(buffer, position, bodyLength);
+        position += bodyLength;
+        const header = message.table(2);
+        const headerType = message.scalar(1, (v, at) => v.getUint8(at));
+
+        if (headerType === ARROW_HEADER.Schema) {
+            fields = header.tables(1).map(arrowField);
+        } else if (headerType === ARROW_HEADER.DictionaryBatch) {
+            const id = header.int64(0);
+            const batch = header.table(1);
+            const field = fields.find(f => f.dictionary && f.dictionary.id === id);
+            const values = arrowValues({ name: field.name, type: field.type }, batch.pairs(1), batch.pairs(2), body);
+            const isDelta = header.scalar(2, (v, at) => v.getUint8(at) !== 0, false);
+            dictionaries.set(id, isDelta ? dictionaries.get(id).concat(values) : values);
+        } else if (headerType === ARROW_HEADER.RecordBatch) {
+            if (header.table(3)) throw new Error("Compressed Arrow batches are not supported");
+            const nodes = header.pairs(1);
+            const buffers = header.pairs(2);
+            chunks.push(fields.map(field => {
+                const values = arrowValues(field, nodes, buffers, body);
+                if (!field.dictionary) return values;
+                const labels = dictionaries.get(field.dictionary.id);
+                return Array.from(values.values, (index, i) =>
+                    arrowValid(values.validity, i) ? labels[Number(index)] : null);
+            }));
+        }
+    }
+
+    const columns = {};
+    fields.forEach((field, k) => {
+        const parts = chunks.map(chunk => chunk[k]);
+        if (parts.length === 1) {
+            columns[field.name] = parts[0];
+        } else if (parts.length && ArrayBuffer.isView(parts[0])) {
+            const joined = new parts[0].constructor(parts.reduce((n, part) => n + part.length, 0));
+            parts.reduce((at, part) => (joined.set(part, at), at + part.length), 0);
+            columns[field.name] = joined;
+        } else {
+            columns[field.name] = [].concat(...parts);
+        }
+    });
+    const length = fields.length && columns[fields[0].name] ? columns[fields[0].name].length : 0;
+    return { length, columns };
+}
+
+async function fetchColumns(url) {
+    const columnarUrl = url + (url.includes("?") ? "&" : "?") + "shape=columnar";
+    const response = await fetch(columnarUrl, {
+        headers: { Accept: `${ARROW_STREAM}, application/json;q=0.9` }
+    });
+    if (!response.ok) {
+        throw new Error(`${url}: ${response.status}`);
+    }
+
+    if ((response.headers.get("Content-Type") || "").startsWith(ARROW_STREAM)) {
+        return decodeArrowStream(await response.arrayBuffer());
+    }
+
+    const json = await response.json();
+    const columns = {};
+    json.columns.forEach((name, i) => {
+        columns[name] = json.data[i];
+    });
+    return { length: json.data.length ? json.data[0].length : 0, columns };
+}
@@ -3,6 +3,17 @@ const rootStyles = getComputedStyle(document.documentElement);
 const barColor = rootStyles.getPropertyValue("--dark-green").trim(); 
 const barHoverColor = rootStyles.getPropertyValue("--light-green").trim();
 
+// Year of the one-year charts, e.g. /bar?year=2005
+const year = new URLSearchParams(window.location.search).get("year") || 1996;
+
+// Country field of /emissions/continent-summary: {"CountryName": value}, or
+// null when the continent has fewer than five countries that year
+function countryEntry(field) {
+  if (!field) return null;
+  const [name, value] = Object.entries(field)[0];
+  return { name: name, value: +value };
+}
+
   const colorScales = {
     Oceania: d3.scaleLinear().domain([1, 5]).range(["#c6e5f5", "#08306b"]),
     Africa: d3.scaleLinear().domain([1, 5]).range(["#fdd0a2", "#e6550d"]),
@@ -40,8 +51,8 @@ const barHoverColor = rootStyles.getPropertyValue("--light-green").trim();
     .style("position", "absolute")
     .style("pointer-events", "none");
 
-  // Load the CSV data
-  d3.csv("/static/data/sorted_emissions_one_year.csv").then(
+  // Load the data
+  d3.json(`/emissions/one-year?year=${year}`).then(
     (data) => {
       // Parse the data to convert numeric fields
       data = data.slice(0, 20);
@@ -147,39 +158,21 @@ const barHoverColor = rootStyles.getPropertyValue("--light-green").trim();
     .append("g")
     .attr("transform", "translate(" + margin.left + "," + margin.top + ")");
 
-  // Load the CSV data
-  d3.csv("/static/data/continent_summary_1996.csv").then(
+  // Load the data
+  d3.json(`/emissions/continent-summary?year=${year}`).then(
     (data) => {
-      // Parse the CSV data to the required structure
+      // Parse the data to the required structure
       const parsedData = data.map((d) => {
         return {
           continent: d.Continent,
           countries: [
-            {
-              name: d.country_1.split(":")[0].replace(/[{}']/g, "").trim(),
-              value: +d.country_1.split(":")[1].replace(/[{}']/g, "").trim(),
-            },
-            {
-              name: d.country_2.split(":")[0].replace(/[{}']/g, "").trim(),
-              value: +d.country_2.split(":")[1].replace(/[{}']/g, "").trim(),
-            },
-            {
-              name: d.country_3.split(":")[0].replace(/[{}']/g, "").trim(),
-              value: +d.country_3.split(":")[1].replace(/[{}']/g, "").trim(),
-            },
-            {
-              name: d.country_4.split(":")[0].replace(/[{}']/g, "").trim(),
-              value: +d.country_4.split(":")[1].replace(/[{}']/g, "").trim(),
-            },
-            {
-              name: d.country_5.split(":")[0].replace(/[{}']/g, "").trim(),
-              value: +d.country_5.split(":")[1].replace(/[{}']/g, "").trim(),
-            },
-            {
-              name: d.other.split(",")[0].replace(/[{}']/g, "").trim(),
-              value: +d.other.split(",")[1].replace(/[{}']/g, "").trim(),
-            },
-          ].sort((a, b) => b.value - a.value),
+            countryEntry(d.country_1),
+            countryEntry(d.country_2),
+            countryEntry(d.country_3),
+            countryEntry(d.country_4),
+            countryEntry(d.country_5),
+            countryEntry(d.other),
+          ].filter(Boolean).sort((a, b) => b.value - a.value),
         };
       });
 
@@ -254,7 +247,7 @@ const barHoverColor = rootStyles.getPropertyValue("--light-green").trim();
     }
   );
 
-  d3.csv("/static/data/continent_summary_1996.csv").then(function (
+  d3.json(`/emissions/continent-summary?year=${year}`).then(function (
     data
   ) {
     // Process data for each country field
@@ -269,8 +262,8 @@ const barHoverColor = rootStyles.getPropertyValue("--light-green").trim();
     const processedData = data.map((d) => {
       const continentData = { continent: d.Continent };
       countries.forEach((country) => {
-        // Extract the value for each country, assuming the format {'CountryName': value}
-        continentData[country] = parseFloat(d[country].match(/\d+\.\d+/)[0]);
+        const entry = countryEntry(d[country]);
+        if (entry) continentData[country] = entry.value;
       });
       return continentData;
     });
@@ -318,7 +311,7 @@ const barHoverColor = rootStyles.getPropertyValue("--light-green").trim();
       // Draw the bars
       chart
         .selectAll(".bar")
-        .data(processedData)
+        .data(processedData.filter((d) => d[dataKey] !== undefined))
         .enter()
         .append("rect")
         .attr("class", "bar")
@@ -355,17 +348,17 @@ const barHoverColor = rootStyles.getPropertyValue("--light-green").trim();
 
       // Calculate the total for each continent
       data.forEach((d) => {
-        d.total = countries.reduce((sum, country) => sum + d[country], 0);
+        d.total = countries.reduce((sum, country) => sum + (d[country] || 0), 0);
       });
 
       // Normalize data for stacked chart
       const normalizedData = processedData.map((d) => {
-        const total = countries.reduce((sum, country) => sum + d[country], 0);
+        const total = countries.reduce((sum, country) => sum + (d[country] || 0), 0);
         let x0 = 0;
         return {
           continent: d.continent,
           categories: countries.map((country, index) => {
-            const value = (d[country] / total) * 100; // Convert to percentage
+            const value = ((d[country] || 0) / total) * 100; // Convert to percentage
             const obj = {
               country,
               x0,
@@ -452,7 +445,7 @@ const barHoverColor = rootStyles.getPropertyValue("--light-green").trim();
     .append("g")
     .attr("transform", `translate(${margin2.left},${margin2.top})`);
 
-  d3.csv("/static/data/average_emissions_2001_2010.csv").then(
+  d3.json("/emissions/average?start=2001&end=2010").then(
     (averageData) => {
       averageData = averageData.slice(0, 20);
       averageData.forEach((d) => {
@@ -1,7 +1,9 @@
-d3.csv("/static/data/box_life_expectancy_by_region.csv").then(data => {
-    data.forEach(d => {
-        d.AverageLifeExpectancy = +d.AverageLifeExpectancy;
-    });
+d3.json("/life/aggregate?by=region&metric=le&age=birth&sex=both&stats=mean").then(rows => {
+    // Rows without a region (aggregates) are not plotted
+    const data = rows.filter(d => d.region !== null).map(d => ({
+        Region: d.region,
+        AverageLifeExpectancy: d.mean
+    }));
 
     const regionColors = {
         "Africa": "#143642",
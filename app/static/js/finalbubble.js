@@ -22,105 +22,44 @@ const path = d3.geoPath().projection(projection);
 // Add after projection creation
 console.log("Testing projection:", projection([0, 0])); // Should return valid x,y coordinates
 
-// Load World Map, Life Expectancy Data, and Country Coordinates
+// Load World Map, joined Life Expectancy/Population Data, and Country Coordinates
 Promise.all([
-    d3.csv("../static/data/population.csv", d => ({
-        Location: d["Country Name"].trim(),
-        Population: parseFloat(d["2021"]) || 0  // Parse as float and default to 0 if invalid
-    })),
-    d3.json("https://d3js.org/world-110m.v1.json"),  // World Map
-    d3.csv("../static/data/le.csv", d => ({
-        Location: d.Location.trim(), // Read country name
-        Indicator: d.Indicator.trim(),
-        Period: +d.Period,
-        LifeExpectancy: +d.FactValueNumeric,
-        Dim1: d.Dim1.trim()
-        // Use FactValueNumeric for life expectancy
-    })),
-    d3.json("https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json") // Country coordinates
-    ]).then(([populationData, world, lifeData, countryCoords]) => {
+    // 2021 life expectancy at birth (both sexes) with each country's population
+    fetchColumns("/life/joined?years=2021&sex=both&age=birth"),
+    loadGeometry("countries"),  // World Map
+    loadCentroids("countries") // Centroid of every country, keyed by its ISO3 code (the feature id)
+    ]).then(([joinedData, world, countryLookup]) => {
     console.log("✅ Loaded Data Successfully");
 
     // Draw the complete world map
     mapGroup.append("path")
-        .datum(topojson.feature(world, world.objects.countries))
+        .datum(world)
         .attr("d", path)
         .attr("fill", "#e0c37a") 
         .attr("stroke", "#999");
 
     console.log("✅ World map drawn successfully");
 
-    // Normalize country names and store centroids
-    const countryLookup = {};
-    countryCoords.features.forEach(d => {
-        const countryName = d.properties.name.toLowerCase().trim();
-        // Use d3.geoCentroid to get the proper coordinates
-        const centroid = d3.geoCentroid(d);
-        countryLookup[countryName] = centroid;
-    });
-
     console.log("✅ Loaded Country Coordinates:", countryLookup);
-    const countryNameCorrections = {
-        "eswatini": "swaziland",
-        "guinea-bissau": "guinea bissau",
-        "kiribati": "kiribati",
-        "congo": "republic of the congo",
-        "cote d'ivoire": "ivory coast",
-        "bolivia (plurinational state of)": "bolivia",
-        "micronesia (federated states of)": "micronesia",
-        "comoros": "comoros",
-        "timor-leste": "east timor",
-        "lao people's democratic republic": "laos",
-        "republic of moldova": "moldova",
-        "russian federation": "russia",
-        "samoa": "samoa",
-        "bahamas": "bahamas",
-        "saint lucia": "saint lucia",
-        "venezuela (bolivarian republic of)": "venezuela",
-        "sao tome and principe": "sao tome and principe",
-        "syrian arab republic": "syria",
-        "democratic people's republic of korea": "north korea",
-        "saint vincent and the grenadines": "saint vincent and the grenadines",
-        "tonga": "tonga",
-        "grenada": "grenada",
-        "serbia": "serbia",
-        "north macedonia": "macedonia",
-        "cabo verde": "cape verde",
-        "mauritius": "mauritius",
-        "occupied palestinian territory, including east jerusalem": "palestine",
-        "viet nam": "vietnam",
-        "seychelles": "seychelles",
-        "bahrain": "bahrain",
-        "iran (islamic republic of)": "iran",
-        "türkiye": "turkey",
-        "maldives": "maldives",
-        "barbados": "barbados",
-        "antigua and barbuda": "antigua and barbuda",
-        "brunei darussalam": "brunei",
-        "czechia": "czech republic",
-        "united kingdom of great britain and northern ireland": "united kingdom",
-        "netherlands (kingdom of the)": "netherlands",
-        "republic of korea": "south korea",
-        "singapore": "singapore"
-    };
-    
-    
 
-    // Filter life expectancy data for 2021 and only keep relevant indicators
-    const filteredData = lifeData.filter(d => 
-        d.Period === 2021 && d.Indicator === "Life expectancy at birth (years)" && d.Dim1 === "Both sexes"
-    );
+    // Life expectancy and population of each country, already filtered by the server
+    const { Code, Location, LifeExpectancy, Population } = joinedData.columns;
+    const filteredData = Array.from({ length: joinedData.length }, (_, i) => ({
+        Code: Code[i],
+        Location: Location[i].trim(),
+        LifeExpectancy: LifeExpectancy[i]
+    }));
+    const populationData = Array.from({ length: joinedData.length }, (_, i) => ({
+        Code: Code[i],
+        Population: Population[i] || 0
+    }));
 
     console.log("✅ Filtered Data (Life Expectancy at Birth - 2021):", filteredData);
 
 
     let populationLookup = {};
     populationData.forEach(d => {
-        let country = d.Location.toLowerCase().trim();
-        if (countryNameCorrections[country]) {
-            country = countryNameCorrections[country]; // Apply name corrections
-        }
-        populationLookup[country] = d.Population; // Use the parsed Population value
+        populationLookup[d.Code] = d.Population;
     });
     console.log("✅ Population Lookup:", populationLookup);
     const populationExtent = d3.extent(Object.values(populationLookup));
@@ -139,21 +78,17 @@ Promise.all([
     const colorScale = d3.scaleSequential(d3.interpolateYlGnBu)
         .domain(lifeExpExtent);
 
-    // Match countries with coordinates
+    // Match countries with coordinates on their ISO3 code
     const countryStats = new Map();
     let missingCountries = [];
 
     filteredData.forEach(d => {
-        let country = d.Location.toLowerCase().trim();
-        if (countryNameCorrections[country]) {
-            country = countryNameCorrections[country];
-        }
-        if (countryLookup[country]) {
+        if (countryLookup[d.Code]) {
             // Store the raw coordinates first
-            countryStats.set(country, {
+            countryStats.set(d.Location, {
                 lifeExpectancy: d.LifeExpectancy,
-                coordinates: countryLookup[country], // Store raw coordinates
-                population: populationLookup[country] || 0
+                coordinates: countryLookup[d.Code], // Store raw coordinates
+                population: populationLookup[d.Code] || 0
             });
         } else {
             missingCountries.push(d.Location);
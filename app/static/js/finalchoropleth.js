@@ -15,7 +15,7 @@ const colorScale = d3.scaleSequential(d3.interpolatePurples)
 
 // Load data
 Promise.all([
-    d3.json("https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/world.geojson"),
+    loadGeometry("world"),
     d3.csv("/static/data/Updated_Country_Names_in_Data.csv") // Ensure this file is hosted properly
 ]).then(([geoData, csvData]) => {
     let dataByYear = {};
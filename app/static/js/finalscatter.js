@@ -1,10 +1,11 @@
-fetch('/static/data/finalscatter_lowest_life_expectancy_male_filtered.csv')
-.then(response => response.text())
-.then(csvText => {
-    const data = d3.csvParse(csvText, d => ({
+// The 5 countries with the lowest male life expectancy at birth per year
+fetch('/rankings/life?measure=le&order=bottom&k=5&by=year&sex=male&age=birth&start=2000&end=2021')
+.then(response => response.json())
+.then(rows => {
+    const data = rows.map(d => ({
         Location: d.Location,
-        Period: +d.Period,
-        FactValueNumeric: +d.FactValueNumeric
+        Period: d.year,
+        FactValueNumeric: d.le
     }));
     
     const years = [...new Set(data.map(d => d.Period))].sort();
@@ -10,59 +10,26 @@ const svg = d3.select("#slope-chart")
 
 let data;
 
-// Modify the data loading section to use both CSVs
-Promise.all([
-    d3.csv("../static/data/le.csv"),
-    d3.csv("../static/data/hle.csv")
-]).then(([leData, hleData]) => {
-    // Filter LE data for years 2015-2021 and Both sexes
-    const filteredLE = leData.filter(d => 
-        d.Indicator === "Life expectancy at birth (years)" && 
-        d.Dim1 === "Both sexes" && 
-        d.Period >= 2015 && 
-        d.Period <= 2021
-    ).map(d => ({
-        Location: d.Location,
-        Period: +d.Period,
-        LifeExpectancy: +d.FactValueNumeric
-    }));
-
-    // Filter HLE data for years 2015-2021 and Both sexes
-    const filteredHLE = hleData.filter(d => 
-        d.Indicator === "Healthy life expectancy (HALE) at birth (years)" && 
-        d.Dim1 === "Both sexes" && 
-        d.Period >= 2015 && 
-        d.Period <= 2021
-    ).map(d => ({
-        Location: d.Location,
-        Period: +d.Period,
-        HealthyLifeExpectancy: +d.FactValueNumeric
-    }));
-
+// Load LE and HLE at birth (both sexes), joined per country and year by the server
+d3.json("/life/joined?years=2015,2016,2017,2018,2019,2020,2021&sex=both&age=birth").then(joined => {
     // Get all years to ensure proper matching
-    const allYears = [...new Set([...filteredLE.map(d => d.Period), ...filteredHLE.map(d => d.Period)])].sort();
+    const allYears = [...new Set(joined.map(d => d.Period))].sort();
 
-    // Merge LE and HLE data, ensuring all years are included
-    data = filteredLE.map(le => {
-        const hle = filteredHLE.find(h => h.Location === le.Location && h.Period === le.Period);
+    // One entry per country and year, with null where a year is missing
+    const byKey = new Map(joined.map(d => [`${d.Location}|${d.Period}`, d]));
+    const locations = [...new Set(joined.map(d => d.Location))];
+    data = locations.flatMap(location => allYears.map(year => {
+        const entry = byKey.get(`${location}|${year}`);
         return {
-            ...le,
-            HealthyLifeExpectancy: hle ? hle.HealthyLifeExpectancy : null
-        };
-    });
-
-    data = data.flatMap(entry => {
-        return allYears.map(year => ({
-            Location: entry.Location,
+            Location: location,
             Period: year,
-            LifeExpectancy: data.find(d => d.Location === entry.Location && d.Period === year)?.LifeExpectancy || null,
-            HealthyLifeExpectancy: data.find(d => d.Location === entry.Location && d.Period === year)?.HealthyLifeExpectancy || null
-        }));
-    });
+            LifeExpectancy: entry?.LifeExpectancy || null,
+            HealthyLifeExpectancy: entry?.HealthyLifeExpectancy || null
+        };
+    }));
 
     // Debugging logs
-    console.log("Filtered LE Data:", filteredLE);
-    console.log("Filtered HLE Data:", filteredHLE);
+    console.log("Joined Data:", joined);
     console.log("Merged Data:", data);
 
     // Check specific countries for debugging
@@ -1,4 +1,4 @@
-d3.csv("/static/data/bar-hle_avg_filtered.csv").then(function(data) {
+d3.json("/life/aggregate?by=region,year&metric=hle&age=60&start=2000&end=2021&stats=mean").then(function(rows) {
   const margin = { top: 50, right: 70, bottom: 100, left: 100 },
       width = 900 - margin.left - margin.right,
       height = 600 - margin.top - margin.bottom;
@@ -7,10 +7,11 @@ d3.csv("/static/data/bar-hle_avg_filtered.csv").then(function(data) {
       .append("g")
       .attr("transform", `translate(${margin.left},${margin.top})`);
 
-  data.forEach(d => {
-      d.Period = +d.Period;
-      d.FactValueNumeric = +d.FactValueNumeric;
-  });
+  const data = rows.filter(d => d.region !== null).map(d => ({
+      ParentLocation: d.region,
+      Period: d.year,
+      FactValueNumeric: d.mean
+  }));
 
   const years = Array.from(new Set(data.map(d => d.Period))).sort();
   const dropdown = d3.select("#year");
@@ -0,0 +1,74 @@
+// Load country outlines and centroids from the geometry service.
+//
+// `zoom` is the scale the map is drawn at relative to a whole-world view; the
+// server answers the TopoJSON tier simplified for it, decoded here (no
+// topojson-client needed). Geometry is only ever loaded from this server: when
+// it is missing (run `python -m app.geometry fetch`) the promise rejects with
+// the server's message instead of reaching out to a remote copy.
+
+// Reject with the detail of a failed geometry response
+async function geometryError(response) {
+    let detail = response.statusText;
+    try {
+        detail = (await response.json()).detail || detail;
+    } catch (e) {
+        // not a JSON error body
+    }
+    const error = new Error(`${response.url}: ${response.status} ${detail}`);
+    console.error(error.message);
+    throw error;
+}
+
+// GeoJSON FeatureCollection of a quantized, delta-encoded TopoJSON object of
+// Polygon and MultiPolygon geometries (as written by /geometry/{name})
+function topologyFeatures(topology, object) {
+    const [kx, ky] = topology.transform.scale;
+    const [dx, dy] = topology.transform.translate;
+    const arcs = topology.arcs.map(arc => {
+        let x = 0, y = 0;
+        return arc.map(([ax, ay]) => [(x += ax) * kx + dx, (y += ay) * ky + dy]);
+    });
+    // An arc ~i is arc i reversed; consecutive arcs share their end point
+    const ring = refs => {
+        const points = [];
+        refs.forEach((ref, i) => {
+            const arc = ref >= 0 ? arcs[ref] : arcs[~ref].slice().reverse();
+            points.push(...(i ? arc.slice(1) : arc));
+        });
+        return points;
+    };
+    const polygon = rings => rings.map(ring);
+    return {
+        type: "FeatureCollection",
+        features: object.geometries.map(({type, arcs: refs, ...feature}) => ({
+            type: "Feature",
+            ...feature,
+            geometry: type === "Polygon" ? {type, coordinates: polygon(refs)}
+                : type === "MultiPolygon" ? {type, coordinates: refs.map(polygon)}
+                : null
+        }))
+    };
+}
+
+// GeoJSON FeatureCollection of a geometry
+async function loadGeometry(name, zoom = 1) {
+    const response = await fetch(`/geometry/${name}?zoom=${zoom}`);
+    if (!response.ok) {
+        await geometryError(response);
+    }
+    const topology = await response.json();
+    return topologyFeatures(topology, topology.objects[name]);
+}
+
+// [lon, lat] of every feature of a geometry, keyed by feature id
+async function loadCentroids(name) {
+    const centroids = {};
+    const response = await fetch(`/geometry/${name}/centroids`);
+    if (!response.ok) {
+        await geometryError(response);
+    }
+    (await response.json()).forEach(d => {
+        centroids[d.id] = [d.lon, d.lat];
+    });
+    return centroids;
+}
@@ -20,73 +20,41 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
     d3.select("#chart-beeswarm").selectAll("*").remove();
 
     // Call chart generation with selected year
-    generateBeeswarmChart(
-      '/static/data/le.csv',
-      '/static/data/population.csv',
-      $scope.formData.year
-    );
+    generateBeeswarmChart($scope.formData.year);
   };
-  function generateBeeswarmChart(lifeExpCsvPath, populationCsvPath, year) {
-    // Load both CSV files concurrently.
+  function generateBeeswarmChart(year) {
+    // Male and female LE at birth with the population of the year, joined per country by
+    // /life/joined, as typed columns (Arrow IPC when the server supports it).
+    const joinedUrl = sex => `/life/joined?years=${year}&sex=${sex}&age=birth`;
     Promise.all([
-      d3.csv(lifeExpCsvPath),
-      d3.csv(populationCsvPath)
-    ]).then(function (files) {
-      let lifeExpData = files[0];
-      let popData = files[1];
-
+      fetchColumns(joinedUrl('male')),
+      fetchColumns(joinedUrl('female'))
+    ]).then(function ([male, female]) {
       // ===================================================
-      // 1. Process Life Expectancy Data (Filtering by Indicator)
+      // 1. One record per country with its male and female life expectancy
       // ===================================================
-      // Keep only rows for the selected year and with the desired Indicator.
-      lifeExpData = lifeExpData.filter(d =>
-        +d["Period"] === year &&
-        d.Indicator.trim() === "Life expectancy at birth (years)"
-      );
-      console.log(lifeExpData);
       let pivotData = {};
-      lifeExpData.forEach(d => {
-        const location = d.Location;
-        if (!pivotData[location]) {
-          pivotData[location] = {
-            Location: location,
-            ParentLocation: d.ParentLocation,
-            male: null,
-            female: null
-          };
-        }
-        const sex = d["Dim1"].trim().toLowerCase();
-        if (sex === "male") {
-          pivotData[location].male = +d.FactValueNumeric;
-        } else if (sex === "female") {
-          pivotData[location].female = +d.FactValueNumeric;
-        }
-      });
-
-      // Convert pivot data to an array and filter out any countries missing a male or female value.
-      let finalData = Object.values(pivotData).filter(d => d.male !== null && d.female !== null);
-
-      // ===================================================
-      // 2. Process Population Data and Merge
-      // ===================================================
-      // The population CSV is in a wide format with year columns.
-      let popLookup = {};
-      popData.forEach(d => {
-        // Use the selected year (as a string) to retrieve the population.
-        const popVal = +d[String(year)];
-        if (!isNaN(popVal)) {
-          // We assume the life expectancy "Location" matches the population CSV's "Country Name"
-          popLookup[d["Country Name"]] = popVal;
+      for (let i = 0; i < male.length; i++) {
+        const columns = male.columns;
+        pivotData[columns.Location[i]] = {
+          Location: columns.Location[i],
+          Code: columns.Code[i],
+          ParentLocation: columns.ParentLocation[i],
+          male: isNaN(columns.LifeExpectancy[i]) ? null : columns.LifeExpectancy[i],
+          female: null,
+          population: isNaN(columns.Population[i]) ? 0 : columns.Population[i]
+        };
+      }
+      for (let i = 0; i < female.length; i++) {
+        const d = pivotData[female.columns.Location[i]];
+        if (d && !isNaN(female.columns.LifeExpectancy[i])) {
+          d.female = female.columns.LifeExpectancy[i];
         }
-      });
-
-      // Merge population data into the life expectancy records.
-      finalData.forEach(d => {
-        d.population = popLookup[d.Location] || 0;
-      });
+      }
 
-      // Optionally filter out countries with no population data.
-      finalData = finalData.filter(d => d.population > 0);
+      // Keep countries with both values and a known population.
+      let finalData = Object.values(pivotData)
+        .filter(d => d.male !== null && d.female !== null && d.population > 0);
 
       // ===================================================
       // 3. Create the Beeswarm Chart
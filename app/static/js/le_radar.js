@@ -278,25 +278,21 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
             return;
         }
 
-        const promises = $scope.selectedCountries.map(country =>
-            $http.get('/life', {
-                params: {
-                    years: $scope.formData.year,
-                    metric: 'both',
-                    sex: $scope.formData.sex,
-                    age: 'both',
-                    country: country
-                }
-            })
-        );
+        // One /life query per country, answered together
+        const queries = {};
+        $scope.selectedCountries.forEach(country => {
+            queries[country] = {
+                years: $scope.formData.year,
+                metric: 'both',
+                sex: $scope.formData.sex,
+                age: 'both',
+                country: country
+            };
+        });
 
-        Promise.all(promises)
-            .then(responses => {
-                const data = {};
-                responses.forEach((response, index) => {
-                    data[$scope.selectedCountries[index]] = response.data;
-                });
-                createRadarChart(data);
+        $http.post('/life/batch', { queries: queries })
+            .then(response => {
+                createRadarChart(response.data);
             })
             .catch(error => {
                 console.error('Error:', error);
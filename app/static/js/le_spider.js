@@ -364,25 +364,21 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
       return;
     }
 
-    const promises = $scope.formData.selectedCountries.map(country =>
-      $http.get('/life', {
-        params: {
-          years: $scope.formData.year,
-          metric: 'both',
-          sex: $scope.formData.sex,
-          age: 'both',
-          country: country
-        }
-      })
-    );
+    // One /life query per country, answered together
+    const queries = {};
+    $scope.formData.selectedCountries.forEach(country => {
+      queries[country] = {
+        years: $scope.formData.year,
+        metric: 'both',
+        sex: $scope.formData.sex,
+        age: 'both',
+        country: country
+      };
+    });
 
-    Promise.all(promises)
-      .then(responses => {
-        const data = {};
-        responses.forEach((response, index) => {
-          data[$scope.formData.selectedCountries[index]] = response.data;
-        });
-        createSpiderChart(data, $scope.formData.selectedCountries, $scope.formData.sex, $scope.formData.year);
+    $http.post('/life/batch', { queries: queries })
+      .then(response => {
+        createSpiderChart(response.data, $scope.formData.selectedCountries, $scope.formData.sex, $scope.formData.year);
       })
       .catch(error => {
         console.error('Error:', error);
@@ -117,8 +117,8 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
 
         const yScale = d3.scaleLinear()
             .domain([
-                d3.min(chartData, d => Math.min(...d.min)),
-                d3.max(chartData, d => Math.max(...d.max))
+                d3.min(chartData, d => d3.min(d.min)),
+                d3.max(chartData, d => d3.max(d.max))
             ])
             .nice()
             .range([height, 0]);
@@ -141,6 +141,7 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
                 .attr("stroke", colors(i))
                 .attr("stroke-width", 1.5)
                 .attr("d", d3.line()
+                    .defined(d => d.value !== null)
                     .x(d => xScale(d.month))
                     .y(d => yScale(d.value))
                 );
@@ -151,6 +152,7 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
                 .attr("stroke", colors(i))
                 .attr("stroke-width", 1.5)
                 .attr("d", d3.line()
+                    .defined(d => d.value !== null)
                     .x(d => xScale(d.month))
                     .y(d => yScale(d.value))
                 );
@@ -159,7 +161,8 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
         // Plot avg scatter points
         chartData.forEach((d, i) => {
             svg.selectAll(`.avg-points-${i}`)
-                .data(d.avg.map((value, index) => ({ month: months[index], value })))
+                .data(d.avg.map((value, index) => ({ month: months[index], value }))
+                    .filter(d => d.value !== null))
                 .enter()
                 .append("circle")
                 .attr("cx", d => xScale(d.month))
@@ -203,56 +206,20 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
             return;
         }
 
-        Promise.all([
-            fetch('/static/data/climdiv-tminst-v1.0.0-20241205').then(res => res.text()),
-            fetch('/static/data/climdiv-tmaxst-v1.0.0-20241205').then(res => res.text()),
-            fetch('/static/data/climdiv-tmpcst-v1.0.0-20241205').then(res => res.text())
-        ]).then(([tminText, tmaxText, avgText]) => {
-            const parseData = (text) => text.trim().split('\n').map(row => {
-                const fields = row.trim().split(/\s+/);
-                return {
-                    Year: fields[0].substring(6, 10),
-                    StateCode: fields[0].substring(0, 3),
-                    Jan: parseFloat(fields[1]) || null,
-                    Feb: parseFloat(fields[2]) || null,
-                    Mar: parseFloat(fields[3]) || null,
-                    Apr: parseFloat(fields[4]) || null,
-                    May: parseFloat(fields[5]) || null,
-                    Jun: parseFloat(fields[6]) || null,
-                    Jul: parseFloat(fields[7]) || null,
-                    Aug: parseFloat(fields[8]) || null,
-                    Sep: parseFloat(fields[9]) || null,
-                    Oct: parseFloat(fields[10]) || null,
-                    Nov: parseFloat(fields[11]) || null,
-                    Dec: parseFloat(fields[12]) || null
-                };
-            });
-
-            const tminData = parseData(tminText);
-            const tmaxData = parseData(tmaxText);
-            const avgData = parseData(avgText);
-            console.log('Parsed data:', tminData);
-
-            const combinedData = $scope.formData.years.map(year => {
-                const yearStr = year.toString();
-                const stateCode = $scope.formData.state.code;
-                console.log('Processing data for year', year, 'state', stateCode);
-                const tminRow = tminData.find(d => d.Year === yearStr && d.StateCode === stateCode);
-                const tmaxRow = tmaxData.find(d => d.Year === yearStr && d.StateCode === stateCode);
-                const avgRow = avgData.find(d => d.Year === yearStr && d.StateCode === stateCode);
-
-                if (!tminRow || !tmaxRow || !avgRow) {
-                    console.error(`Missing data for year ${year}, state ${stateCode}`);
-                    return null;
-                }
-
-                return {
-                    year: year,
-                    min: months.map(month => tminRow[month]),
-                    max: months.map(month => tmaxRow[month]),
-                    avg: months.map(month => avgRow[month])
-                };
-            }).filter(d => d !== null);
+        // Only the selected state and years are sent by the server
+        $http.get('/temperature/series', {
+            params: {
+                state_code: $scope.formData.state.code,
+                years: $scope.formData.years.join(',')
+            }
+        }).then(function (response) {
+            const series = response.data;
+            const combinedData = series.years.map((year, i) => ({
+                year: year,
+                min: series.min[i],
+                max: series.max[i],
+                avg: series.mean[i]
+            }));
             console.log('Combined data:', combinedData);
             createLineAndScatterChart(combinedData);
         }).catch(error => {
@@ -7,7 +7,7 @@
             .append("g")
             .attr("transform", `translate(${margin.left},${margin.top})`);
 
-        d3.csv('/static/data/average_emissions_2001_2010.csv').then(averageData => {
+        d3.json('/emissions/average?start=2001&end=2010').then(averageData => {
             averageData = averageData.slice(0, 20);
             averageData.forEach(d => {
 
@@ -45,11 +45,12 @@ document.addEventListener("DOMContentLoaded", function () {
     .style("opacity", 0);
 
   // Loading GeoJSON for world countries
-  d3.json(
-    "https://raw.githubusercontent.com/holtzy/D3-graph-gallery/master/DATA/world.geojson"
-  ).then(function (geoData) {
-    // Loading the CSV data
-    d3.csv("/static/data/Alluvial_1996.csv").then(function (data) {
+  loadGeometry("world").then(function (geoData) {
+    // Loading the 1996 rows, with only the columns the map uses
+    const columns = ["Entity", "Code", "Year", "Annual CO₂ emissions"].join(",");
+    d3.csv(
+      `/export/alluvial?start=1996&end=1996&columns=${encodeURIComponent(columns)}`
+    ).then(function (data) {
       const emissionsByCountry = {};
       let minEmission = Infinity;
       let maxEmission = -Infinity;
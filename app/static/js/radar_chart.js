@@ -234,7 +234,8 @@ app.controller('FormController', ['$scope', '$http', '$mdToast', function ($scop
         $http.get('/temperature', {
             params: {
                 state_code: $scope.formData.state.code,
-                years: $scope.formData.years.join(',')
+                years: $scope.formData.years.join(','),
+                shape: 'rows'
             }
         }).then(function(response) {
             console.log('API response:', response.data);
@@ -2,6 +2,9 @@
 // 1) Define color scales
 //    -- Note: Updated domain to [1,6] if you have 6 categories (5 countries + 'other')
 // ============================
+// Year of the summary, e.g. /stacked?year=2005
+const summaryYear = new URLSearchParams(window.location.search).get("year") || 1996;
+
 const colorScales = {
   Oceania: d3.scaleLinear().domain([1, 6]).range(["#c6e5f5", "#08306b"]),
   Africa: d3.scaleLinear().domain([1, 6]).range(["#fdd0a2", "#e6550d"]),
@@ -43,14 +46,16 @@ svgStackedMain
   .attr("y", -20) // slightly above the top margin
   .attr("text-anchor", "middle")
   .style("font-size", "18px")
-  .text("Annual CO₂ Emissions (per capita) by Continent – 1996");
+  .text(`Annual CO₂ Emissions (per capita) by Continent – ${summaryYear}`);
 
-// Function to parse a country field value from the CSV (format: "{'CountryName': value}")
+// Function to parse a country field of /emissions/continent-summary (format: {"CountryName": value});
+// null when the continent has fewer than five countries that year
 function parseCountryField(field) {
-  const parts = field.replace(/[{}']/g, "").split(":");
+  if (!field) return null;
+  const [name, value] = Object.entries(field)[0];
   return {
-    name: parts[0].trim(),
-    value: +parts[1].trim(),
+    name: name,
+    value: +value,
   };
 }
 
@@ -185,7 +190,7 @@ function drawIndividualCharts(processedData) {
   // Determine a common domain for x-scale based on max value in processedData
   const maxVal = d3.max(processedData, d =>
     d3.max(["country_1", "country_2", "country_3", "country_4", "country_5", "other"], 
-           key => d[key].value)
+           key => d[key] ? d[key].value : 0)
   );
 
   const xScale = d3
@@ -221,7 +226,7 @@ function drawIndividualCharts(processedData) {
     // Draw bars
     chart
       .selectAll(".bar")
-      .data(processedData)
+      .data(processedData.filter(d => d[dataKey]))
       .enter()
       .append("rect")
       .attr("class", "bar")
@@ -276,7 +281,7 @@ function drawStackedChart(processedData) {
 
   // Calculate the total for each continent
   processedData.forEach(d => {
-    d.total = countries.reduce((sum, c) => sum + d[c].value, 0);
+    d.total = countries.reduce((sum, c) => sum + (d[c] ? d[c].value : 0), 0);
   });
 
   // Normalize data for stacked chart
@@ -285,6 +290,7 @@ function drawStackedChart(processedData) {
     return {
       continent: d.continent,
       categories: countries.map((cKey, index) => {
+        if (!d[cKey]) return null; // empty slot: fewer than five countries
         const value = (d[cKey].value / d.total) * 100; // Convert to percentage
         const seg = {
           country: d[cKey].name,
@@ -295,7 +301,7 @@ function drawStackedChart(processedData) {
         };
         x0 += value;
         return seg;
-      }),
+      }).filter(Boolean),
     };
   });
 
@@ -385,7 +391,7 @@ function drawStackedChart(processedData) {
 // ============================
 // Load data and render charts
 // ============================
-d3.csv("/static/data/continent_summary_1996.csv").then(data => {
+d3.json(`/emissions/continent-summary?year=${summaryYear}`).then(data => {
   // Parse countries to include names and values
   const parsedData = data.map(d => {
     return {
@@ -396,9 +402,8 @@ d3.csv("/static/data/continent_summary_1996.csv").then(data => {
         parseCountryField(d.country_3),
         parseCountryField(d.country_4),
         parseCountryField(d.country_5),
-        // 'other' field seems to be "otherCountryName,value" => we replace comma with colon
-        parseCountryField(d.other.replace(",", ":")),
-      ].sort((a, b) => b.value - a.value),
+        parseCountryField(d.other),
+      ].filter(Boolean).sort((a, b) => b.value - a.value),
     };
   });
 
@@ -414,7 +419,7 @@ d3.csv("/static/data/continent_summary_1996.csv").then(data => {
       country_3: parseCountryField(d.country_3),
       country_4: parseCountryField(d.country_4),
       country_5: parseCountryField(d.country_5),
-      other: parseCountryField(d.other.replace(",", ":")),
+      other: parseCountryField(d.other),
     };
   });
 
@@ -0,0 +1,118 @@
+"""Synthetic, scaled-up le/hle/climdiv files for the benchmarks.
+
+At scale 1 the files are about the size of the real exports (195 countries x
+22 years x 3 sexes x 2 indicators per WHO file, 48 states x 130 years per
+climdiv element); --scale N multiplies the number of countries and of climdiv
+state-years.  The values are random but seeded, so every run of the same
+scale writes the same files.
+
+    python -m benchmarks.fixtures --scale 10 --out benchmarks/.fixtures/x10
+"""
+import argparse
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+COUNTRIES = 195
+YEARS = range(2000, 2022)
+SEXES = (('Male', 'SEX_MLE'), ('Female', 'SEX_FMLE'), ('Both sexes', 'SEX_BTSX'))
+REGIONS = (('AFR', 'Africa'), ('AMR', 'Americas'), ('EUR', 'Europe'),
+           ('EMR', 'Eastern Mediterranean'), ('SEAR', 'South-East Asia'), ('WPR', 'Western Pacific'))
+LE_INDICATORS = (('WHOSIS_000001', 'Life expectancy at birth (years)'),
+                 ('WHOSIS_000015', 'Life expectancy at age 60 (years)'))
+HLE_INDICATORS = (('WHOSIS_000002', 'Healthy life expectancy (HALE) at birth (years)'),
+                  ('WHOSIS_000007', 'Healthy life expectancy (HALE) at age 60 (years)'))
+
+CLIMDIV_STATES = 48
+CLIMDIV_YEARS = 130
+CLIMDIV_LAST_YEAR = 2024
+# climdiv element codes of ELEMENTS, and their offset from the monthly mean
+CLIMDIV_ELEMENTS = (('tmpc', '02', 0.0), ('tmax', '27', 11.0), ('tmin', '28', -11.0))
+
+
+def country_names(scale):
+    return ['Country %05d' % i for i in range(COUNTRIES * scale)]
+
+
+def who_frame(indicators, scale, rng):
+    """A WHO GHO export with the columns read by load_who and the pipeline"""
+    countries = country_names(scale)
+    index = pd.MultiIndex.from_product(
+        [range(len(indicators)), range(len(countries)), YEARS, range(len(SEXES))],
+        names=['indicator', 'country', 'year', 'sex'])
+    indicator, country, year, sex = (index.get_level_values(i).to_numpy() for i in range(4))
+    region = country % len(REGIONS)
+    n = len(index)
+
+    value = np.round(rng.uniform(40, 85, n), 2)
+    low = np.where(rng.random(n) < 0.1, np.nan, np.round(value - 1.3, 2))
+    high = np.where(rng.random(n) < 0.1, np.nan, np.round(value + 1.4, 2))
+    fact = np.where(rng.random(n) < 0.02, np.nan, value)
+    return pd.DataFrame({
+        'IndicatorCode': np.array([code for code, _ in indicators])[indicator],
+        'Indicator': np.array([name for _, name in indicators])[indicator],
+        'ValueType': 'numeric',
+        'ParentLocationCode': np.array([code for code, _ in REGIONS])[region],
+        'ParentLocation': np.array([name for _, name in REGIONS])[region],
+        'Location type': 'Country',
+        'SpatialDimValueCode': np.array(['C%05d' % i for i in range(len(countries))])[country],
+        'Location': np.array(countries)[country],
+        'Period type': 'Year',
+        'Period': year,
+        'Is latest year': year == YEARS[-1],
+        'Dim1 type': 'Sex',
+        'Dim1': np.array([name for name, _ in SEXES])[sex],
+        'Dim1ValueCode': np.array([code for _, code in SEXES])[sex],
+        'FactValueNumeric': fact,
+        'FactValueNumericLow': low,
+        'FactValueNumericHigh': high,
+        'Value': value.astype(str),
+    })
+
+
+def climdiv_shape(scale):
+    """(states, first year, years) of a climdiv fixture of the given scale"""
+    states = min(999, CLIMDIV_STATES * scale)
+    years = CLIMDIV_YEARS * math.ceil(CLIMDIV_STATES * scale / states)
+    return states, CLIMDIV_LAST_YEAR - years + 1, years
+
+
+def write_climdiv(path, code, offset, scale, rng):
+    states, first_year, years = climdiv_shape(scale)
+    season = 55 + 20 * np.sin(np.arange(12) / 12 * 2 * np.pi - np.pi / 2)
+    with open(path, 'w') as f:
+        for state in range(1, states + 1):
+            values = np.round(season + offset + rng.normal(0, 3, (years, 12)), 2)
+            # The last year is still in progress: its final months are missing
+            values[-1, 9:] = -99.9
+            for year, row in zip(range(first_year, first_year + years), values):
+                f.write('%03d0%s%04d%s\n' % (state, code, year, ''.join('%7.2f' % v for v in row)))
+
+
+def generate(out, scale=1, seed=0):
+    """Write le.csv, hle.csv and the climdiv files of one scale into out"""
+    rng = np.random.default_rng(seed)
+    os.makedirs(out, exist_ok=True)
+    who_frame(LE_INDICATORS, scale, rng).to_csv(os.path.join(out, 'le.csv'), index=False)
+    who_frame(HLE_INDICATORS, scale, rng).to_csv(os.path.join(out, 'hle.csv'), index=False)
+    for element, code, offset in CLIMDIV_ELEMENTS:
+        write_climdiv(os.path.join(out, f'climdiv-{element}st-v1.0.0-20241205'), code, offset, scale, rng)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write scaled-up synthetic data files")
+    parser.add_argument('--scale', type=int, default=10, help="multiple of the real data size")
+    parser.add_argument('--out', default=None, help="directory (default: benchmarks/.fixtures/x<scale>)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    out = args.out or os.path.join('benchmarks', '.fixtures', 'x%d' % args.scale)
+    generate(out, args.scale, args.seed)
+    for name in sorted(os.listdir(out)):
+        print(f"{os.path.join(out, name)}: {os.path.getsize(os.path.join(out, name)) / 1e6:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
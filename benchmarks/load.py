@@ -0,0 +1,154 @@
+"""In-process load test of the API through its ASGI interface.
+
+Requests are driven straight into app.main.app by --concurrency asyncio
+workers (no network, no HTTP client), for every query shape of the matrix.
+Per shape it reports p50/p95/p99 latency, throughput and the peak RSS of the
+process so far.  The response cache is disabled unless --cache is given, so
+every request does the full filtering and serialization.
+
+    python -m benchmarks.load --scale 10 [--requests 200] [--concurrency 8] [--cache]
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import time
+from urllib.parse import urlencode
+
+import numpy as np
+
+from benchmarks.fixtures import generate
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+async def call(app, path, query):
+    """Send one GET request to an ASGI app and return (status, body size)"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'GET', 'scheme': 'http', 'root_path': '',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'headers': [(b'host', b'benchmark')],
+        'client': ('127.0.0.1', 0), 'server': ('benchmark', 80),
+    }
+    response = {'status': None, 'size': 0}
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+        elif message['type'] == 'http.response.body':
+            response['size'] += len(message.get('body', b''))
+
+    await app(scope, receive, send)
+    return response['status'], response['size']
+
+
+async def run_shape(app, urls, requests, concurrency):
+    """Latencies (s), statuses and bytes of `requests` calls cycling over urls"""
+    pending = iter(range(requests))
+    latencies, statuses, sizes = [], {}, 0
+
+    async def worker():
+        nonlocal sizes
+        for i in pending:
+            path, query = urls[i % len(urls)]
+            started = time.perf_counter()
+            status, size = await call(app, path, query)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            sizes += size
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, statuses, sizes, time.perf_counter() - started
+
+
+def query_matrix(registry):
+    """Query shape -> [(path, query string), ...] built from the loaded data"""
+    le = registry.get('le')
+    years = [str(year) for year in sorted(le['Period'].unique())]
+    countries = list(le['Location'].cat.categories[:20])
+    regions = list(le['ParentLocation'].cat.categories)
+    store = registry.get('climdiv')
+    last_year = store.first_year + store.values.shape[2] - 1
+
+    def urls(path, *queries):
+        return [(path, urlencode(query)) for query in queries]
+
+    return {
+        '/life 1 year': urls('/life', *({'years': year, 'metric': 'le', 'sex': 'male', 'age': 'birth'}
+                                        for year in years)),
+        '/life all years, both': urls('/life', {'years': ','.join(years), 'metric': 'both',
+                                                'sex': 'both', 'age': 'both'}),
+        '/life country': urls('/life', *({'years': ','.join(years), 'metric': 'both', 'sex': 'female',
+                                          'age': 'both', 'country': country} for country in countries)),
+        '/life region': urls('/life', *({'years': ','.join(years[-5:]), 'metric': 'le', 'sex': 'both',
+                                         'age': '60', 'continent': region} for region in regions)),
+        '/temperature': urls('/temperature', *({'state_code': state, 'years': ','.join(
+            str(year) for year in range(last_year - 9, last_year + 1))} for state in store.states[:20])),
+        '/temperature/series annual': urls('/temperature/series', *(
+            {'state_code': state, 'resolution': 'annual'} for state in store.states[:20])),
+        '/countries': urls('/countries', {}),
+        '/years': urls('/years', {}),
+        '/regions': urls('/regions', {}),
+        '/continents': urls('/continents', {}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-process ASGI load test of the API")
+    parser.add_argument('--scale', type=int, default=10, help="fixture scale (see benchmarks.fixtures)")
+    parser.add_argument('--data', default=None, help="data directory (default: generated fixtures)")
+    parser.add_argument('--requests', type=int, default=200, help="requests per query shape")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--cache', action='store_true', help="keep the response cache enabled")
+    parser.add_argument('--json', default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    data = args.data or os.path.join('benchmarks', '.fixtures', 'x%d' % args.scale)
+    if args.data is None and not os.path.exists(os.path.join(data, 'le.csv')):
+        generate(data, args.scale)
+    # Must be set before the app modules register their datasets
+    os.environ['VIZ_DATA_DIR'] = data
+
+    from app.datasets import registry
+    from app.main import app, response_cache
+
+    registry.load_all()
+    if not args.cache:
+        response_cache.maxsize = 0
+
+    results = {}
+    print(f"{'query shape':<30}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'req/s':>9}{'KB/req':>9}{'RSS MB':>9}  status")
+    for shape, urls in query_matrix(registry).items():
+        latencies, statuses, size, elapsed = asyncio.run(
+            run_shape(app, urls, args.requests, args.concurrency))
+        p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+        result = {
+            'p50': p50, 'p95': p95, 'p99': p99,
+            'throughput': len(latencies) / elapsed,
+            'bytes_per_request': size / len(latencies),
+            'peak_rss_mb': peak_rss_mb(),
+            'statuses': statuses,
+        }
+        results[shape] = result
+        print(f"{shape:<30}{p50:>9.2f}{p95:>9.2f}{p99:>9.2f}{result['throughput']:>9.0f}"
+              f"{result['bytes_per_request'] / 1024:>9.1f}{result['peak_rss_mb']:>9.0f}  {statuses}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'data': data, 'requests': args.requests, 'concurrency': args.concurrency,
+                       'cache': args.cache, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Micro-benchmarks of the data access behind /life, /temperature and the listings.
+
+Each case runs --repeat times and reports min/median/max wall time.  Cases
+marked "cold" parse the text files into an empty sidecar directory; the
+others read the columnar sidecars or the already loaded registry.
+
+    python -m benchmarks.micro --scale 10 [--json results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from benchmarks.fixtures import generate
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return times
+
+
+@contextmanager
+def fresh_sidecars():
+    """Point the sidecar cache at an empty directory, so files are parsed"""
+    from app import sidecar
+
+    previous = sidecar.SIDECAR_DIR
+    sidecar.SIDECAR_DIR = tempfile.mkdtemp()
+    try:
+        yield
+    finally:
+        shutil.rmtree(sidecar.SIDECAR_DIR, ignore_errors=True)
+        sidecar.SIDECAR_DIR = previous
+
+
+def cold(fn):
+    def run():
+        with fresh_sidecars():
+            fn()
+    return run
+
+
+def cases():
+    """(name, callable) of every benchmark, against the registry's data files"""
+    from fastapi.responses import JSONResponse
+
+    from app.climdiv import ClimdivStore, read_climdiv
+    from app.datasets import data_path, load_who, registry
+    from app.life import LifeQueryEngine
+    from app.main import AGE_INDICATORS, init_data
+
+    le_path = data_path('le.csv')
+    le, _ = init_data()
+    store = registry.get('climdiv')
+    climdiv_paths = registry.footprint()['climdiv']['paths']
+    years = [str(year) for year in sorted(le['Period'].unique())]
+    country = le['Location'].cat.categories[0].lower()
+    region = le['ParentLocation'].cat.categories[0].lower()
+    engine = registry.derived('le', LifeQueryEngine)
+    state = store.states[0]
+    climdiv_years = list(range(store.first_year, store.first_year + store.values.shape[2]))
+
+    def reload_who():
+        registry.invalidate('le', 'hle')
+        init_data()
+
+    def life(years, sex='male', indicator=None, location=None, parent_location=None):
+        def run():
+            positions = engine.select(years, sex, indicator, location, parent_location)
+            return JSONResponse(content={'le': engine.grouped(positions), 'hle': None}).body
+        return run
+
+    return [
+        ('load_who le.csv (cold)', cold(lambda: load_who(le_path))),
+        ('load_who le.csv (sidecar)', lambda: load_who(le_path)),
+        ('init_data (reload)', reload_who),
+        ('init_data (loaded)', init_data),
+        ('LifeQueryEngine(le)', lambda: LifeQueryEngine(le)),
+        ('/life 1 year', life(years[-1:])),
+        ('/life all years', life(years)),
+        ('/life all years, birth', life(years, indicator=AGE_INDICATORS['birth'])),
+        ('/life all years, country', life(years, 'both sexes', location=country)),
+        ('/life all years, region', life(years, 'female', parent_location=region)),
+        ('read_climdiv tmpc', lambda: read_climdiv(climdiv_paths[0])),
+        ('ClimdivStore.from_files (cold)', cold(lambda: ClimdivStore.from_files(*climdiv_paths))),
+        ('ClimdivStore.from_files (sidecar)', lambda: ClimdivStore.from_files(*climdiv_paths)),
+        ('climdiv rows, 10 years', lambda: store.rows(state, climdiv_years[-10:])),
+        ('climdiv series, annual', lambda: store.series(state, climdiv_years, 'annual')),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the data access functions")
+    parser.add_argument('--scale', type=int, default=10, help="fixture scale (see benchmarks.fixtures)")
+    parser.add_argument('--data', default=None, help="data directory (default: generated fixtures)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', default=None, help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    data = args.data or os.path.join('benchmarks', '.fixtures', 'x%d' % args.scale)
+    if args.data is None and not os.path.exists(os.path.join(data, 'le.csv')):
+        generate(data, args.scale)
+    # Must be set before the app modules register their datasets
+    os.environ['VIZ_DATA_DIR'] = data
+
+    results = {}
+    print(f"{'benchmark':<36}{'min ms':>10}{'median ms':>12}{'max ms':>10}")
+    for name, fn in cases():
+        times = [t * 1000 for t in timed(fn, args.repeat)]
+        results[name] = {'min': min(times), 'median': statistics.median(times), 'max': max(times)}
+        print(f"{name:<36}{min(times):>10.2f}{statistics.median(times):>12.2f}{max(times):>10.2f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'data': data, 'repeat': args.repeat, 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Derived data artifacts, declared with their inputs and transform.
+
+Each transform receives the parsed input frames, in the order the inputs are
+declared, and returns the frame of the artifact, published to the path it is
+declared with.  Run them with ``python -m data_processing.pipeline``.
+"""
+import pandas as pd
+
+from app.countries import CountryRegistry
+from app.population import PopulationStore
+from data_processing.pipeline import Artifact
+
+DATA = "app/static/data"
+OUTPUT = "data_processing/output"
+
+LE = f"{DATA}/le.csv"
+HLE = f"{DATA}/hle.csv"
+POPULATION = f"{DATA}/population.csv"
+EMISSIONS = f"{DATA}/co2-fossil-plus-land-use.csv"
+# OWID exports with the original column and entity names
+RAW_EMISSIONS = f"{OUTPUT}/co2-fossil-plus-land-use.csv"
+EMISSIONS_PER_CAPITA = f"{OUTPUT}/co-emissions-per-capita.csv"
+COUNTRIES_WITH_CONTINENTS = f"{DATA}/countries_with_continents.csv"
+COUNTRIES_BY_CONTINENTS = f"{DATA}/Countries by continents.csv"
+
+REGIONS = ["Africa", "Eastern Mediterranean", "Western Pacific", "Americas", "South-East Asia", "Europe"]
+PER_CAPITA = "Annual CO₂ emissions (per capita)"
+LAND_USE = "Annual CO₂ emissions from land-use change"
+FOSSIL = "Annual CO₂ emissions from fossil"
+
+
+def region_average_life_expectancy(le):
+    """Average life expectancy at birth (both sexes) per WHO region"""
+    filtered = le[
+        (le["ParentLocation"].isin(REGIONS)) &
+        (le["Dim1"] == "Both sexes") &
+        (le["Indicator"] == "Life expectancy at birth (years)")
+    ]
+    region_avg = filtered.groupby("ParentLocation")["FactValueNumeric"].mean().reset_index()
+    return region_avg.rename(columns={"ParentLocation": "Region", "FactValueNumeric": "AverageLifeExpectancy"})
+
+
+def female_life_expectancy_at_60(le):
+    """Female life expectancy at age 60 per country and year, 2000-2021"""
+    filtered = le[
+        (le["Period"].between(2000, 2021)) &
+        (le["Indicator"].str.contains("age 60")) &
+        (le["Dim1"] == "Female")
+    ]
+    relevant = filtered[["Location", "Period", "FactValueNumeric"]].rename(columns={"FactValueNumeric": "LifeExpectancy"})
+    return relevant.groupby(["Location", "Period"]).mean().reset_index()
+
+
+def lowest_male_life_expectancy(le):
+    """The 5 countries with the lowest male life expectancy at birth per year, 2000-2021"""
+    filtered = le[
+        (le["Dim1"] == "Male") &
+        (le["Dim1ValueCode"] == "SEX_MLE") &
+        (le["Indicator"] == "Life expectancy at birth (years)")
+    ][["Location", "Period", "FactValueNumeric"]]
+    filtered["Period"] = pd.to_numeric(filtered["Period"], errors="coerce")
+    filtered["FactValueNumeric"] = pd.to_numeric(filtered["FactValueNumeric"], errors="coerce")
+    filtered = filtered.dropna(subset=["FactValueNumeric"])
+
+    filtered = filtered.sort_values(by=["Period", "FactValueNumeric"])
+    filtered = filtered[(filtered["Period"] >= 2000) & (filtered["Period"] <= 2021)]
+    return filtered.groupby("Period").head(5)
+
+
+def region_healthy_life_expectancy_at_60(hle):
+    """Average healthy life expectancy at age 60 per region and year, 2000-2021"""
+    filtered = hle[
+        (hle["Indicator"].str.contains("at age 60")) &
+        (hle["Period"] >= 2000) & (hle["Period"] <= 2021)
+    ]
+    return filtered.groupby(["ParentLocation", "Period"])["FactValueNumeric"].mean().reset_index()
+
+
+def merge_le_hle_2021(le, hle):
+    """LE and HLE lower bounds side by side for 2021"""
+    le_data = le[["ParentLocation", "Location", "Period", "FactValueNumericLow"]].rename(
+        columns={"FactValueNumericLow": "LifeExpectancy"})
+    hle_data = hle[["ParentLocation", "Location", "Period", "FactValueNumericLow"]].rename(
+        columns={"FactValueNumericLow": "HealthyLifeExpectancy"})
+    merged = pd.merge(le_data, hle_data, on=["ParentLocation", "Location", "Period"], how="inner")
+    return merged[merged["Period"] == 2021].drop(columns=["Period"])
+
+
+def merge_for_slope(le, hle, population, emissions):
+    """LE, HLE and population for every year and sex, for the slope chart"""
+    registry = CountryRegistry.from_frames(emissions, population)
+    le_data = le[["ParentLocation", "Location", "Period", "Dim1", "FactValueNumericLow", "Indicator"]].rename(
+        columns={"FactValueNumericLow": "LifeExpectancy", "Indicator": "Status"})
+    hle_data = hle[["ParentLocation", "Location", "Period", "Dim1", "FactValueNumericLow"]].rename(
+        columns={"FactValueNumericLow": "HealthyLifeExpectancy"})
+    merged = pd.merge(le_data, hle_data, on=["ParentLocation", "Location", "Period", "Dim1"], how="inner")
+    # Each row gets the population of its own country (matched on country ids) and year
+    store = PopulationStore.from_frame(population)
+    rows = store.rows_of(registry)[registry.ids("le", names=merged["Location"])]
+    merged["Population"] = store.at(rows, merged["Period"].to_numpy())
+    return merged
+
+
+def emissions_with_continents(emissions, countries, population):
+    """Emissions history of every country that has a continent"""
+    registry = CountryRegistry.from_frames(emissions, population)
+    emissions = emissions.assign(country=registry.ids("emissions", codes=emissions["Code"], names=emissions["Entity"]))
+    countries = countries.assign(country=registry.ids("countries_with_continents", names=countries["Country"]))
+    countries = countries[countries["country"] >= 0]
+    return pd.merge(emissions, countries, on="country", how="inner").drop(columns=["country"])
+
+
+def alluvial_one_year(alluvial, year=1996):
+    """Countries of the alluvial table for one year"""
+    countries = clean_co2_data(alluvial)
+    return countries[countries["Year"] == year].drop(columns=["Country"])
+
+
+def one_year_data(emissions_per_capita, year=1996):
+    """Per-capita emissions of one year, highest first"""
+    one_year = emissions_per_capita[emissions_per_capita["Year"] == year]
+    return one_year.sort_values(PER_CAPITA, ascending=False)
+
+
+def average_emissions(emissions_per_capita, start=2001, end=2010):
+    """Average per-capita emissions of every entity over a range of years"""
+    filtered = emissions_per_capita[(emissions_per_capita["Year"] >= start) & (emissions_per_capita["Year"] <= end)]
+    average = filtered.groupby("Entity")[PER_CAPITA].mean().reset_index()
+    return average.rename(columns={PER_CAPITA: f"Average CO₂ emissions ({start}-{end})"})
+
+
+def create_continent_co2_summary(emissions_per_capita, continents, countries, emissions, population, year=1996):
+    """Per-continent total per-capita emissions with its top 5 countries and the rest"""
+    registry = CountryRegistry.from_frames(emissions, population)
+    valid_countries = registry.ids("Countries by continents", names=countries["Country"])
+    year_data = emissions_per_capita[emissions_per_capita["Year"] == year]
+    year_data = year_data.assign(
+        country=registry.ids("emissions per capita", codes=year_data["Code"], names=year_data["Entity"]))
+    year_data = year_data[year_data["country"].isin(valid_countries[valid_countries >= 0])]
+    continents = continents.assign(country=registry.ids("countries_with_continents", names=continents["Country"]))
+    merged_data = year_data.merge(continents[continents["country"] >= 0], on="country")
+
+    continent_summary = []
+    for continent, group in merged_data.groupby("Continent"):
+        total_emissions = group[PER_CAPITA].sum()
+        top_countries = group.nlargest(5, PER_CAPITA)[["Entity", PER_CAPITA]]
+        top_countries_list = top_countries.values.tolist()
+
+        row = {"Continent": continent, "annual_co2": total_emissions}
+        for i in range(1, 6):
+            if i <= len(top_countries_list):
+                country, emissions = top_countries_list[i - 1]
+                row[f"country_{i}"] = {country: emissions}
+            else:
+                row[f"country_{i}"] = None
+
+        # Read by bar.js and stacked.js as "{'Other', <value>}"
+        other_emissions = total_emissions - top_countries[PER_CAPITA].sum()
+        row["other"] = "{'Other', %r}" % float(other_emissions)
+        continent_summary.append(row)
+
+    return pd.DataFrame(
+        continent_summary,
+        columns=["Continent", "annual_co2", "country_1", "country_2", "country_3", "country_4", "country_5", "other"],
+    )
+
+
+def clean_co2_data(emissions):
+    """Emissions of countries only: drop aggregates without a code and World"""
+    cleaned = emissions.dropna(subset=["Code"])
+    return cleaned[cleaned["Entity"] != "World"]
+
+
+def top_emitters_heatmap(cleaned, year=1996):
+    """Land-use and fossil emissions of the 10 largest emitters of a year"""
+    data = cleaned[cleaned["Year"] == year][["Entity", "Code", LAND_USE, FOSSIL]].dropna()
+    data[LAND_USE] = pd.to_numeric(data[LAND_USE], errors="coerce")
+    data[FOSSIL] = pd.to_numeric(data[FOSSIL], errors="coerce")
+    data["Total Emissions"] = data[LAND_USE] + data[FOSSIL]
+    return data.nlargest(10, "Total Emissions")[["Entity", LAND_USE, FOSSIL]]
+
+
+ARTIFACTS = [
+    Artifact("region_average_le", f"{DATA}/box_life_expectancy_by_region.csv",
+             [LE], region_average_life_expectancy),
+    Artifact("female_le_at_60", f"{DATA}/finalline_females_life_expectancy.csv",
+             [LE], female_life_expectancy_at_60),
+    Artifact("lowest_male_le", f"{DATA}/finalscatter_lowest_life_expectancy_male_filtered.csv",
+             [LE], lowest_male_life_expectancy),
+    Artifact("region_hle_at_60", f"{DATA}/bar-hle_avg_filtered.csv",
+             [HLE], region_healthy_life_expectancy_at_60),
+    Artifact("le_hle_2021", f"{DATA}/life_expectancy.json",
+             [LE, HLE], merge_le_hle_2021),
+    Artifact("le_hle_population", f"{DATA}/life_expectancy_allyears.json",
+             [LE, HLE, POPULATION, EMISSIONS], merge_for_slope),
+    Artifact("alluvial", f"{DATA}/Alluvial.csv",
+             [EMISSIONS, COUNTRIES_WITH_CONTINENTS, POPULATION], emissions_with_continents),
+    Artifact("alluvial_1996", f"{DATA}/Alluvial_1996.csv",
+             [f"{DATA}/Alluvial.csv"], alluvial_one_year),
+    Artifact("sorted_emissions_one_year", f"{DATA}/sorted_emissions_one_year.csv",
+             [EMISSIONS_PER_CAPITA], one_year_data),
+    Artifact("average_emissions", f"{DATA}/average_emissions_2001_2010.csv",
+             [EMISSIONS_PER_CAPITA], average_emissions),
+    Artifact("continent_summary", f"{DATA}/continent_summary_1996.csv",
+             [EMISSIONS_PER_CAPITA, COUNTRIES_WITH_CONTINENTS, COUNTRIES_BY_CONTINENTS, EMISSIONS, POPULATION],
+             create_continent_co2_summary),
+    Artifact("cleaned_co2", f"{OUTPUT}/cleaned_co2_data.csv",
+             [RAW_EMISSIONS], clean_co2_data),
+    Artifact("heatmap_1996", f"{OUTPUT}/heatmap_data_1996.csv",
+             [f"{OUTPUT}/cleaned_co2_data.csv"], top_emitters_heatmap),
+]
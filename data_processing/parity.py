@@ -0,0 +1,74 @@
+"""Check that the served emission views reproduce the files they replaced.
+
+The /emissions endpoints compute, for any year, what data_processing used to
+ship as year-baked files.  With their default parameters they must still
+answer the content of those files; run from the repository root::
+
+    python -m data_processing.parity
+"""
+import sys
+
+import numpy as np
+import pandas as pd
+
+from app.datasets import registry
+from app.emissions import PER_CAPITA
+from data_processing.artifacts import DATA
+
+
+def check_one_year(store, year=1996):
+    """/emissions/one-year vs sorted_emissions_one_year.csv, on its country rows"""
+    old = pd.read_csv(f"{DATA}/sorted_emissions_one_year.csv")
+    countries = registry.get('countries')
+    old = old[countries.ids('sorted_emissions_one_year', codes=old['Code'], names=old['Entity']) >= 0]
+    new = pd.DataFrame(store.one_year(year))
+    problems = []
+    if list(new.columns) != list(old.columns):
+        problems.append("columns %s, expected %s" % (list(new.columns), list(old.columns)))
+    elif set(new['Entity']) != set(old['Entity']):
+        problems.append("entities differ: %s" % sorted(set(new['Entity']) ^ set(old['Entity'])))
+    else:
+        old = old.set_index('Entity').loc[new['Entity']]
+        if not np.allclose(new[PER_CAPITA].to_numpy(), old[PER_CAPITA].to_numpy(), rtol=1e-9):
+            problems.append("per-capita values differ")
+        if not new[PER_CAPITA].is_monotonic_decreasing:
+            problems.append("not sorted highest first")
+    return problems
+
+
+def check_average(store, start=2001, end=2010):
+    """/emissions/average vs average_emissions_2001_2010.csv, on its country rows"""
+    old = pd.read_csv(f"{DATA}/average_emissions_{start}_{end}.csv")
+    countries = registry.get('countries')
+    old = old[countries.ids('average_emissions', names=old['Entity']) >= 0]
+    new = pd.DataFrame(store.average(start, end))
+    column = f"Average CO₂ emissions ({start}-{end})"
+    problems = []
+    if list(new.columns) != list(old.columns):
+        problems.append("columns %s, expected %s" % (list(new.columns), list(old.columns)))
+    elif set(new['Entity']) != set(old['Entity']):
+        problems.append("entities differ: %s" % sorted(set(new['Entity']) ^ set(old['Entity'])))
+    else:
+        old = old.set_index('Entity').loc[new['Entity']]
+        if not np.allclose(new[column].to_numpy(), old[column].to_numpy(), rtol=1e-9):
+            problems.append("averages differ")
+    return problems
+
+
+CHECKS = {
+    '/emissions/one-year': lambda: check_one_year(registry.get('emissions')),
+    '/emissions/average': lambda: check_average(registry.get('emissions')),
+}
+
+
+def main():
+    failed = 0
+    for name, check in CHECKS.items():
+        problems = check()
+        print("%s: %s" % (name, '; '.join(problems) if problems else 'ok'))
+        failed += bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,267 @@
+"""Incremental runner for the derived data artifacts.
+
+Artifacts (see artifacts.py) declare the file they publish, the files they
+read and a transform.  The runner orders them into a dependency DAG (an
+artifact depends on the one producing any of its inputs) and rebuilds only
+those whose inputs, output or code changed since the last run, as recorded
+by content hash in STATE_FILE.  The code of an artifact is the source of its
+transform and of the project functions, classes and constants it reaches, so
+editing a helper rebuilds only the artifacts that use it.  Every input is
+parsed once per run and independent artifacts of the same DAG level are
+built in parallel processes.
+
+Artifacts are built under BUILD_DIR, which is not tracked; downstream
+artifacts read those builds.  ``--publish`` then copies them over the tracked
+files the app serves, so a run never changes the tree by accident.
+
+Run from the repository root::
+
+    python -m data_processing.pipeline [--force] [--publish] [--jobs N] [artifact ...]
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+
+from app.sidecar import file_sha256, read_frame
+
+STATE_FILE = "data_processing/.pipeline_state.json"
+BUILD_DIR = "data_processing/build"
+# Packages whose functions, classes and constants count as the code of an artifact
+PROJECT_PACKAGES = ('app', 'data_processing')
+
+pd.set_option('mode.copy_on_write', True)
+
+
+class Artifact:
+    def __init__(self, name, published, inputs, transform):
+        self.name = name
+        self.published = published
+        self.output = os.path.join(BUILD_DIR, published)
+        self.inputs = list(inputs)
+        self.transform = transform
+
+    def code_hash(self):
+        return code_hash(self.transform)
+
+    def write(self, frame):
+        os.makedirs(os.path.dirname(self.output), exist_ok=True)
+        if self.output.endswith('.json'):
+            frame.to_json(self.output, orient="records", indent=2)
+        else:
+            frame.to_csv(self.output, index=False)
+
+    def publish(self):
+        """Copy the build over the published file; False if they were already equal"""
+        if os.path.exists(self.published) and file_sha256(self.published) == file_sha256(self.output):
+            return False
+        os.makedirs(os.path.dirname(self.published), exist_ok=True)
+        shutil.copyfile(self.output, self.published)
+        return True
+
+
+def is_project(value):
+    return (inspect.isfunction(value) or inspect.isclass(value)) \
+        and value.__module__.split('.')[0] in PROJECT_PACKAGES
+
+
+def global_names(code):
+    """Names a code object and the code nested in it (lambdas, comprehensions) look up"""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if inspect.iscode(const):
+            names |= global_names(const)
+    return names
+
+
+def functions_of(value):
+    """The function, or the methods of the class"""
+    if inspect.isfunction(value):
+        return [value]
+    functions = []
+    for member in vars(value).values():
+        if isinstance(member, (staticmethod, classmethod)):
+            member = member.__func__
+        if isinstance(member, property):
+            functions.extend(f for f in (member.fget, member.fset) if f is not None)
+        elif inspect.isfunction(member):
+            functions.append(member)
+    return functions
+
+
+@lru_cache(maxsize=None)
+def code_hash(transform):
+    """Hash of the source of a transform and of the project code and constants it reaches"""
+    parts, pending = {}, [transform]
+    while pending:
+        value = pending.pop()
+        key = '%s.%s' % (value.__module__, value.__qualname__)
+        if key in parts:
+            continue
+        parts[key] = inspect.getsource(value)
+        if inspect.isclass(value):
+            pending.extend(base for base in value.__bases__ if is_project(base))
+        for function in functions_of(value):
+            scope = function.__globals__
+            for name in global_names(function.__code__):
+                found = scope.get(name)
+                if is_project(found):
+                    pending.append(found)
+                elif isinstance(found, (str, int, float, tuple, list, dict)):
+                    parts['%s.%s' % (function.__module__, name)] = repr(found)
+    digest = hashlib.sha256()
+    for key in sorted(parts):
+        digest.update(key.encode())
+        digest.update(parts[key].encode())
+    return digest.hexdigest()
+
+
+def dependency_levels(artifacts):
+    """Group artifacts into levels whose members only depend on earlier levels"""
+    producers = {artifact.published: artifact.name for artifact in artifacts}
+    depends = {artifact.name: {producers[path] for path in artifact.inputs if path in producers}
+               for artifact in artifacts}
+    by_name = {artifact.name: artifact for artifact in artifacts}
+    levels, done = [], set()
+    while len(done) < len(artifacts):
+        level = [name for name in depends if name not in done and depends[name] <= done]
+        if not level:
+            raise ValueError("Dependency cycle between %s" % sorted(set(depends) - done))
+        levels.append([by_name[name] for name in level])
+        done.update(level)
+    return levels, depends
+
+
+def select(artifacts, targets):
+    """The target artifacts and everything they depend on"""
+    if not targets:
+        return artifacts
+    _, depends = dependency_levels(artifacts)
+    wanted, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in depends:
+            raise KeyError("Unknown artifact %s" % name)
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(depends[name])
+    return [artifact for artifact in artifacts if artifact.name in wanted]
+
+
+def build(transform, frames):
+    return transform(*frames)
+
+
+class Pipeline:
+    def __init__(self, artifacts, state_file=STATE_FILE, jobs=None):
+        self.artifacts = artifacts
+        self.state_file = state_file
+        self.jobs = jobs or os.cpu_count()
+        self.frames = {}
+        # Inputs produced by another artifact are read from its build
+        self.builds = {artifact.published: artifact.output for artifact in artifacts}
+        try:
+            with open(state_file) as f:
+                self.state = json.load(f)
+        except (OSError, ValueError):
+            self.state = {}
+
+    def source(self, path):
+        return self.builds.get(path, path)
+
+    def load(self, path):
+        """Parse an input once per run"""
+        path = self.source(path)
+        if path not in self.frames:
+            self.frames[path] = read_frame(path)
+        return self.frames[path]
+
+    def fingerprint(self, artifact):
+        return {
+            'inputs': {path: file_sha256(self.source(path)) for path in artifact.inputs},
+            'code': artifact.code_hash(),
+        }
+
+    def is_fresh(self, artifact, fingerprint):
+        recorded = self.state.get(artifact.name)
+        return (recorded is not None and os.path.exists(artifact.output)
+                and {k: recorded.get(k) for k in fingerprint} == fingerprint
+                and recorded.get('output') == file_sha256(artifact.output))
+
+    def run(self, force=False, publish=False):
+        """Rebuild stale artifacts, publishing them if asked; returns {name: 'built'|'fresh'|'skipped'|'failed'}"""
+        levels, depends = dependency_levels(self.artifacts)
+        status = {}
+        with ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            for level in levels:
+                futures = {}
+                for artifact in level:
+                    broken = [name for name in depends[artifact.name] if status[name] in ('skipped', 'failed')]
+                    if broken:
+                        print(f"skipped {artifact.name}: {', '.join(broken)} not built")
+                        status[artifact.name] = 'skipped'
+                        continue
+                    missing = [path for path in artifact.inputs if not os.path.exists(self.source(path))]
+                    if missing:
+                        print(f"skipped {artifact.name}: missing {', '.join(missing)}")
+                        status[artifact.name] = 'skipped'
+                        continue
+                    fingerprint = self.fingerprint(artifact)
+                    if not force and self.is_fresh(artifact, fingerprint):
+                        status[artifact.name] = 'fresh'
+                        continue
+                    frames = [self.load(path) for path in artifact.inputs]
+                    futures[artifact.name] = (artifact, fingerprint, pool.submit(build, artifact.transform, frames))
+
+                for name, (artifact, fingerprint, future) in futures.items():
+                    try:
+                        frame = future.result()
+                    except Exception as e:
+                        print(f"failed {name}: {type(e).__name__}: {e}")
+                        status[name] = 'failed'
+                        continue
+                    artifact.write(frame)
+                    # Downstream artifacts read the fresh output without re-parsing it
+                    self.frames[artifact.output] = frame
+                    self.state[name] = dict(fingerprint, output=file_sha256(artifact.output))
+                    status[name] = 'built'
+                    print(f"built {name} -> {artifact.output}")
+
+        if publish:
+            for artifact in self.artifacts:
+                if status[artifact.name] in ('built', 'fresh') and artifact.publish():
+                    print(f"published {artifact.name} -> {artifact.published}")
+
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, 'w') as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        return status
+
+
+def main(argv=None):
+    from data_processing.artifacts import ARTIFACTS
+
+    parser = argparse.ArgumentParser(description="Rebuild the derived data artifacts")
+    parser.add_argument('targets', nargs='*', help="artifacts to build (default: all)")
+    parser.add_argument('--force', action='store_true', help="rebuild even if up to date")
+    parser.add_argument('--publish', action='store_true',
+                        help="copy the builds over the tracked files the app serves")
+    parser.add_argument('--jobs', type=int, default=None, help="parallel processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    status = Pipeline(select(ARTIFACTS, args.targets), jobs=args.jobs).run(force=args.force, publish=args.publish)
+    counts = {state: sum(1 for s in status.values() if s == state)
+              for state in ('built', 'fresh', 'skipped', 'failed')}
+    print(", ".join(f"{count} {state}" for state, count in counts.items()))
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
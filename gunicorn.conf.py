@@ -0,0 +1,26 @@
+"""gunicorn settings for serving app.main:app with several worker processes
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The master publishes the columnar sidecars once before forking; every worker
+then memory-maps the same files, so the parsed datasets are held once in the
+page cache instead of once per worker.  It also builds the fingerprinted,
+precompressed static assets, and logs an error for every geometry file
+that is missing (python -m app.geometry fetch).
+"""
+import os
+
+bind = os.environ.get('VIZ_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('VIZ_WORKERS', '4'))
+worker_class = 'uvicorn.workers.UvicornWorker'
+
+
+def on_starting(server):
+    from app import assets, geometry
+    from app.datasets import DATA_DIR, GEO_DIR
+    from app.sidecar import publish
+
+    publish(DATA_DIR)
+    assets.build()
+    for problem in geometry.missing(GEO_DIR):
+        server.log.error("Geometry %s", problem)
@@ -0,0 +1,48 @@
+"""Shared fixtures: the app served from synthetic WHO and climdiv files.
+
+The WHO exports are not part of the repository, so the suite writes the
+seeded benchmark fixtures (benchmarks.fixtures) into a temporary data
+directory, next to links to the tracked data files.  VIZ_DATA_DIR must be
+set before the app modules register their datasets, hence at import time.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from benchmarks.fixtures import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SOURCE_DATA_DIR = os.path.join(ROOT, 'app', 'static', 'data')
+
+DATA_DIR = tempfile.mkdtemp(prefix='viz-tests-')
+os.environ['VIZ_DATA_DIR'] = DATA_DIR
+os.environ['VIZ_SIDECAR_DIR'] = os.path.join(DATA_DIR, '.columnar')
+
+generate(DATA_DIR)
+for name in os.listdir(SOURCE_DATA_DIR):
+    if not os.path.exists(os.path.join(DATA_DIR, name)):
+        os.symlink(os.path.join(SOURCE_DATA_DIR, name), os.path.join(DATA_DIR, name))
+
+# app/static, app/templates and the pipeline outputs are relative to the repository root
+os.chdir(ROOT)
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope='session')
+def data_dir():
+    return DATA_DIR
+
+
+@pytest.fixture(scope='session')
+def client():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,147 @@
+"""Golden checks: the endpoints of the first release answer byte for byte as they did.
+
+The reference answers come from the first release's handlers (pandas
+filtering of the raw CSVs), ported below with the file paths made relative
+to the test data directory.
+"""
+import itertools
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.responses import JSONResponse
+
+AGE_INDICATORS = {
+    'birth': 'Life expectancy at birth (years)',
+    '60': 'Life expectancy at age 60 (years)',
+    'both': None,
+}
+
+
+@lru_cache(maxsize=None)
+def read_who(path):
+    df = pd.read_csv(path, dtype={'Period': str, 'Location': str, 'Dim1': str,
+                                  'ParentLocation': str, 'FactValueNumeric': float})
+    df['Sex'] = df['Dim1'].str.lower()
+    df['Location'] = df['Location'].str.lower()
+    df['ParentLocation'] = df['ParentLocation'].str.lower()
+    return df
+
+
+def baseline_life(data_dir, years, metric, sex, age, country=None, continent=None):
+    year_list = years.split(',')
+    df_le = read_who(os.path.join(data_dir, 'le.csv'))
+    df_hle = read_who(os.path.join(data_dir, 'hle.csv'))
+    age = age.lower()
+    response = {'le': None, 'hle': None}
+    if metric.lower() == "both":
+        df_dict = {"le": df_le, "hle": df_hle}
+    else:
+        df_dict = {"le": df_le} if metric.lower() == "le" else {"hle": df_hle}
+    if sex.lower() == 'both':
+        sex = "Both sexes"
+    for df_key, df in df_dict.items():
+        mask = df['Period'].isin(year_list) & (df['Sex'].str.lower() == sex.lower())
+        if age != 'both':
+            mask &= (df['Indicator'] == AGE_INDICATORS[age])
+        if country:
+            mask &= (df['Location'] == country.lower())
+        if continent:
+            mask &= (df['ParentLocation'].str.lower() == continent.lower())
+        df = df[mask]
+        response[df_key] = df.groupby('Period').apply(
+            lambda x: x[['Location', 'ParentLocation', 'Sex', 'FactValueNumeric',
+                         'FactValueNumericLow', 'FactValueNumericHigh', 'Indicator']]
+            .replace(np.nan, None)
+            .to_dict('records')
+        ).to_dict()
+    return response
+
+
+def baseline_lists(data_dir):
+    df_le = pd.read_csv(os.path.join(data_dir, 'le.csv'))
+    df_lower = read_who(os.path.join(data_dir, 'le.csv'))
+    df_hle = read_who(os.path.join(data_dir, 'hle.csv'))
+    return {
+        '/countries': {"countries": df_le['Location'].unique().tolist()},
+        '/continents': {"continents": sorted(set(df_lower['ParentLocation'].unique())
+                                             | set(df_hle['ParentLocation'].unique()))},
+        '/years': {"years": df_le['Period'].unique().tolist()},
+        '/regions': {"regions": df_le['ParentLocation'].unique().tolist()},
+    }
+
+
+def baseline_temperature(data_dir, state_code, years):
+    mean_df = pd.read_csv(os.path.join(data_dir, 'climdiv-tmpcst-v1.0.0-20241205'), sep=r'\s+',
+                          header=None, index_col=False, dtype={0: str})
+    filtered_df = mean_df[(mean_df.iloc[:, 0].str[:3] == state_code)
+                          & mean_df.iloc[:, 0].str[-4:].isin(years.split(','))]
+    filtered_df = filtered_df.reset_index(drop=True)
+    filtered_df.iloc[:, 0] = filtered_df.iloc[:, 0].str[-4:]
+    return filtered_df.to_json(orient="values")
+
+
+def body(content):
+    return JSONResponse(content=content).body
+
+
+LIFE_QUERIES = [
+    dict(years=years, metric=metric, sex=sex, age=age, **extra)
+    for years, metric, sex, age, extra in itertools.product(
+        ['2020', '2020,2021', '1990'],
+        ['le', 'HLE', 'both'],
+        ['male', 'FEMALE', 'both'],
+        ['birth', '60', 'both'],
+        [{}, {'country': 'COUNTRY 00007'}, {'continent': 'europe'}],
+    )
+]
+
+
+# The first release grouped with the deprecated apply over the grouping columns
+@pytest.mark.filterwarnings('ignore:DataFrameGroupBy.apply operated on the grouping columns')
+@pytest.mark.parametrize('query', LIFE_QUERIES, ids=lambda query: '-'.join(query.values()))
+def test_life(client, data_dir, query):
+    response = client.get('/life', params=query)
+    assert response.status_code == 200
+    assert response.content == body(baseline_life(data_dir, **query))
+
+
+def test_life_columnar_matches_records(client):
+    query = dict(years='2020,2021', metric='both', sex='female', age='both')
+    records = client.get('/life', params=query).json()
+    columnar = client.get('/life', params=dict(query, shape='columnar')).json()
+    for key in ('le', 'hle'):
+        for year, rows in records[key].items():
+            columns, data = columnar[key][year]['columns'], columnar[key][year]['data']
+            assert [dict(zip(columns, values)) for values in zip(*data)] == rows
+
+
+def test_life_bad_age(client):
+    response = client.get('/life', params=dict(years='2020', metric='le', sex='male', age='bogus'))
+    # The first release answered 500 "400: Invalid age parameter"
+    assert response.status_code == 400
+    assert response.json() == {'detail': 'Invalid age parameter'}
+
+
+@pytest.mark.parametrize('path', ['/countries', '/continents', '/years', '/regions'])
+def test_lists(client, data_dir, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.content == body(baseline_lists(data_dir)[path])
+
+
+@pytest.mark.parametrize('state_code,years', [
+    ('001', '1895,1896,2024'),
+    ('004', '1990,1991,1992'),
+    ('048', '2000'),
+    ('999', '2000'),
+])
+def test_temperature(client, data_dir, state_code, years):
+    response = client.get('/temperature', params=dict(state_code=state_code, years=years))
+    assert response.status_code == 200
+    expected = baseline_temperature(data_dir, state_code, years)
+    assert response.content == body(expected)
+    assert json.loads(response.json()) == json.loads(expected)
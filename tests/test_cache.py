@@ -0,0 +1,49 @@
+import pytest
+
+LIFE = {'years': '2020', 'metric': 'le', 'sex': 'male', 'age': 'birth'}
+
+
+def test_etag_revalidation(client):
+    response = client.get('/life', params=LIFE)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    revalidated = client.get('/life', params=LIFE, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b''
+    assert revalidated.headers['ETag'] == etag
+
+    changed = client.get('/life', params=dict(LIFE, sex='female'), headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_errors_are_not_cached(client):
+    for _ in range(2):
+        response = client.get('/life', params=dict(LIFE, age='bogus'))
+        assert response.status_code == 400
+        assert 'ETag' not in response.headers
+
+
+NEGOTIATED = 'Accept, Accept-Encoding'
+
+
+@pytest.mark.parametrize('params', [{'years': '2020'}, {'years': '2020', 'shape': 'columnar'}])
+def test_joined_json_varies(client, params):
+    response = client.get('/life/joined', params=params)
+    assert response.headers['Vary'] == NEGOTIATED
+    revalidated = client.get('/life/joined', params=params, headers={'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['Vary'] == NEGOTIATED
+
+
+@pytest.mark.parametrize('path,params', [
+    ('/life/joined', {'years': '2020'}),
+    ('/export/alluvial', {'start': 2000, 'end': 2000}),
+])
+def test_arrow_and_export_vary(client, path, params):
+    pytest.importorskip('pyarrow')
+    response = client.get(path, params=params, headers={'Accept': 'application/vnd.apache.arrow.stream'})
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('application/vnd.apache.arrow.stream')
+    assert response.headers['Vary'] == NEGOTIATED
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.cube import AggregateCube
+
+LE_BIRTH = 'Life expectancy at birth (years)'
+LE_60 = 'Life expectancy at age 60 (years)'
+HLE_BIRTH = 'Healthy life expectancy (HALE) at birth (years)'
+
+
+def who(indicator, rows):
+    frame = pd.DataFrame(rows, columns=['ParentLocation', 'Location', 'Period', 'Dim1', 'FactValueNumeric'])
+    return frame.assign(Indicator=indicator, FactValueNumeric=frame['FactValueNumeric'].astype(np.float32))
+
+
+@pytest.fixture
+def cube():
+    le = pd.concat([
+        who(LE_BIRTH, [
+            ('Europe', 'France', 2020, 'Male', 80.0),
+            ('Europe', 'France', 2021, 'Male', 81.0),
+            ('Europe', 'Spain', 2020, 'Male', 82.0),
+            ('Africa', 'Kenya', 2020, 'Male', 60.5),
+            ('Africa', 'Kenya', 2020, 'Female', np.nan),
+        ]),
+        who(LE_60, [('Europe', 'France', 2020, 'Male', 22.0)]),
+    ], ignore_index=True)
+    hle = who(HLE_BIRTH, [('Europe', 'France', 2020, 'Male', 70.0)])
+    return AggregateCube(le, hle)
+
+
+def test_roll_up(cube):
+    filters = {'indicator': cube.indicators(metrics=['le'], ages=['birth'])}
+    assert cube.query(['region'], filters) == [
+        {'region': 'Africa', 'mean': 60.5, 'min': 60.5, 'max': 60.5, 'count': 1},
+        {'region': 'Europe', 'mean': 81.0, 'min': 80.0, 'max': 82.0, 'count': 3},
+    ]
+
+
+def test_metric_and_age_filters(cube):
+    assert cube.indicators(metrics=['hle']) == [cube.lookup['indicator'][HLE_BIRTH.lower()]]
+    assert cube.indicators(ages=['60']) == [cube.lookup['indicator'][LE_60.lower()]]
+    assert len(cube.indicators()) == 3
+
+
+def test_missing_values_are_not_counted(cube):
+    filters = {'country': cube.codes('country', ['kenya'])}
+    assert cube.query(['sex'], filters) == [
+        {'sex': 'Female', 'mean': None, 'min': None, 'max': None, 'count': 0},
+        {'sex': 'Male', 'mean': 60.5, 'min': 60.5, 'max': 60.5, 'count': 1},
+    ]
+
+
+def test_unknown_labels(cube):
+    assert cube.codes('region', [' europe ', 'Atlantis']) == [cube.lookup['region']['europe']]
+    assert cube.codes('region', ['Atlantis']) == []
+    assert cube.query(['region'], {'region': []}) == []
+    assert cube.query(['region'], {'region': []}, shape='columnar') == {
+        'columns': ['region', 'mean', 'min', 'max', 'count'], 'data': [[], [], [], [], []],
+    }
+
+
+def test_empty_year(cube):
+    assert cube.codes('year', ['1990']) == []
+    assert cube.query(['country'], {'year': []}, rank='top') == []
+
+
+def test_rank_k_larger_than_group(cube):
+    filters = {'indicator': cube.indicators(metrics=['le'], ages=['birth'])}
+    rows = cube.query(['region'], filters, stats=['mean'], rank='top', k=10)
+    assert rows == [
+        {'region': 'Africa', 'country': 'Kenya', 'mean': 60.5, 'rank': 1},
+        {'region': 'Europe', 'country': 'Spain', 'mean': 82.0, 'rank': 1},
+        {'region': 'Europe', 'country': 'France', 'mean': 80.5, 'rank': 2},
+    ]
+    # A member without any value is not ranked
+    assert cube.query([], {'country': cube.codes('country', ['kenya']),
+                           'sex': cube.codes('sex', ['female'])}, rank='bottom') == []
+
+
+def test_endpoint_unknown_labels(client):
+    response = client.get('/life/aggregate', params={'by': 'region', 'region': 'Atlantis'})
+    assert response.status_code == 200
+    assert response.json() == []
+    response = client.get('/life/aggregate', params={'by': 'planet'})
+    assert response.status_code == 400
+    assert response.json() == {'detail': 'Invalid by parameter'}
@@ -0,0 +1,103 @@
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.emissions import ALLUVIAL_MEASURES, AlluvialTable
+
+TOTAL, LAND, FOSSIL = (ALLUVIAL_MEASURES[measure] for measure in ('total', 'land_use', 'fossil'))
+
+
+@pytest.fixture
+def table():
+    rows = [
+        # Entity, Year, land use, fossil, continent
+        ('France', 2000, 1.0, 10.0, 'Europe'),
+        ('France', 2001, 1.0, 12.0, 'Europe'),
+        ('Spain', 2000, -3.0, 5.0, 'Europe'),
+        ('Spain', 2001, 2.0, 5.0, 'Europe'),
+        ('Malta', 2000, np.nan, 0.5, 'Europe'),
+        ('Kenya', 2000, 4.0, 1.0, 'Africa'),
+        ('Chad', 2001, -1.0, np.nan, 'Africa'),
+    ]
+    frame = pd.DataFrame(rows, columns=['Entity', 'Year', LAND, FOSSIL, 'Continent'])
+    frame[TOTAL] = frame[LAND].fillna(0) + frame[FOSSIL].fillna(0)
+    frame['Code'] = frame['Entity'].str[:3].str.upper()
+    return AlluvialTable(frame)
+
+
+def links(flows):
+    return [(row['source'], row['target'], row['value']) for row in flows]
+
+
+def test_flows_of_a_year(table):
+    assert links(table.flows(2000, 2000)) == [
+        ('Europe', 'France', 11.0),
+        ('Europe', 'Spain', 5.0),
+        ('Europe', 'Malta', 0.5),
+        ('France', 'Fossil', 10.0),
+        ('France', 'Land', 1.0),
+        ('Spain', 'Fossil', 5.0),
+        ('Malta', 'Fossil', 0.5),
+        ('Africa', 'Kenya', 5.0),
+        ('Kenya', 'Fossil', 1.0),
+        ('Kenya', 'Land', 4.0),
+    ]
+
+
+def test_flows_are_conserved(table):
+    into, out = defaultdict(float), defaultdict(float)
+    for source, target, value in links(table.flows(2000, 2001, 1)):
+        into[target] += value
+        out[source] += value
+    for node in set(into) & set(out):
+        assert into[node] == pytest.approx(out[node])
+    assert into['Fossil'] + into['Land'] == pytest.approx(out['Europe'] + out['Africa'])
+
+
+def test_range_sums_years_before_dropping_sinks(table):
+    flows = links(table.flows(2000, 2001))
+    # Spain's land use nets -3 + 2 = -1 over the range: a sink, so no flow
+    assert ('Spain', 'Land', 1.0) not in flows
+    assert ('Europe', 'Spain', 10.0) in flows
+    # Chad has no positive emissions at all
+    assert not any('Chad' in (source, target) for source, target, _ in flows)
+
+
+def test_top_folds_the_rest(table):
+    flows = links(table.flows(2000, 2000, 1))
+    assert flows[:3] == [
+        ('Europe', 'France', 11.0),
+        ('Europe', 'Other (Europe)', 5.5),
+        ('France', 'Fossil', 10.0),
+    ]
+    assert ('Other (Europe)', 'Fossil', 5.5) in flows
+
+
+def test_top_larger_than_group(table):
+    assert table.flows(2000, 2001, 100) == table.flows(2000, 2001)
+    assert not any(target.startswith('Other') for _, target, _ in links(table.flows(2000, 2001, 100)))
+
+
+def test_empty_year(table):
+    assert table.flows(1990, 1990) == []
+    assert table.flows(2005, 2010, 3, 'columnar') == {'columns': ['source', 'target', 'value'],
+                                                      'data': [[], [], []]}
+
+
+def test_endpoint_empty_range(client):
+    response = client.get('/emissions/flows', params={'start': 1700, 'end': 1710})
+    assert response.status_code == 404
+    response = client.get('/emissions/flows', params={'year': 1700})
+    assert response.status_code == 404
+    response = client.get('/emissions/flows', params={'start': 2001, 'end': 2000})
+    assert response.status_code == 400
+
+
+def test_endpoint_top_larger_than_group(client):
+    everything = client.get('/emissions/flows', params={'year': 2000}).json()
+    assert client.get('/emissions/flows', params={'year': 2000, 'top': 1000}).json() == everything
+    folded = client.get('/emissions/flows', params={'year': 2000, 'top': 2}).json()
+    assert sum(row['value'] for row in folded if row['target'] in ('Fossil', 'Land')) == \
+        pytest.approx(sum(row['value'] for row in everything if row['target'] in ('Fossil', 'Land')))
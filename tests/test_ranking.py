@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from app.ranking import RankingIndex, select
+
+
+@pytest.fixture
+def ranking():
+    return RankingIndex(
+        'Entity',
+        ['a', 'b', 'c', 'd', 'a', 'b', 'c', 'd'],
+        [2001, 2001, 2001, 2001, 2000, 2000, 2000, 2000],
+        {'value': np.array([4, 3, np.nan, 1, 2, 3, 5, 1], dtype=np.float32)},
+        {'region': ['North', 'North', 'South', 'South'] * 2},
+    )
+
+
+def test_select_orders_and_ties():
+    values = np.array([1.0, 3.0, np.nan, 3.0, 2.0])
+    assert select(values, 2).tolist() == [1, 3]
+    assert select(values, 2, 'bottom').tolist() == [0, 4]
+
+
+def test_select_k_larger_than_values():
+    values = np.array([1.0, np.nan, 2.0])
+    assert select(values, 10).tolist() == [2, 0]
+    assert select(np.array([]), 3).tolist() == []
+
+
+def test_top_by_year(ranking):
+    assert ranking.top('value', 2, by=('year',)) == [
+        {'year': 2000, 'Entity': 'c', 'value': 5.0, 'rank': 1},
+        {'year': 2000, 'Entity': 'b', 'value': 3.0, 'rank': 2},
+        {'year': 2001, 'Entity': 'a', 'value': 4.0, 'rank': 1},
+        {'year': 2001, 'Entity': 'b', 'value': 3.0, 'rank': 2},
+    ]
+
+
+def test_top_ranks_the_mean_over_the_range(ranking):
+    assert ranking.top('value', 1, 'bottom') == [{'Entity': 'd', 'value': 1.0, 'rank': 1}]
+    # c has no 2001 value: its mean is its 2000 value
+    assert ranking.top('value', 1) == [{'Entity': 'c', 'value': 5.0, 'rank': 1}]
+
+
+def test_k_larger_than_group(ranking):
+    rows = ranking.top('value', 10, start=2001, end=2001, by=('region',))
+    assert [(row['region'], row['Entity'], row['rank']) for row in rows] == [
+        ('North', 'a', 1), ('North', 'b', 2), ('South', 'd', 1),
+    ]
+
+
+def test_empty_year_range(ranking):
+    assert ranking.top('value', 5, start=1990, end=1999) == []
+    assert ranking.top('value', 5, start=2002, by=('year',), shape='columnar') == {
+        'columns': ['year', 'Entity', 'value', 'rank'], 'data': [[], [], [], []],
+    }
+
+
+def test_unknown_labels(ranking):
+    assert ranking.filter_codes('region', ['south', 'Atlantis']) == (1,)
+    assert ranking.filter_codes('region', ['Atlantis']) == ()
+    assert ranking.top('value', 5, filters=(('region', ()),)) == []
+
+
+@pytest.mark.parametrize('params,detail', [
+    ({'measure': 'le', 'region': 'Atlantis'}, 'Invalid region parameter'),
+    ({'measure': 'le', 'sex': 'male,other'}, 'Invalid sex parameter'),
+    ({'measure': 'le', 'region': ','}, 'Invalid region parameter'),
+    ({'measure': 'le', 'continent': 'Europe'}, 'Invalid continent parameter'),
+    ({'measure': 'le', 'by': 'planet'}, 'Invalid by parameter'),
+    ({'measure': 'gdp'}, 'Invalid measure parameter'),
+])
+def test_endpoint_rejects_unknown_labels(client, params, detail):
+    response = client.get('/rankings/life', params=params)
+    assert response.status_code == 400
+    assert response.json() == {'detail': detail}
+
+
+def test_endpoint_k_larger_than_group(client):
+    rows = client.get('/rankings/life', params={
+        'measure': 'le', 'k': 1000, 'start': 2020, 'end': 2020, 'sex': 'both', 'region': 'europe',
+    }).json()
+    # Europe holds every sixth synthetic country
+    assert len(rows) == len({row['Location'] for row in rows}) == 33
+    assert [row['rank'] for row in rows] == list(range(1, 34))